@@ -0,0 +1,184 @@
+"""Audit query latency over a multi-GB set of rotated log segments.
+
+Writes a synthetic log history through the real JSON-lines sink, so
+segments are rotated, block-compressed and indexed exactly as the bot does.
+It then times indexed queries, cold and warm, against a full scan that
+decompresses every segment, which is what grepping the logs would cost.
+
+Run from the repository root:
+    python -m benchmarks.audit_query [--gigabytes 2] [--directory /tmp/audit-bench --keep]
+"""
+import argparse
+import gzip
+import json
+import logging
+import random
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from utils import audit_index
+from utils.audit_index import AUDIT_MARKER, INDEX_SUFFIX, search
+from utils.log_sinks import DEFAULT_COMPRESSION, JsonLinesFormatter, RotatingJsonLinesHandler
+
+PREFIX = "ModBot"
+ACTIONS = ("timeout", "warn", "kick", "ban")
+GUILD_ID = 897208006863892490
+
+
+def make_record(created: float, level: int, metadata: str, message: str, context: Dict) -> logging.LogRecord:
+    record = logging.makeLogRecord({
+        'name': PREFIX, 'levelno': level, 'levelname': logging.getLevelName(level),
+        'msg': message, 'metadata': metadata, 'context': context,
+    })
+    record.created = created
+    return record
+
+
+def generate(directory: Path, gigabytes: float, days: int, segment_mb: int, compression: str, rng: random.Random):
+    """Log ``gigabytes`` of mixed records spread over ``days`` days."""
+    handler = RotatingJsonLinesHandler(
+        directory, PREFIX, max_bytes=segment_mb * 1024 * 1024, interval=float('inf'),
+        max_segments=10 ** 6, max_total_bytes=10 ** 15, compression=compression
+    )
+    handler.setFormatter(JsonLinesFormatter())
+    moderators = [rng.randrange(10 ** 17, 10 ** 18) for _ in range(40)]
+    targets = [rng.randrange(10 ** 17, 10 ** 18) for _ in range(200_000)]
+
+    target_bytes = int(gigabytes * 1024 ** 3)
+    # Lines average about 300 bytes; spread the expected count over the period
+    start = time.time() - days * 86400
+    step = days * 86400 / (target_bytes // 300)
+    rotated = 0
+    n = 0
+    while rotated + handler.size < target_bytes:
+        created = start + n * step
+        kind = rng.random()
+        if kind < 0.02:
+            moderator = rng.choice(moderators)
+            target = rng.choice(targets)
+            action = rng.choice(ACTIONS)
+            record = make_record(created, logging.INFO, "AUDIT", f"Audit: {action} performed by mod on user", {
+                'action': action, 'user': f"mod{moderator % 1000}", 'target': f"user{target % 100000}",
+                'user_id': moderator, 'target_id': target, 'guild_id': GUILD_ID,
+                'details': {'reason': "rule violation", 'guild': "Benchmark Guild"},
+            })
+        elif kind < 0.7:
+            status = "started" if kind < 0.36 else "completed"
+            record = make_record(created, logging.DEBUG if status == "started" else logging.INFO, "COMMAND",
+                                 f"Command 'timeout' {status}", {
+                                     'command': rng.choice(("timeout", "warn", "purge", "userinfo")),
+                                     'user': f"user{rng.randrange(100000)}", 'guild': "Benchmark Guild",
+                                     'status': status, 'channel': "general",
+                                 })
+        else:
+            record = make_record(created, logging.INFO, "EVENT", "Event 'member_update' triggered", {
+                'event': "member_update",
+                'details': {'member': f"user{rng.randrange(100000)}", 'roles': rng.randrange(1, 20)},
+            })
+        before = handler.size
+        handler.handle(record)
+        if handler.size < before:
+            rotated += before
+        n += 1
+    handler.close()
+    return moderators, targets
+
+
+def full_scan(directory: Path, **filters) -> List[dict]:
+    """Decompress every segment and parse every audit line, like grepping would."""
+    results = []
+    for path in sorted(directory.glob(f"{PREFIX}.*.jsonl*")):
+        if path.suffix == ".gz":
+            opener = gzip.open
+        elif path.suffix == ".zst":
+            opener = zstandard.open
+        else:
+            opener = open
+        with opener(path, "rb") as f:
+            for line in f:
+                if AUDIT_MARKER in line:
+                    entry = json.loads(line)
+                    if audit_index._matches(entry, *(filters.get(k) for k in (
+                            'moderator_id', 'target_id', 'guild_id', 'action', 'since', 'until'))):
+                        results.append(entry)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--gigabytes', type=float, default=2.0, help="uncompressed size of the log set")
+    parser.add_argument('--days', type=int, default=90, help="days of history the log set covers")
+    parser.add_argument('--segment-mb', type=int, default=10, help="rotation size, as in production")
+    parser.add_argument('--compression', choices=['gzip', 'zstd'], default=DEFAULT_COMPRESSION)
+    parser.add_argument('--directory', help="where to write the log set (default: a temporary directory)")
+    parser.add_argument('--keep', action='store_true', help="keep the log set for later runs")
+    parser.add_argument('--skip-scan', action='store_true', help="skip the slow full-scan baseline")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    directory = Path(args.directory or tempfile.mkdtemp(prefix="audit-bench-"))
+    directory.mkdir(parents=True, exist_ok=True)
+    try:
+        run(directory, args)
+    finally:
+        if not args.keep:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+def run(directory: Path, args):
+    rng = random.Random(args.seed)
+    if any(directory.glob(f"{PREFIX}.*{INDEX_SUFFIX}")):
+        print(f"reusing log set in {directory}")
+    else:
+        print(f"writing {args.gigabytes:g} GB of logs to {directory} ...")
+        start = time.perf_counter()
+        generate(directory, args.gigabytes, args.days, args.segment_mb, args.compression, rng)
+        print(f"  written, compressed and indexed in {time.perf_counter() - start:.0f} s")
+
+    sidecars = sorted(directory.glob(f"{PREFIX}.*{INDEX_SUFFIX}"))
+    segments = list(directory.glob(f"{PREFIX}.*.jsonl*"))
+    indexes = [audit_index.load_index(p) for p in sidecars]
+    audits = sum(len(index['records']) for index in indexes)
+    print(f"segments:        {len(segments)} ({sum(p.stat().st_size for p in segments) / 1024 ** 2:,.0f} MiB on disk), "
+          f"{audits:,} audit records")
+    print(f"sidecars:        {sum(p.stat().st_size for p in sidecars) / 1024 ** 2:,.1f} MiB")
+
+    # Pick real ids from the middle of the history
+    middle = indexes[len(indexes) // 2]
+    position = len(middle['records']) // 2
+    _, _, ts = middle['records'][position]
+    moderator_id = int(next(k for k, v in middle['moderators'].items() if position in v))
+    target_id = int(next(k for k, v in middle['targets'].items() if position in v))
+    latest = indexes[-1]['end']
+    queries = {
+        "target": {'target_id': target_id},
+        "moderator + target": {'moderator_id': moderator_id, 'target_id': target_id},
+        "moderator, last 30 days": {'moderator_id': moderator_id, 'since': latest - 30 * 86400},
+        "bans on one day": {'action': "ban", 'since': ts - 43200, 'until': ts + 43200},
+    }
+
+    print()
+    for name, filters in queries.items():
+        audit_index._index_cache.clear()
+        results, cold = search(directory, PREFIX, limit=50, **filters)
+        _, warm = search(directory, PREFIX, limit=50, **filters)
+        print(f"{name + ':':<26}{len(results):>3} results, cold {cold['elapsed'] * 1e3:7.1f} ms, "
+              f"warm {warm['elapsed'] * 1e3:6.1f} ms, opened {cold['segments_read']:>3} of {len(segments)} segments, "
+              f"{cold['bytes_read'] / 1024:,.0f} KiB read")
+
+    if not args.skip_scan:
+        start = time.perf_counter()
+        scanned = full_scan(directory, target_id=target_id)
+        print(f"\nfull scan for the target query: {len(scanned)} results in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Compare the compiled content filter with the old per-pattern loop.
+
+Run from the repository root:
+    python -m benchmarks.content_filter [--messages 200000]
+"""
+import argparse
+import random
+import re
+import time
+
+from utils.content_filter import ContentFilter, FilterRule
+
+# The pattern list MessageMod used before the compiled engine
+LEGACY_PATTERNS = [
+    (re.compile(r'discord\.gg/[a-zA-Z0-9]+'), 'server invites'),
+    (re.compile(r'(?:https?://)?(?:www\.)?(?:discord\.(?:gg|io|me|li)|discordapp\.com/invite)/[a-zA-Z0-9]+'), 'invite links'),
+    (re.compile(r'https?://[^\s<>"]+|www\.[^\s<>"]+'), 'links'),
+]
+
+RULES = [
+    FilterRule(
+        r'(?:discord\.(?:gg|io|me|li)|discordapp\.com/invite)/[a-z0-9]+',
+        'invite links',
+        ('discord.', 'discordapp.com/invite')
+    ),
+    FilterRule(r'https?://[^\s<>"]+|www\.[^\s<>"]+', 'links', ('http', 'www.')),
+]
+
+WORDS = (
+    "the a to and you i it is that of in for this lol yeah no what gg wp anyone "
+    "playing tonight server discord update patch nerf buff raid boss loot lmao "
+    "okay thanks brb afk ranked queue match team game voice chat meme bot"
+).split()
+
+TEMPLATES = [
+    "check this out https://example.com/{w}",
+    "join my server discord.gg/{w}",
+    "JOIN NOW HTTPS://DISCORD.GG/{W} FREE NITRO",
+    "look at www.{w}.net it's great",
+    "new video: https://youtube.com/watch?v={w}",
+    "invite: https://discordapp.com/invite/{w}",
+]
+
+
+def legacy_match(content: str):
+    content = content.lower()
+    for pattern, filter_type in LEGACY_PATTERNS:
+        if pattern.search(content):
+            return filter_type
+    return None
+
+
+def build_corpus(count: int, link_ratio: float, seed: int = 42):
+    """Mostly plain chat with a sprinkling of links and invites."""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(count):
+        words = rng.choices(WORDS, k=rng.randint(2, 40))
+        if rng.random() < link_ratio:
+            word = rng.choice(WORDS) + str(rng.randint(0, 999))
+            link = rng.choice(TEMPLATES).format(w=word, W=word.upper())
+            words.insert(rng.randrange(len(words) + 1), link)
+        corpus.append(" ".join(words))
+    return corpus
+
+
+def bench(label: str, func, corpus):
+    start = time.perf_counter()
+    hits = sum(1 for content in corpus if func(content))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<10} {len(corpus) / elapsed:>12,.0f} msgs/s  {elapsed / len(corpus) * 1e6:6.2f} us/msg  hits={hits:,}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=200_000)
+    parser.add_argument('--link-ratio', type=float, default=0.03, help="fraction of messages carrying a link")
+    args = parser.parse_args()
+
+    engine = ContentFilter(RULES)
+    corpus = build_corpus(args.messages, args.link_ratio)
+
+    # The engine merges the two overlapping invite patterns into one category
+    merged = {'server invites': 'invite links'}
+    mismatches = sum(
+        1 for content in corpus
+        if merged.get(legacy_match(content), legacy_match(content)) != engine.match(content)
+    )
+    print(f"corpus: {len(corpus):,} messages, {args.link_ratio:.0%} with links, {mismatches} mismatches")
+
+    legacy = bench("legacy", legacy_match, corpus)
+    compiled = bench("compiled", engine.match, corpus)
+    print(f"speedup:   {legacy / compiled:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
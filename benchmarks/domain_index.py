@@ -0,0 +1,96 @@
+"""Load time, lookup throughput and memory of the domain index.
+
+Run from the repository root:
+    python -m benchmarks.domain_index [--domains 500000] [--lookups 200000]
+"""
+import argparse
+import random
+import string
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from utils.domain_index import DomainIndex, build_index, domain_suffixes
+
+TLDS = ['com', 'net', 'org', 'io', 'xyz', 'ru', 'cn', 'info', 'top', 'gg']
+
+
+def random_domain(rng: random.Random) -> str:
+    name = ''.join(rng.choices(string.ascii_lowercase + string.digits, k=rng.randint(5, 14)))
+    if rng.random() < 0.2:
+        name = ''.join(rng.choices(string.ascii_lowercase, k=4)) + '.' + name
+    return f"{name}.{rng.choice(TLDS)}"
+
+
+def rss_kib() -> int:
+    """Resident set size of this process, or -1 where /proc is unavailable."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return -1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--domains', type=int, default=500_000)
+    parser.add_argument('--lookups', type=int, default=200_000)
+    parser.add_argument('--hit-ratio', type=float, default=0.1)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    domains = [random_domain(rng) for _ in range(args.domains)]
+
+    # Hosts as they appear in links: mostly unlisted, some subdomains of listed ones
+    hosts = []
+    for _ in range(args.lookups):
+        if rng.random() < args.hit_ratio:
+            hosts.append(rng.choice(['www.', 'cdn.', '']) + rng.choice(domains))
+        else:
+            hosts.append('www.' + random_domain(rng))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'blocklist.idx'
+        start = time.perf_counter()
+        count = build_index(domains, path)
+        build_time = time.perf_counter() - start
+
+        rss_before = rss_kib()
+        start = time.perf_counter()
+        index = DomainIndex(path)
+        load_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        hits = sum(1 for host in hosts if index.match(host))
+        lookup_time = time.perf_counter() - start
+        rss_after = rss_kib()
+        size = path.stat().st_size
+        index.close()
+
+    # The straightforward alternative: a Python set of every domain
+    tracemalloc.start()
+    start = time.perf_counter()
+    domain_set = {d.encode().decode() for d in domains}
+    set_time = time.perf_counter() - start
+    set_mem, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    start = time.perf_counter()
+    set_hits = sum(1 for host in hosts if any(s in domain_set for s in domain_suffixes(host)))
+    set_lookup_time = time.perf_counter() - start
+    assert set_hits == hits, (set_hits, hits)
+
+    print(f"entries:         {count:,} ({size / 1024 / 1024:.1f} MiB index file, built in {build_time:.2f}s)")
+    print(f"load time:       {load_time * 1000:.2f} ms (building a set: {set_time * 1000:.0f} ms)")
+    print(f"lookups:         {len(hosts) / lookup_time:,.0f} hosts/s, {lookup_time / len(hosts) * 1e6:.2f} us/host, {hits:,} hits")
+    print(f"set lookups:     {len(hosts) / set_lookup_time:,.0f} hosts/s")
+    if rss_before >= 0:
+        print(f"resident growth: {(rss_after - rss_before) / 1024:.1f} MiB after {len(hosts):,} lookups")
+    print(f"set memory:      {set_mem / 1024 / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""Lightweight stand-ins for discord objects, for offline benchmarks.
+
+Every REST-shaped coroutine (send, delete, bulk delete, timeout) is routed
+through a FakeHTTP recorder that counts calls per route and can simulate
+Discord's response time, so the cogs run unmodified without a network.
+"""
+import asyncio
+import itertools
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import discord
+
+from utils.log_dispatcher import LogDispatcher
+
+_snowflakes = itertools.count(1_000_000_000_000_000)
+
+
+def next_id() -> int:
+    return next(_snowflakes)
+
+
+class FakeHTTP:
+    """Records every simulated REST call and optionally sleeps like Discord would."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls: Counter = Counter()
+
+    async def request(self, route: str):
+        self.calls[route] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        else:
+            # Still yield to the loop, as a real request would
+            await asyncio.sleep(0)
+
+    @property
+    def total(self) -> int:
+        return sum(self.calls.values())
+
+
+class FakePermissions:
+    def __init__(self, manage_messages: bool = False):
+        self.manage_messages = manage_messages
+
+
+class FakeRole:
+    def __init__(self, role_id: int, name: str = "role"):
+        self.id = role_id
+        self.name = name
+
+
+class FakeMember(discord.Member):
+    """A Member that passes isinstance checks but holds only what the cogs read."""
+
+    def __init__(self, guild: 'FakeGuild', member_id: int, moderator: bool = False, bot: bool = False):
+        self._fake_id = member_id
+        self._fake_guild = guild
+        self._fake_bot = bot
+        self._fake_roles = [FakeRole(guild.id, "@everyone")]
+        self._fake_permissions = FakePermissions(manage_messages=moderator)
+        self._timed_out = False
+
+    @property
+    def id(self) -> int:
+        return self._fake_id
+
+    @property
+    def guild(self) -> 'FakeGuild':
+        return self._fake_guild
+
+    @property
+    def bot(self) -> bool:
+        return self._fake_bot
+
+    @property
+    def roles(self) -> List[FakeRole]:
+        return self._fake_roles
+
+    @property
+    def guild_permissions(self) -> FakePermissions:
+        return self._fake_permissions
+
+    @property
+    def mention(self) -> str:
+        return f"<@{self._fake_id}>"
+
+    def __str__(self) -> str:
+        return f"user{self._fake_id}"
+
+    def is_timed_out(self) -> bool:
+        return self._timed_out
+
+    async def timeout(self, until, *, reason: Optional[str] = None):
+        await self._fake_guild.http.request('PATCH /guilds/members (timeout)')
+        self._timed_out = True
+
+
+class FakePartialMessage:
+    def __init__(self, channel: 'FakeChannel', message_id: int):
+        self.channel = channel
+        self.id = message_id
+
+    async def delete(self):
+        await self.channel.http.request('DELETE /channels/messages')
+
+
+class FakeChannel:
+    def __init__(self, guild: 'FakeGuild', channel_id: int, name: str = "general"):
+        self.id = channel_id
+        self.guild = guild
+        self.name = name
+        self.http = guild.http
+
+    @property
+    def mention(self) -> str:
+        return f"<#{self.id}>"
+
+    async def send(self, content: Optional[str] = None, *, embed=None, embeds=None, delete_after=None, **kwargs):
+        await self.http.request('POST /channels/messages')
+        return FakePartialMessage(self, next_id())
+
+    async def delete_messages(self, messages, *, reason: Optional[str] = None):
+        messages = list(messages)
+        if len(messages) == 1:
+            await self.http.request('DELETE /channels/messages')
+        else:
+            await self.http.request('POST /channels/messages/bulk-delete')
+
+    def get_partial_message(self, message_id: int) -> FakePartialMessage:
+        return FakePartialMessage(self, message_id)
+
+    def permissions_for(self, member) -> FakePermissions:
+        return member.guild_permissions
+
+
+class FakeGuild:
+    def __init__(self, http: FakeHTTP, guild_id: Optional[int] = None, name: str = "Benchmark Guild"):
+        self.id = guild_id or next_id()
+        self.name = name
+        self.http = http
+        self.channels: Dict[int, FakeChannel] = {}
+        self.members: Dict[int, FakeMember] = {}
+
+    def add_channel(self, name: str = "general") -> FakeChannel:
+        channel = FakeChannel(self, next_id(), name)
+        self.channels[channel.id] = channel
+        return channel
+
+    def add_member(self, moderator: bool = False) -> FakeMember:
+        member = FakeMember(self, next_id(), moderator=moderator)
+        self.members[member.id] = member
+        return member
+
+    def get_channel(self, channel_id: int) -> Optional[FakeChannel]:
+        return self.channels.get(channel_id)
+
+    get_channel_or_thread = get_channel
+
+    def get_member(self, member_id: int) -> Optional[FakeMember]:
+        return self.members.get(member_id)
+
+
+class FakeMessage:
+    def __init__(self, author: FakeMember, channel: FakeChannel, content: str):
+        self.id = next_id()
+        self.author = author
+        self.channel = channel
+        self.guild = channel.guild
+        self.content = content
+        self.created_at = datetime.now(timezone.utc)
+
+    async def delete(self):
+        await self.channel.http.request('DELETE /channels/messages')
+
+
+class FakeBot:
+    """Just enough of ModBot for cogs to be constructed and driven directly."""
+
+    def __init__(self, http: FakeHTTP, log_channel: Optional[FakeChannel] = None):
+        self.http = http
+        self.loop = asyncio.get_running_loop()
+        self.log_channel = log_channel
+        self.log_dispatcher = LogDispatcher(self)
@@ -0,0 +1,90 @@
+"""Logging cost per moderation command, inline vs. queued and DEBUG vs. INFO.
+
+A moderation command logs "started" at DEBUG, "completed" at INFO and an
+audit record. Each configuration replays the same commands to a real log
+file and a console stream (sent to /dev/null), and reports the latency the
+command sees. In queued mode the time the listener needs to write the
+backlog out afterwards is reported separately.
+
+Run from the repository root:
+    python -m benchmarks.logging_overhead [--commands 10000]
+"""
+import argparse
+import contextlib
+import logging
+import os
+import statistics
+import tempfile
+import time
+from typing import Dict, Optional
+
+from utils.logger import DiscordLogger
+
+
+def log_command(logger: DiscordLogger, i: int):
+    """The records one /timeout invocation produces."""
+    logger.command("timeout", "mod#0001", "Benchmark Guild", status="started", channel="general")
+    logger.audit("timeout", "mod#0001", f"user{i}#0001", details={'duration': '10 minutes', 'reason': "spam"})
+    logger.command("timeout", "mod#0001", "Benchmark Guild", status="completed", channel="general")
+
+
+def run(queued: bool, level: int, commands: int, directory: str) -> Dict[str, Optional[float]]:
+    name = f"LogBench{'Queued' if queued else 'Inline'}{logging.getLevelName(level)}"
+    cwd = os.getcwd()
+    with open(os.devnull, 'w') as devnull:
+        # The console handler keeps whatever sys.stdout is when it is created
+        with contextlib.redirect_stdout(devnull):
+            os.chdir(directory)
+            try:
+                logger = DiscordLogger(name, "Asia/Dubai", queued=queued, level=level)
+            finally:
+                os.chdir(cwd)
+
+        latencies = []
+        for i in range(commands):
+            start = time.perf_counter()
+            log_command(logger, i)
+            latencies.append(time.perf_counter() - start)
+
+        drain = None
+        if queued:
+            start = time.perf_counter()
+            logger.shutdown()
+            drain = time.perf_counter() - start
+
+    for handler in list(logger.logger.handlers):
+        logger.logger.removeHandler(handler)
+        handler.close()
+
+    latencies.sort()
+    return {
+        'mean': statistics.fmean(latencies),
+        'p50': latencies[len(latencies) // 2],
+        'p99': latencies[int(len(latencies) * 0.99)],
+        'max': latencies[-1],
+        'drain': drain,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--commands', type=int, default=10_000)
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for level in (logging.DEBUG, logging.INFO):
+            for queued in (False, True):
+                label = f"{'queued' if queued else 'inline'}, {logging.getLevelName(level)}"
+                results[label] = run(queued, level, args.commands, directory)
+    logging.shutdown()
+
+    print(f"commands:        {args.commands:,} (started at DEBUG, audit, completed at INFO)")
+    for label, result in results.items():
+        drain = f", drain {result['drain'] * 1e3:.0f} ms" if result['drain'] is not None else ""
+        print(f"{label + ':':<17}mean {result['mean'] * 1e6:.1f} us, p50 {result['p50'] * 1e6:.1f} us, "
+              f"p99 {result['p99'] * 1e6:.1f} us per command{drain}")
+
+
+if __name__ == "__main__":
+    main()
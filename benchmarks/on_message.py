@@ -0,0 +1,197 @@
+"""Offline throughput benchmark for MessageMod.on_message.
+
+Replays synthetic or recorded message corpora through the real cog using
+the stand-ins in benchmarks.fakes, and reports handler throughput and
+latency, memory retained per message and the REST calls the cog issued.
+
+Run from the repository root:
+    python -m benchmarks.on_message [--scenario all] [--messages 20000] [--rest-latency 0]
+A recorded corpus is a JSON-lines file of {"author": id, "channel": id, "content": text}:
+    python -m benchmarks.on_message --corpus messages.jsonl
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+from benchmarks.fakes import FakeBot, FakeGuild, FakeHTTP, FakeMessage
+from cogs.message_mod import MessageMod
+
+WORDS = (
+    "the a to and you i it is that of in for this lol yeah no what gg wp anyone "
+    "playing tonight server discord update patch nerf buff raid boss loot lmao "
+    "okay thanks brb afk ranked queue match team game voice chat meme bot"
+).split()
+
+# (author index, channel index, content) triples, resolved against the fake guild
+Corpus = List[Tuple[int, int, str]]
+
+
+def chat_line(rng: random.Random) -> str:
+    return " ".join(rng.choices(WORDS, k=rng.randint(2, 25)))
+
+
+def clean_corpus(rng: random.Random, count: int, users: int, channels: int) -> Corpus:
+    """Ordinary conversation spread over many users and channels."""
+    return [(rng.randrange(users), rng.randrange(channels), chat_line(rng)) for _ in range(count)]
+
+
+def link_spam_corpus(rng: random.Random, count: int, users: int, channels: int) -> Corpus:
+    """Chat where a third of the messages carry invite links."""
+    corpus = clean_corpus(rng, count, users, channels)
+    for i in range(0, count, 3):
+        author, channel, text = corpus[i]
+        corpus[i] = (author, channel, f"{text} join discord.gg/{rng.randrange(10**6)}")
+    return corpus
+
+
+def burst_corpus(rng: random.Random, count: int, users: int, channels: int) -> Corpus:
+    """Background chat with a handful of users firing messages back to back."""
+    corpus = clean_corpus(rng, count, users, channels)
+    spammers = list(range(10))
+    for i in range(0, count, 4):
+        corpus[i] = (rng.choice(spammers), 0, chat_line(rng))
+    return corpus
+
+
+def raid_corpus(rng: random.Random, count: int, users: int, channels: int) -> Corpus:
+    """Background chat with 50 fresh accounts posting the same text."""
+    corpus = clean_corpus(rng, count, users, channels)
+    raiders = range(users, users + 50)
+    start = count // 2
+    for n, author in enumerate(raiders):
+        if start + n * 7 < count:
+            corpus[start + n * 7] = (author, n % channels, "FREE NITRO for everyone, claim it at the link in my bio!!")
+    return corpus
+
+
+SCENARIOS: Dict[str, Callable[..., Corpus]] = {
+    'clean': clean_corpus,
+    'link_spam': link_spam_corpus,
+    'burst': burst_corpus,
+    'raid': raid_corpus,
+}
+
+
+def load_corpus(path: str) -> Corpus:
+    """Read a recorded corpus, mapping real ids onto dense indexes."""
+    authors: Dict[int, int] = {}
+    channels: Dict[int, int] = {}
+    corpus = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                author = authors.setdefault(record['author'], len(authors))
+                channel = channels.setdefault(record['channel'], len(channels))
+                corpus.append((author, channel, record['content']))
+    return corpus
+
+
+async def replay(corpus: Corpus, rest_latency: float, measure_memory: bool = False) -> Dict[str, object]:
+    """Feed a corpus through a fresh cog and collect the numbers."""
+    http = FakeHTTP(latency=rest_latency)
+    guild = FakeGuild(http)
+    log_channel = guild.add_channel("mod-log")
+    bot = FakeBot(http, log_channel=log_channel)
+    cog = MessageMod(bot)
+    # Background maintenance is not part of the hot path
+    cog.spam_check_task.cancel()
+    cog.filter_watch_task.cancel()
+    bot.log_dispatcher.start()
+
+    authors = max(a for a, _, _ in corpus) + 1
+    members = [guild.add_member() for _ in range(authors)]
+    channels = [guild.add_channel(f"chat-{i}") for i in range(max(c for _, c, _ in corpus) + 1)]
+    messages = [FakeMessage(members[a], channels[c], text) for a, c, text in corpus]
+
+    latencies = []
+    if measure_memory:
+        tracemalloc.start()
+        before, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    for message in messages:
+        t0 = time.perf_counter()
+        await cog.on_message(message)
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+    if measure_memory:
+        after, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    # Let batched deletions and log embeds go out so their REST calls are counted
+    await cog.deletion_queue.flush_all()
+    await bot.log_dispatcher.stop()
+    await asyncio.sleep(0)
+
+    latencies.sort()
+    result = {
+        'messages': len(messages),
+        'elapsed': elapsed,
+        'p50': latencies[len(latencies) // 2],
+        'p99': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        'mean': statistics.fmean(latencies),
+        'rest_calls': dict(http.calls),
+        'rest_total': http.total,
+        'auto_actions': cog.auto_actions.stats(),
+        'mod_log': bot.log_dispatcher.stats(),
+    }
+    if measure_memory:
+        result['retained_per_message'] = (after - before) / len(messages)
+        result['peak_per_message'] = (peak - before) / len(messages)
+    return result
+
+
+def report(name: str, timing: Dict[str, object], memory: Dict[str, object]):
+    n = timing['messages']
+    print(f"== {name} ({n:,} messages)")
+    print(f"  throughput:  {n / timing['elapsed']:,.0f} msgs/s")
+    print(f"  latency:     p50 {timing['p50'] * 1e6:.1f} us, p99 {timing['p99'] * 1e6:.1f} us, "
+          f"mean {timing['mean'] * 1e6:.1f} us")
+    print(f"  memory:      {memory['retained_per_message']:.0f} B retained/msg, "
+          f"{memory['peak_per_message']:.0f} B peak/msg (tracemalloc pass)")
+    print(f"  REST calls:  {timing['rest_total']:,} ({timing['rest_total'] / n:.3f}/msg)")
+    for route, count in sorted(timing['rest_calls'].items()):
+        print(f"    {route:<40} {count:,}")
+    logs = timing['mod_log']
+    if logs['submitted']:
+        print(f"  mod log:     {logs['submitted']:,} embeds in {logs['sent_messages']:,} messages, "
+              f"{logs['dropped']:,} dropped")
+    actions = timing['auto_actions']
+    if actions['issued'] or actions['collapsed']:
+        print(f"  auto actions: {actions['issued']} issued, {actions['collapsed']} collapsed")
+
+
+async def main_async(args):
+    rng = random.Random(args.seed)
+    if args.corpus:
+        corpora = {args.corpus: load_corpus(args.corpus)}
+    else:
+        names = list(SCENARIOS) if args.scenario == 'all' else [args.scenario]
+        corpora = {name: SCENARIOS[name](rng, args.messages, args.users, args.channels) for name in names}
+
+    for name, corpus in corpora.items():
+        timing = await replay(corpus, args.rest_latency)
+        # A separate pass, since tracemalloc slows everything it watches
+        memory = await replay(corpus, args.rest_latency, measure_memory=True)
+        report(name, timing, memory)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenario', choices=['all'] + list(SCENARIOS), default='all')
+    parser.add_argument('--corpus', help="replay a recorded JSON-lines corpus instead")
+    parser.add_argument('--messages', type=int, default=20_000)
+    parser.add_argument('--users', type=int, default=2_000)
+    parser.add_argument('--channels', type=int, default=10)
+    parser.add_argument('--rest-latency', type=float, default=0.0, help="simulated seconds per REST call")
+    parser.add_argument('--seed', type=int, default=1)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
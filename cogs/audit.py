@@ -0,0 +1,84 @@
+import asyncio
+import time
+import discord
+from discord.ext import commands
+from discord import app_commands
+from typing import Optional
+from utils.audit_index import search
+from utils.logger import bot_logger
+
+class Audit(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    @app_commands.command(name="auditlog")
+    @app_commands.checks.has_permissions(view_audit_log=True)
+    @app_commands.describe(
+        moderator="Only show actions taken by this moderator",
+        target="Only show actions taken against this user",
+        action="Only show this kind of action",
+        days="Only show the last N days",
+        limit="Number of entries to show (1-25)"
+    )
+    @app_commands.choices(action=[
+        app_commands.Choice(name="Kick", value="kick"),
+        app_commands.Choice(name="Ban", value="ban"),
+        app_commands.Choice(name="Timeout", value="timeout"),
+        app_commands.Choice(name="Warn", value="warn"),
+        app_commands.Choice(name="Clear Warnings", value="clear_warnings"),
+    ])
+    async def auditlog(
+        self,
+        interaction: discord.Interaction,
+        moderator: Optional[discord.User] = None,
+        target: Optional[discord.User] = None,
+        action: Optional[app_commands.Choice[str]] = None,
+        days: Optional[app_commands.Range[int, 1, 365]] = None,
+        limit: app_commands.Range[int, 1, 25] = 10
+    ):
+        """Search the bot's moderation history in this server."""
+        await interaction.response.defer(ephemeral=True)
+
+        since = time.time() - days * 86400 if days else None
+        # The log file is written on another thread; wait for recent records to reach disk
+        await asyncio.to_thread(bot_logger.flush)
+        results, stats = await asyncio.to_thread(
+            search,
+            bot_logger.log_dir,
+            bot_logger.bot_name,
+            moderator_id=moderator.id if moderator else None,
+            target_id=target.id if target else None,
+            guild_id=interaction.guild.id,
+            action=action.value if action else None,
+            since=since,
+            limit=limit
+        )
+
+        if not results:
+            await interaction.followup.send("No matching moderation actions found.", ephemeral=True)
+            return
+
+        lines = []
+        for entry in results:
+            context = entry.get('context') or {}
+            details = context.get('details') or {}
+            moderator_text = f"<@{context['user_id']}>" if context.get('user_id') else context.get('user')
+            target_text = f"<@{context['target_id']}>" if context.get('target_id') else context.get('target')
+            line = f"<t:{int(entry['ts'])}:f> **{context.get('action')}** by {moderator_text} on {target_text}"
+            if details.get('reason'):
+                line += f"\n  Reason: {str(details['reason'])[:200]}"
+            lines.append(line)
+
+        embed = discord.Embed(
+            title="Audit Log",
+            description="\n".join(lines)[:4096],
+            color=discord.Color.blue()
+        )
+        embed.set_footer(
+            text=f"{len(results)} entries | searched {stats['segments_read']} log files "
+                 f"in {stats['elapsed'] * 1000:.0f} ms"
+        )
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+async def setup(bot):
+    await bot.add_cog(Audit(bot))
@@ -0,0 +1,136 @@
+import asyncio
+import io
+import discord
+from discord.ext import commands
+from discord import app_commands
+from datetime import datetime
+from typing import Optional
+from utils.instrumentation import SLOW_RESPONSE
+from utils.profiler import ProfilerBusy, profile_cpu, profile_memory
+
+async def is_owner(interaction: discord.Interaction) -> bool:
+    return await interaction.client.is_owner(interaction.user)
+
+class Diagnostics(commands.Cog):
+    debug = app_commands.Group(
+        name="debug",
+        description="Inspect the bot's internals",
+        default_permissions=discord.Permissions(administrator=True)
+    )
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    @app_commands.command(name="perf")
+    @app_commands.checks.has_permissions(administrator=True)
+    @app_commands.describe(command="Only show this command")
+    async def perf(
+        self,
+        interaction: discord.Interaction,
+        command: Optional[str] = None
+    ):
+        """Show recent slash command response times."""
+        timings = self.bot.tree.timings
+        names = [command] if command else timings.commands()
+        names = [name for name in names if name in timings.samples]
+        if not names:
+            await interaction.response.send_message("No command timings recorded yet.", ephemeral=True)
+            return
+
+        embed = discord.Embed(
+            title="Command Performance",
+            description=f"Over the last {timings.window} runs of each command. "
+                        f"Slow: first response after {SLOW_RESPONSE:g}s.",
+            color=discord.Color.blue(),
+            timestamp=datetime.utcnow()
+        )
+        # Slowest commands first; an embed holds at most 25 fields
+        summaries = sorted(
+            ((name, timings.summary(name)) for name in names),
+            key=lambda item: item[1]['p95'],
+            reverse=True
+        )
+        for name, stats in summaries[:25]:
+            embed.add_field(
+                name=f"/{name} ({stats['count']} runs, {stats['slow']} slow)",
+                value=f"Total: {stats['p50'] * 1000:.0f} / {stats['p95'] * 1000:.0f} / "
+                      f"{stats['p99'] * 1000:.0f} ms\n"
+                      f"First Response: {stats['first_p50'] * 1000:.0f} / {stats['first_p95'] * 1000:.0f} / "
+                      f"{stats['first_p99'] * 1000:.0f} ms\n"
+                      f"REST: {stats['rest_share']:.0%} of total",
+                inline=False
+            )
+        embed.set_footer(text="p50 / p95 / p99")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @debug.command(name="loop")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def debug_loop(self, interaction: discord.Interaction):
+        """Show event-loop lag and the callbacks that blocked the loop the longest."""
+        watchdog = self.bot.loop_watchdog
+        stats = watchdog.stats()
+        embed = discord.Embed(
+            title="Event Loop",
+            description=f"**Lag:** {stats['p50'] * 1000:.1f} ms p50, {stats['p99'] * 1000:.1f} ms p99, "
+                        f"{stats['max'] * 1000:.0f} ms max ({stats['samples']} samples)\n"
+                        f"**Stalls over {watchdog.threshold * 1000:.0f} ms:** {stats['stalls']} recorded",
+            color=discord.Color.blue(),
+            timestamp=datetime.utcnow()
+        )
+        for stall in watchdog.worst(5):
+            duration = f"{stall.duration:.2f}s" if stall.duration is not None else "still blocked"
+            # The innermost frames, trimmed to fit a field
+            stack = "".join(stall.stack[-6:])[-950:]
+            embed.add_field(
+                name=f"{duration} in {stall.location}"[:256],
+                value=f"<t:{int(stall.when)}:R>\n```py\n{stack}```",
+                inline=False
+            )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @debug.command(name="profile")
+    @app_commands.check(is_owner)
+    @app_commands.describe(
+        seconds="How long to profile for (1-60)",
+        mode="CPU samples every thread's stack; memory diffs two tracemalloc snapshots"
+    )
+    @app_commands.choices(mode=[
+        app_commands.Choice(name="CPU", value="cpu"),
+        app_commands.Choice(name="Memory", value="memory"),
+    ])
+    async def debug_profile(
+        self,
+        interaction: discord.Interaction,
+        seconds: app_commands.Range[int, 1, 60] = 10,
+        mode: Optional[app_commands.Choice[str]] = None
+    ):
+        """Profile the running bot and attach the results (bot owner only)."""
+        await interaction.response.defer(ephemeral=True)
+        stamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+
+        # Profiles block, so they run on a worker thread and the loop keeps serving
+        try:
+            if mode and mode.value == "memory":
+                report = await asyncio.to_thread(profile_memory, seconds)
+                files = [discord.File(io.BytesIO(report.encode()), filename=f"memory-{stamp}.txt")]
+                summary = report.splitlines()[0]
+            else:
+                profile = await asyncio.to_thread(profile_cpu, seconds)
+                report = profile.report()
+                files = [
+                    discord.File(io.BytesIO(report.encode()), filename=f"profile-{stamp}.txt"),
+                    discord.File(io.BytesIO(profile.collapsed().encode()), filename=f"profile-{stamp}.collapsed"),
+                ]
+                top = "\n".join(
+                    f"{own / max(profile.samples - profile.idle, 1):>6.1%}  {name}"
+                    for name, own, _ in profile.top(10)
+                )
+                summary = f"{report.splitlines()[0]}\n```\n{top[:1800]}```"
+        except ProfilerBusy:
+            await interaction.followup.send("A profile is already running.", ephemeral=True)
+            return
+
+        await interaction.followup.send(summary, files=files, ephemeral=True)
+
+async def setup(bot):
+    await bot.add_cog(Diagnostics(bot))
@@ -1,15 +1,121 @@
 import discord
+import time
 from discord.ext import commands
 from discord import app_commands
 from datetime import datetime
 from typing import Optional
-from collections import defaultdict
+from utils.escalation import EscalationRule, evaluate
+from utils.logger import bot_logger
+from utils.warnings_store import CACHED_RECENT, RECENT_SIZE, WarningsStore, cursor
+from utils.warning_expiry import ExpiryScheduler
+
+class WarningsView(discord.ui.View):
+    """Pages through a member's warnings, newest first, fetching one page at a time."""
+
+    def __init__(self, store: WarningsStore, interaction: discord.Interaction, member: discord.Member,
+                 count: int, active: int, page: list):
+        super().__init__(timeout=120)
+        self.store = store
+        self.interaction = interaction
+        self.member = member
+        self.count = count
+        self.active = active
+        self.page = page
+        # The "before" cursor each visited page was fetched with
+        self.cursors = [None]
+        self.update_buttons()
+
+    @property
+    def index(self) -> int:
+        return len(self.cursors) - 1
+
+    def update_buttons(self):
+        self.previous.disabled = self.index == 0
+        self.next.disabled = (self.index + 1) * RECENT_SIZE >= self.count
+
+    def render(self) -> discord.Embed:
+        guild = self.interaction.guild
+        pages = max(-(-self.count // RECENT_SIZE), 1)
+        embed = discord.Embed(
+            title=f"Warnings for {self.member.display_name}",
+            description=f"**Active Warnings:** {self.active}\n**Total Warnings:** {self.count}",
+            color=discord.Color.yellow()
+        )
+        embed.set_footer(text=f"Page {self.index + 1}/{pages}")
+
+        # Each moderator on the page is looked up once, from the member cache
+        moderators = {}
+        for moderator_id in {warning['moderator_id'] for warning in self.page}:
+            moderator = guild.get_member(moderator_id)
+            moderators[moderator_id] = moderator.mention if moderator else f"Unknown Moderator ({moderator_id})"
+
+        number = self.count - self.index * RECENT_SIZE
+        for warning in self.page:
+            # Ten long reasons must still fit in an embed's 6000 characters
+            reason = warning['reason'] if len(warning['reason']) <= 450 else warning['reason'][:449] + "…"
+            embed.add_field(
+                name=f"Warning {number}" + ("" if warning['active'] else " (expired)"),
+                value=f"**Reason:** {reason}\n"
+                      f"**Moderator:** {moderators[warning['moderator_id']]}\n"
+                      f"**Date:** <t:{int(warning['created_at'])}:R>",
+                inline=False
+            )
+            number -= 1
+        return embed
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user != self.interaction.user:
+            await interaction.response.send_message("You cannot use this button.", ephemeral=True)
+            return False
+        return True
+
+    async def show(self, interaction: discord.Interaction):
+        self.page = await self.store.page(
+            self.interaction.guild.id, self.member.id, before=self.cursors[-1], limit=RECENT_SIZE
+        )
+        self.count = await self.store.count(self.interaction.guild.id, self.member.id)
+        self.active = await self.store.active_count(self.interaction.guild.id, self.member.id)
+        self.update_buttons()
+        await interaction.response.edit_message(embed=self.render(), view=self)
+
+    @discord.ui.button(label="Previous", style=discord.ButtonStyle.secondary)
+    async def previous(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.cursors.pop()
+        await self.show(interaction)
+
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.secondary)
+    async def next(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.cursors.append(cursor(self.page[-1]))
+        await self.show(interaction)
+
+    async def on_timeout(self):
+        try:
+            await self.interaction.edit_original_response(view=None)
+        except discord.HTTPException:
+            pass
 
 class Info(commands.Cog):
+    escalation = app_commands.Group(
+        name="escalation",
+        description="Act automatically when members collect warnings",
+        default_permissions=discord.Permissions(manage_guild=True)
+    )
+
     def __init__(self, bot):
         self.bot = bot
-        # Store warnings in memory (use a database in production)
-        self.warnings = defaultdict(list)
+        # Warnings per (guild, member), persisted in SQLite off the event loop
+        self.warning_store = WarningsStore("data/warnings.db")
+        # Wakes when the next warning is due to expire
+        self.expiry = ExpiryScheduler(self.warning_store)
+
+    async def cog_load(self):
+        await self.warning_store.open()
+        self.expiry.start()
+
+    async def cog_unload(self):
+        """Write out queued warnings before the cog goes away."""
+        await self.expiry.stop()
+        await self.warning_store.close()
 
     @app_commands.command(name="warn")
     @app_commands.checks.has_permissions(moderate_members=True)
@@ -31,13 +137,14 @@ class Info(commands.Cog):
             )
             return
 
-        warning = {
-            'reason': reason,
-            'moderator_id': interaction.user.id,
-            'timestamp': datetime.utcnow()
-        }
-        
-        self.warnings[member.id].append(warning)
+        await self.warning_store.add(interaction.guild.id, member.id, interaction.user.id, reason)
+        warning_count = await self.warning_store.active_count(interaction.guild.id, member.id)
+        # The newest warnings are cached by the store, so this is one lookup per rule
+        rule = evaluate(
+            self.warning_store.escalations.get(interaction.guild.id, []),
+            await self.warning_store.page(interaction.guild.id, member.id, limit=CACHED_RECENT),
+            time.time()
+        )
         
         # Notify the user
         try:
@@ -49,22 +156,72 @@ class Info(commands.Cog):
             pass  # Cannot DM the user
 
         await interaction.response.send_message(
-            f"✅ Warning added for {member.mention}\nReason: {reason}",
+            f"✅ Warning added for {member.mention}\nReason: {reason}"
+            + (f"\nEscalating: {rule.describe()}" if rule else ""),
             ephemeral=True
         )
 
+        # Log audit
+        bot_logger.audit(
+            "warn",
+            str(interaction.user),
+            str(member),
+            details={
+                "reason": reason,
+                "guild": interaction.guild.name
+            },
+            user_id=interaction.user.id,
+            target_id=member.id,
+            guild_id=interaction.guild.id
+        )
+
         # Log the warning
-        if self.bot.log_channel:
-            embed = discord.Embed(
-                title="Member Warned",
-                description=f"**Member:** {member.mention} ({member.id})\n"
-                          f"**Moderator:** {interaction.user.mention}\n"
-                          f"**Reason:** {reason}\n"
-                          f"**Total Warnings:** {len(self.warnings[member.id])}",
-                color=discord.Color.yellow(),
-                timestamp=datetime.utcnow()
+        embed = discord.Embed(
+            title="Member Warned",
+            description=f"**Member:** {member.mention} ({member.id})\n"
+                      f"**Moderator:** {interaction.user.mention}\n"
+                      f"**Reason:** {reason}\n"
+                      f"**Active Warnings:** {warning_count}",
+            color=discord.Color.yellow(),
+            timestamp=datetime.utcnow()
+        )
+        self.bot.log_dispatcher.submit(embed)
+
+        if rule:
+            error = await self.escalate(interaction, member, rule)
+            if error:
+                await interaction.followup.send(f"Escalation failed: {error}", ephemeral=True)
+
+    async def escalate(self, interaction: discord.Interaction, member: discord.Member,
+                       rule: EscalationRule) -> Optional[str]:
+        """Apply an escalation rule through the Moderation cog; returns why it failed, if it did."""
+        moderation = self.bot.get_cog("Moderation")
+        if moderation is None:
+            return "the moderation commands are not loaded."
+        me = interaction.guild.me
+        if member.top_role >= me.top_role:
+            return "their role is higher or equal to mine."
+
+        reason = f"Automatic escalation: {rule.describe()}"
+        details = {"escalation": rule.describe(), "warned_by": interaction.user.id}
+        try:
+            if rule.action == "ban":
+                await moderation.ban_member(member, me, reason, details=details)
+            elif rule.action == "kick":
+                await moderation.kick_member(member, me, reason, details=details)
+            else:
+                await moderation.timeout_member(member, me, rule.duration, reason, details=details)
+        except discord.HTTPException as e:
+            bot_logger.command(
+                "escalation",
+                str(interaction.user),
+                interaction.guild.name,
+                status="error",
+                details={"target_id": member.id, "rule": rule.describe()},
+                error=e
             )
-            await self.bot.log_channel.send(embed=embed)
+            return f"I couldn't {rule.action} {member.mention}."
+        return None
 
     @app_commands.command(name="warnings")
     @app_commands.describe(member="The member to check warnings for")
@@ -74,31 +231,22 @@ class Info(commands.Cog):
         member: discord.Member
     ):
         """View warnings for a user."""
-        if not self.warnings[member.id]:
+        count = await self.warning_store.count(interaction.guild.id, member.id)
+        if not count:
             await interaction.response.send_message(
                 f"{member.mention} has no warnings.",
                 ephemeral=True
             )
             return
 
-        embed = discord.Embed(
-            title=f"Warnings for {member.display_name}",
-            color=discord.Color.yellow()
-        )
-
-        for i, warning in enumerate(self.warnings[member.id], 1):
-            moderator = interaction.guild.get_member(warning['moderator_id'])
-            mod_name = moderator.mention if moderator else "Unknown Moderator"
-            
-            embed.add_field(
-                name=f"Warning {i}",
-                value=f"**Reason:** {warning['reason']}\n"
-                      f"**Moderator:** {mod_name}\n"
-                      f"**Date:** <t:{int(warning['timestamp'].timestamp())}:R>",
-                inline=False
-            )
-
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        page = await self.warning_store.page(interaction.guild.id, member.id, limit=RECENT_SIZE)
+        active = await self.warning_store.active_count(interaction.guild.id, member.id)
+        view = WarningsView(self.warning_store, interaction, member, count, active, page)
+        if count <= RECENT_SIZE:
+            view.stop()
+            await interaction.response.send_message(embed=view.render(), ephemeral=True)
+        else:
+            await interaction.response.send_message(embed=view.render(), view=view, ephemeral=True)
 
     @app_commands.command(name="clearwarnings")
     @app_commands.checks.has_permissions(moderate_members=True)
@@ -109,32 +257,145 @@ class Info(commands.Cog):
         member: discord.Member
     ):
         """Clear all warnings for a user."""
-        if not self.warnings[member.id]:
+        warning_count = await self.warning_store.clear(interaction.guild.id, member.id)
+        if not warning_count:
             await interaction.response.send_message(
                 f"{member.mention} has no warnings to clear.",
                 ephemeral=True
             )
             return
-
-        warning_count = len(self.warnings[member.id])
-        self.warnings[member.id].clear()
         
         await interaction.response.send_message(
             f"✅ Cleared {warning_count} warnings for {member.mention}",
             ephemeral=True
         )
 
+        # Log audit
+        bot_logger.audit(
+            "clear_warnings",
+            str(interaction.user),
+            str(member),
+            details={
+                "warnings_cleared": warning_count,
+                "guild": interaction.guild.name
+            },
+            user_id=interaction.user.id,
+            target_id=member.id,
+            guild_id=interaction.guild.id
+        )
+
         # Log the action
-        if self.bot.log_channel:
-            embed = discord.Embed(
-                title="Warnings Cleared",
-                description=f"**Member:** {member.mention} ({member.id})\n"
-                          f"**Moderator:** {interaction.user.mention}\n"
-                          f"**Warnings Cleared:** {warning_count}",
-                color=discord.Color.green(),
-                timestamp=datetime.utcnow()
-            )
-            await self.bot.log_channel.send(embed=embed)
+        embed = discord.Embed(
+            title="Warnings Cleared",
+            description=f"**Member:** {member.mention} ({member.id})\n"
+                      f"**Moderator:** {interaction.user.mention}\n"
+                      f"**Warnings Cleared:** {warning_count}",
+            color=discord.Color.green(),
+            timestamp=datetime.utcnow()
+        )
+        self.bot.log_dispatcher.submit(embed)
+
+    @app_commands.command(name="warnexpiry")
+    @app_commands.checks.has_permissions(manage_guild=True)
+    @app_commands.describe(days="Days after which a warning stops counting (0 = never)")
+    async def warnexpiry(
+        self,
+        interaction: discord.Interaction,
+        days: app_commands.Range[int, 0, 3650]
+    ):
+        """Set how long warnings count against a member in this server."""
+        await interaction.response.defer(ephemeral=True)
+        # Applies to the server's existing warnings too
+        await self.warning_store.set_expiry(interaction.guild.id, days * 86400 if days else None)
+        self.expiry.reset()
+
+        await interaction.followup.send(
+            f"✅ Warnings now expire after {days} days." if days else "✅ Warnings no longer expire.",
+            ephemeral=True
+        )
+
+        bot_logger.audit(
+            "warn_expiry",
+            str(interaction.user),
+            interaction.guild.name,
+            details={"days": days},
+            user_id=interaction.user.id,
+            guild_id=interaction.guild.id
+        )
+
+    @escalation.command(name="set")
+    @app_commands.checks.has_permissions(manage_guild=True)
+    @app_commands.describe(
+        threshold="Active warnings that trigger the action",
+        days="Window the warnings must fall in",
+        action="What to do to the member",
+        minutes="Timeout length in minutes (timeouts only)"
+    )
+    @app_commands.choices(action=[
+        app_commands.Choice(name="Timeout", value="timeout"),
+        app_commands.Choice(name="Kick", value="kick"),
+        app_commands.Choice(name="Ban", value="ban"),
+    ])
+    async def escalation_set(
+        self,
+        interaction: discord.Interaction,
+        threshold: app_commands.Range[int, 1, RECENT_SIZE],
+        days: app_commands.Range[int, 1, 3650],
+        action: app_commands.Choice[str],
+        minutes: app_commands.Range[int, 1, 40320] = 60  # Max 28 days
+    ):
+        """Add or replace the rule for a number of warnings."""
+        rule = EscalationRule(threshold, days * 86400, action.value, minutes if action.value == "timeout" else None)
+        await self.warning_store.set_escalation(interaction.guild.id, rule)
+        await interaction.response.send_message(f"✅ Escalation rule set: {rule.describe()}", ephemeral=True)
+
+        bot_logger.audit(
+            "escalation_set",
+            str(interaction.user),
+            interaction.guild.name,
+            details={"rule": rule.describe()},
+            user_id=interaction.user.id,
+            guild_id=interaction.guild.id
+        )
+
+    @escalation.command(name="remove")
+    @app_commands.checks.has_permissions(manage_guild=True)
+    @app_commands.describe(threshold="Warning count of the rule to remove")
+    async def escalation_remove(
+        self,
+        interaction: discord.Interaction,
+        threshold: app_commands.Range[int, 1, RECENT_SIZE]
+    ):
+        """Remove an escalation rule."""
+        if not await self.warning_store.remove_escalation(interaction.guild.id, threshold):
+            await interaction.response.send_message(f"There is no rule for {threshold} warnings.", ephemeral=True)
+            return
+        await interaction.response.send_message(f"✅ Removed the rule for {threshold} warnings.", ephemeral=True)
+
+        bot_logger.audit(
+            "escalation_remove",
+            str(interaction.user),
+            interaction.guild.name,
+            details={"threshold": threshold},
+            user_id=interaction.user.id,
+            guild_id=interaction.guild.id
+        )
+
+    @escalation.command(name="list")
+    @app_commands.checks.has_permissions(manage_guild=True)
+    async def escalation_list(self, interaction: discord.Interaction):
+        """Show this server's escalation rules."""
+        rules = sorted(self.warning_store.escalations.get(interaction.guild.id, []), key=lambda rule: rule.threshold)
+        if not rules:
+            await interaction.response.send_message("No escalation rules are set.", ephemeral=True)
+            return
+        embed = discord.Embed(
+            title="Escalation Rules",
+            description="\n".join(rule.describe() for rule in rules),
+            color=discord.Color.blue()
+        )
+        embed.set_footer(text="Only active warnings count; the strongest matching rule applies")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
 
     @app_commands.command(name="userinfo")
     @app_commands.describe(member="The member to get info about")
@@ -179,10 +440,10 @@ class Info(commands.Cog):
                 inline=False
             )
             
-        warning_count = len(self.warnings[member.id])
+        warning_count = await self.warning_store.active_count(interaction.guild.id, member.id)
         if warning_count > 0:
             embed.add_field(
-                name="Warnings",
+                name="Active Warnings",
                 value=warning_count,
                 inline=True
             )
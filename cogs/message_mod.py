@@ -2,37 +2,168 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import re
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 import asyncio
-from collections import defaultdict
+import time
+from utils.rate_limit import SlidingWindowLimiter
+from utils.content_filter import FilterRule
+from utils.filter_rules import FilterRuleCache
+from utils.raid_detection import RaidDetector, RaidHit
+from utils.deletion_queue import DeletionQueue
+from utils.purge import ChannelPurge, build_message_check
+from utils.permission_cache import ExemptionCache
+from utils.action_dedupe import ActionDeduper
+from utils.instrumentation import QUEUE_DEPTH, loop_gauges
+from utils.logger import bot_logger
+from utils.metrics import metrics
+
+ON_MESSAGE_SECONDS = metrics.histogram(
+    "modbot_on_message_seconds",
+    "Time spent handling one message in MessageMod.on_message."
+)
+FILTER_HITS = metrics.counter(
+    "modbot_filter_hits_total",
+    "Messages caught by the filters, by filter category.",
+    ("category",)
+)
 
 class MessageMod(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        # Track message counts for anti-spam
-        self.message_counts = defaultdict(lambda: defaultdict(int))
-        self.spam_check_task = self.bot.loop.create_task(self.clear_message_counts())
         # Configurable settings - could be moved to a config file
         self.spam_threshold = 5  # messages
         self.spam_interval = 5   # seconds
-        # Regex patterns for filtered content
-        self.filter_patterns = [
-            (re.compile(r'discord\.gg/[a-zA-Z0-9]+'), 'server invites'),
-            (re.compile(r'(?:https?://)?(?:www\.)?(?:discord\.(?:gg|io|me|li)|discordapp\.com/invite)/[a-zA-Z0-9]+'), 'invite links'),
-            (re.compile(r'https?://[^\s<>"]+|www\.[^\s<>"]+'), 'links'),
-            # Add more patterns as needed
+        self.spam_timeout = 5    # minutes
+        self.evict_interval = 60  # seconds between idle-key sweeps
+        # Sliding-window anti-spam limiter keyed by (author, channel)
+        self.spam_limiter = SlidingWindowLimiter(self.spam_threshold, self.spam_interval)
+        # Per-server limits set with /antispam survive restarts
+        self.spam_limits_path = "data/antispam.json"
+        try:
+            self.spam_limiter.load_limits(self.spam_limits_path)
+        except (OSError, ValueError, TypeError) as e:
+            bot_logger.system("Failed to load anti-spam limits, using defaults", operation="antispam", error=e)
+        self.spam_check_task = self.bot.loop.create_task(self.evict_idle_limits())
+        # Guild-wide detection of the same content posted by many accounts
+        self.raid_threshold = 5    # distinct authors
+        self.raid_window = 30      # seconds
+        self.raid_timeout = 10     # minutes
+        self.raid_detector = RaidDetector(self.raid_threshold, self.raid_window)
+        # Automatic timeouts collapse per (guild, user, action) while pending
+        self.auto_actions = ActionDeduper()
+        # Filtered messages are deleted in per-channel batches
+        self.deletion_queue = DeletionQueue(window=1.5)
+        loop_gauges.add(QUEUE_DEPTH, lambda: self.deletion_queue.depth, queue="deletions")
+        # Filter rules in priority order, compiled into a single scanner.
+        # Anchors are literals the prefilter looks for before any regex runs.
+        # Optional leading groups (scheme, www.) are left out of the patterns:
+        # they never change whether a search matches, only slow it down.
+        self.filter_rules = [
+            FilterRule(
+                r'(?:discord\.(?:gg|io|me|li)|discordapp\.com/invite)/[a-z0-9]+',
+                'invite links',
+                ('discord.', 'discordapp.com/invite')
+            ),
+            # Add more rules as needed
         ]
+        # Per-guild rule sets live in data/filters/<guild_id>.json and are
+        # compiled once per change; on_message only does a dict lookup.
+        # Links are checked against the domain indexes in data/domains.
+        self.filter_cache = FilterRuleCache("data/filters", self.filter_rules, "data/domains")
+        self.filter_reload_interval = 30  # seconds between rule file checks
+        # Who skips filtering, resolved once per member until their roles change
+        self.exemptions = ExemptionCache()
+        self.filter_watch_task = self.bot.loop.create_task(
+            self.filter_cache.watch(self.filter_reload_interval)
+        )
 
-    def cog_unload(self):
+    async def cog_unload(self):
         """Cleanup when cog is unloaded."""
         self.spam_check_task.cancel()
+        self.filter_watch_task.cancel()
+        await self.deletion_queue.flush_all()
 
-    async def clear_message_counts(self):
-        """Periodically clear message counts for spam detection."""
+    async def evict_idle_limits(self):
+        """Periodically drop anti-spam state for users who stopped talking."""
         while True:
-            await asyncio.sleep(self.spam_interval)
-            self.message_counts.clear()
+            await asyncio.sleep(self.evict_interval)
+            self.spam_limiter.evict_idle()
+
+    @app_commands.command(name="antispam")
+    @app_commands.checks.has_permissions(manage_guild=True)
+    @app_commands.describe(
+        threshold="Messages allowed inside the interval before a timeout (2-50)",
+        interval="Length of the sliding window in seconds (1-120)"
+    )
+    async def antispam(
+        self,
+        interaction: discord.Interaction,
+        threshold: app_commands.Range[int, 2, 50],
+        interval: app_commands.Range[int, 1, 120]
+    ):
+        """Configure the anti-spam limits for this server."""
+        self.spam_limiter.set_limits(interaction.guild.id, threshold, interval)
+        message = f"✅ Anti-spam set to {threshold} messages per {interval} seconds."
+        try:
+            await asyncio.to_thread(self.spam_limiter.save_limits, self.spam_limits_path)
+        except OSError as e:
+            bot_logger.system("Failed to save anti-spam limits", operation="antispam", error=e)
+            message += "\n⚠️ The limits could not be saved and will reset when the bot restarts."
+        await interaction.response.send_message(message, ephemeral=True)
+
+    @app_commands.command(name="reloadfilters")
+    @app_commands.checks.has_permissions(manage_guild=True)
+    async def reloadfilters(self, interaction: discord.Interaction):
+        """Reload this server's message filter rules from disk."""
+        await interaction.response.defer(ephemeral=True)
+        try:
+            matcher = await self.filter_cache.reload(interaction.guild.id)
+        except Exception as e:
+            await interaction.followup.send(
+                f"Failed to load filter rules, the previous rules stay active: {str(e)}",
+                ephemeral=True
+            )
+            return
+
+        await interaction.followup.send(
+            f"✅ Loaded {len(matcher.content_filter.rules)} filter rules, "
+            f"{len(matcher.blocked_domains)} blocked and {len(matcher.allowed_domains)} allowed domains.",
+            ephemeral=True
+        )
+
+    @app_commands.command(name="filterstats")
+    @app_commands.checks.has_permissions(manage_messages=True)
+    async def filterstats(self, interaction: discord.Interaction):
+        """Show the state of the deletion queue and the mod-log dispatcher."""
+        stats = self.deletion_queue.stats()
+        embed = discord.Embed(title="Deletion Queue", color=discord.Color.blue())
+        embed.add_field(name="Queued", value=f"{stats['depth']} in {stats['channels']} channels", inline=True)
+        embed.add_field(name="Deleted", value=f"{stats['deleted']} ({stats['failed']} failed)", inline=True)
+        embed.add_field(name="API Calls", value=f"{stats['api_calls']} in {stats['flushes']} flushes", inline=True)
+        actions = self.auto_actions.stats()
+        embed.add_field(
+            name="Automatic Actions",
+            value=f"{actions['issued']} issued, {actions['collapsed']} collapsed, {actions['failed']} failed\n"
+                  f"Average: {actions['avg_time']:.2f}s",
+            inline=False
+        )
+        embed.add_field(
+            name="Flush Latency",
+            value=f"Last: {stats['last_latency']:.2f}s\n"
+                  f"Average: {stats['avg_latency']:.2f}s\n"
+                  f"Max: {stats['max_latency']:.2f}s",
+            inline=False
+        )
+        logs = self.bot.log_dispatcher.stats()
+        embed.add_field(
+            name="Mod Log",
+            value=f"Queued: {logs['depth']} ({logs['dropped']} dropped, {logs['failed']} failed)\n"
+                  f"Sent: {logs['sent_embeds']} embeds in {logs['sent_messages']} messages\n"
+                  f"Send Latency: {logs['avg_send_latency']:.2f}s avg, {logs['max_send_latency']:.2f}s max",
+            inline=False
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
 
     @app_commands.command(name="purge")
     @app_commands.checks.has_permissions(manage_messages=True)
@@ -71,18 +202,17 @@ class MessageMod(commands.Cog):
             )
             
             # Log the action
-            if self.bot.log_channel:
-                embed = discord.Embed(
-                    title="Messages Purged",
-                    description=f"**Moderator:** {interaction.user.mention}\n"
-                              f"**Channel:** {interaction.channel.mention}\n"
-                              f"**Amount:** {len(deleted)} messages\n"
-                              f"**User Filter:** {user.mention if user else 'None'}\n"
-                              f"**Content Filter:** {contains if contains else 'None'}",
-                    color=discord.Color.blue(),
-                    timestamp=datetime.utcnow()
-                )
-                await self.bot.log_channel.send(embed=embed)
+            embed = discord.Embed(
+                title="Messages Purged",
+                description=f"**Moderator:** {interaction.user.mention}\n"
+                          f"**Channel:** {interaction.channel.mention}\n"
+                          f"**Amount:** {len(deleted)} messages\n"
+                          f"**User Filter:** {user.mention if user else 'None'}\n"
+                          f"**Content Filter:** {contains if contains else 'None'}",
+                color=discord.Color.blue(),
+                timestamp=datetime.utcnow()
+            )
+            self.bot.log_dispatcher.submit(embed)
                 
         except discord.Forbidden:
             await interaction.followup.send(
@@ -95,73 +225,301 @@ class MessageMod(commands.Cog):
                 ephemeral=True
             )
 
+    @app_commands.command(name="bulkpurge")
+    @app_commands.checks.has_permissions(manage_messages=True)
+    @app_commands.describe(
+        limit="Messages to scan per channel (1-100000)",
+        channels="Channels to purge, as mentions or IDs (defaults to this channel)",
+        user="Only delete messages from this user",
+        contains="Only delete messages containing this text",
+        regex="Only delete messages matching this regular expression",
+        newer_than="Only delete messages newer than this many minutes",
+        older_than="Only delete messages older than this many minutes",
+        before_message="Resume from this message ID (only older messages are scanned)",
+        concurrency="Channels to purge at the same time (1-5)"
+    )
+    async def bulkpurge(
+        self,
+        interaction: discord.Interaction,
+        limit: app_commands.Range[int, 1, 100000],
+        channels: Optional[str] = None,
+        user: Optional[discord.Member] = None,
+        contains: Optional[str] = None,
+        regex: Optional[str] = None,
+        newer_than: Optional[app_commands.Range[int, 1, 525600]] = None,
+        older_than: Optional[app_commands.Range[int, 1, 525600]] = None,
+        before_message: Optional[str] = None,
+        concurrency: app_commands.Range[int, 1, 5] = 2
+    ):
+        """Delete large numbers of messages across channels, with live progress."""
+        await interaction.response.defer(ephemeral=True)
+
+        resume_from = None
+        if before_message:
+            before_message = before_message.strip()
+            if not re.fullmatch(r'\d{15,20}', before_message) or \
+                    discord.utils.snowflake_time(int(before_message)) > interaction.created_at:
+                await interaction.followup.send(
+                    f"`{before_message[:100]}` is not a message ID.", ephemeral=True
+                )
+                return
+            resume_from = discord.Object(id=int(before_message))
+
+        try:
+            check = build_message_check(user, contains, regex)
+        except re.error as e:
+            await interaction.followup.send(f"Invalid regular expression: {e}", ephemeral=True)
+            return
+
+        if channels:
+            targets = []
+            for channel_id in dict.fromkeys(int(i) for i in re.findall(r'\d{15,20}', channels)):
+                channel = interaction.guild.get_channel_or_thread(channel_id)
+                if channel is not None and hasattr(channel, 'history'):
+                    targets.append(channel)
+        else:
+            targets = [interaction.channel]
+        # The moderator needs Manage Messages in every channel they purge
+        targets = [c for c in targets if c.permissions_for(interaction.user).manage_messages]
+        if not targets:
+            await interaction.followup.send(
+                "No channels to purge where you have permission to manage messages.",
+                ephemeral=True
+            )
+            return
+
+        now = datetime.now(timezone.utc)
+        before = interaction.created_at
+        if older_than:
+            before = min(before, now - timedelta(minutes=older_than))
+        # Both bounds apply, so start from whichever is earlier
+        if resume_from is not None and resume_from.created_at < before:
+            before = resume_from
+        after = now - timedelta(minutes=newer_than) if newer_than else None
+
+        purges = [ChannelPurge(channel, check, limit, before=before, after=after) for channel in targets]
+        progress = await interaction.followup.send(
+            f"Purging {len(purges)} channel(s)...",
+            ephemeral=True,
+            wait=True
+        )
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run_one(purge: ChannelPurge):
+            async with semaphore:
+                await purge.run()
+
+        def render(title: str) -> str:
+            lines = [title] + [purge.summary() for purge in purges]
+            return "\n".join(lines)[:2000]
+
+        runner = asyncio.gather(*(run_one(purge) for purge in purges))
+        # Refresh the progress message until every channel is done
+        while not runner.done():
+            await asyncio.wait([runner], timeout=3)
+            if not runner.done():
+                try:
+                    await progress.edit(content=render("Purging..."))
+                except discord.HTTPException:
+                    pass  # Progress updates are best effort
+
+        total = sum(purge.deleted for purge in purges)
+        try:
+            await progress.edit(content=render(f"Finished: deleted {total} messages."))
+        except discord.HTTPException:
+            pass  # The interaction token expires after 15 minutes; still log below
+
+        bot_logger.audit(
+            "bulkpurge",
+            str(interaction.user),
+            ", ".join(f"#{purge.channel.name}" for purge in purges),
+            details={
+                "scanned": sum(purge.scanned for purge in purges),
+                "deleted": total,
+                "user_filter": user.id if user else None,
+                "content_filter": contains,
+                "regex_filter": regex,
+                "guild": interaction.guild.name
+            },
+            user_id=interaction.user.id,
+            guild_id=interaction.guild.id
+        )
+
+        # Log the action
+        embed = discord.Embed(
+            title="Bulk Purge",
+            description=f"**Moderator:** {interaction.user.mention}\n"
+                      f"**Channels:** {', '.join(purge.channel.mention for purge in purges)}\n"
+                      f"**Scanned:** {sum(purge.scanned for purge in purges)} messages\n"
+                      f"**Deleted:** {total} messages\n"
+                      f"**User Filter:** {user.mention if user else 'None'}\n"
+                      f"**Content Filter:** {contains if contains else 'None'}\n"
+                      f"**Regex Filter:** {regex if regex else 'None'}",
+            color=discord.Color.blue(),
+            timestamp=datetime.utcnow()
+        )
+        self.bot.log_dispatcher.submit(embed)
+
+    async def handle_raid(self, message: discord.Message, raid: RaidHit):
+        """Bulk delete the copies of raid content and time out their authors."""
+        guild = message.guild
+        # Copies are deleted through the per-channel bulk deletion queue
+        queued = 0
+        for channel_id, message_id, _ in raid.messages:
+            channel = guild.get_channel_or_thread(channel_id)
+            if channel is not None:
+                self.deletion_queue.enqueue(channel, message_id, category="raid content")
+                queued += 1
+
+        members = []
+        for author_id in {author_id for _, _, author_id in raid.messages}:
+            member = guild.get_member(author_id)
+            if member and not member.is_timed_out() and not member.guild_permissions.manage_messages:
+                members.append(member)
+        duration = timedelta(minutes=self.raid_timeout)
+        results = await asyncio.gather(
+            *(
+                self.auto_actions.run(
+                    (guild.id, member.id, 'raid_timeout'),
+                    lambda member=member: member.timeout(duration, reason="Automatic timeout for raid content"),
+                    cooldown=self.raid_timeout * 60
+                )
+                for member in members
+            ),
+            return_exceptions=True
+        )
+        timed_out = sum(1 for result in results if result is True)
+
+        # Log the raid once, when it is first detected
+        if raid.new:
+            embed = discord.Embed(
+                title="Raid Detected",
+                description=f"**Channel:** {message.channel.mention}\n"
+                          f"**Accounts:** {len(members)} ({timed_out} timed out for {self.raid_timeout} minutes)\n"
+                          f"**Messages Queued for Deletion:** {queued}\n"
+                          f"**Content:** ```{message.content[:1000]}```",
+                color=discord.Color.dark_red(),
+                timestamp=datetime.utcnow()
+            )
+            self.bot.log_dispatcher.submit(embed)
+
+    async def report_spam_timeout(self, message: discord.Message):
+        """Tell the channel a spammer was timed out and log it."""
+        try:
+            await message.channel.send(
+                f"{message.author.mention} has been timed out for spamming.",
+                delete_after=10
+            )
+        except discord.HTTPException:
+            pass  # Cannot send in this channel; the timeout still stands
+        
+        # Log the action
+        embed = discord.Embed(
+            title="Auto-Timeout for Spam",
+            description=f"**User:** {message.author.mention} ({message.author.id})\n"
+                      f"**Channel:** {message.channel.mention}\n"
+                      f"**Duration:** {self.spam_timeout} minutes",
+            color=discord.Color.orange(),
+            timestamp=datetime.utcnow()
+        )
+        self.bot.log_dispatcher.submit(embed)
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        """Re-resolve filter exemptions when a member's roles change."""
+        if before.roles != after.roles:
+            self.exemptions.invalidate_member(after.guild.id, after.id)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member):
+        self.exemptions.invalidate_member(member.guild.id, member.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        """A role's permissions changed: every member holding it may be affected."""
+        if before.permissions != after.permissions:
+            self.exemptions.invalidate_guild(after.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        self.exemptions.invalidate_guild(role.guild.id)
+
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
-        """Handle message filtering and anti-spam."""
+        """Handle message filtering, raid detection and anti-spam."""
+        start = time.perf_counter()
+        try:
+            await self.check_message(message)
+        finally:
+            ON_MESSAGE_SECONDS.observe(time.perf_counter() - start)
+
+    async def check_message(self, message: discord.Message):
         if message.author.bot or isinstance(message.channel, discord.DMChannel):
             return
 
+        # Exempt channels and members skip filtering before any regex work
+        matcher = self.filter_cache.get(message.guild.id)
+        exempt = message.channel.id in matcher.exempt_channels or (
+            isinstance(message.author, discord.Member)
+            and self.exemptions.is_exempt(message.author, matcher.exempt_roles)
+        )
+
+        # Check for the same content across many accounts
+        if not exempt:
+            raid = self.raid_detector.observe(
+                message.guild.id,
+                message.channel.id,
+                message.id,
+                message.author.id,
+                message.content
+            )
+            if raid:
+                FILTER_HITS.inc(category="raid content")
+                await self.handle_raid(message, raid)
+                return
+
         # Check for spam
-        author_id = message.author.id
-        channel_id = message.channel.id
-        self.message_counts[author_id][channel_id] += 1
-        
-        if self.message_counts[author_id][channel_id] >= self.spam_threshold:
+        spam_key = (message.author.id, message.channel.id)
+        if self.spam_limiter.hit(message.guild.id, spam_key):
+            # Clear the user's message history before awaiting anything
+            self.spam_limiter.reset(spam_key)
+            FILTER_HITS.inc(category="spam")
             try:
-                # Timeout the user for spam
-                duration = timedelta(minutes=5)
-                await message.author.timeout(duration, reason="Automatic timeout for spam")
-                await message.channel.send(
-                    f"{message.author.mention} has been timed out for spamming.",
-                    delete_after=10
+                # Messages arriving while the timeout is in flight collapse into it
+                await self.auto_actions.run(
+                    (message.guild.id, message.author.id, 'spam_timeout'),
+                    lambda: message.author.timeout(
+                        timedelta(minutes=self.spam_timeout), reason="Automatic timeout for spam"
+                    ),
+                    cooldown=self.spam_timeout * 60,
+                    after=lambda: self.report_spam_timeout(message)
                 )
-                
-                # Log the action
-                if self.bot.log_channel:
-                    embed = discord.Embed(
-                        title="Auto-Timeout for Spam",
-                        description=f"**User:** {message.author.mention} ({message.author.id})\n"
-                                  f"**Channel:** {message.channel.mention}\n"
-                                  f"**Duration:** 5 minutes",
-                        color=discord.Color.orange(),
-                        timestamp=datetime.utcnow()
-                    )
-                    await self.bot.log_channel.send(embed=embed)
-                    
             except discord.Forbidden:
                 pass  # Bot doesn't have permission to timeout
-                
-            # Clear the user's message count
-            self.message_counts[author_id][channel_id] = 0
 
         # Check filtered content
-        if not message.author.guild_permissions.manage_messages:
-            content = message.content.lower()
-            for pattern, filter_type in self.filter_patterns:
-                if pattern.search(content):
-                    try:
-                        await message.delete()
-                        warning = await message.channel.send(
-                            f"{message.author.mention} Your message was removed for containing {filter_type}.",
-                            delete_after=5
-                        )
-                        
-                        # Log the action
-                        if self.bot.log_channel:
-                            embed = discord.Embed(
-                                title="Message Filtered",
-                                description=f"**User:** {message.author.mention} ({message.author.id})\n"
-                                          f"**Channel:** {message.channel.mention}\n"
-                                          f"**Filter Type:** {filter_type}\n"
-                                          f"**Content:** ```{message.content}```",
-                                color=discord.Color.yellow(),
-                                timestamp=datetime.utcnow()
-                            )
-                            await self.bot.log_channel.send(embed=embed)
-                            
-                        break
-                    except discord.Forbidden:
-                        pass  # Bot doesn't have permission to delete messages
+        if not exempt:
+            hit = matcher.check(message.content)
+            if hit and hit[1] != 'ignore':
+                filter_type, action = hit
+                FILTER_HITS.inc(category=filter_type)
+                if action == 'delete':
+                    # Deleted in a batch with a single notice per channel
+                    self.deletion_queue.enqueue(message.channel, message.id, message.author, filter_type)
+
+                # Log the action
+                embed = discord.Embed(
+                    title="Message Filtered",
+                    description=f"**User:** {message.author.mention} ({message.author.id})\n"
+                              f"**Channel:** {message.channel.mention}\n"
+                              f"**Filter Type:** {filter_type}\n"
+                              f"**Action:** {action}\n"
+                              f"**Content:** ```{message.content}```",
+                    color=discord.Color.yellow(),
+                    timestamp=datetime.utcnow()
+                )
+                self.bot.log_dispatcher.submit(embed)
 
 async def setup(bot):
     await bot.add_cog(MessageMod(bot))
\ No newline at end of file
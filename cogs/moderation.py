@@ -2,13 +2,175 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import asyncio
+import io
+import time
+from collections import Counter
 from datetime import datetime, timedelta
 from typing import Optional
+from utils.bulk_action import MAX_FILE_SIZE, MAX_TARGETS, BulkAction, filter_members, parse_ids, plan
 from utils.logger import bot_logger
+from utils.scheduler import Job
+
+# Permission a moderator needs for each bulk action
+BULK_PERMISSIONS = {"ban": "ban_members", "kick": "kick_members", "timeout": "moderate_members"}
 
 class Moderation(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        bot.scheduler.register("unban", self.expire_ban)
+
+    # The actions themselves, shared by the commands and automatic escalation.
+    # Each writes the audit entry and the mod-log embed; discord.Forbidden propagates.
+
+    async def kick_member(self, member: discord.Member, moderator: discord.abc.User, reason: str,
+                          details: Optional[dict] = None):
+        """Kick a member on ``moderator``'s behalf."""
+        await member.kick(reason=f"{reason} - By {moderator}")
+
+        # Log audit
+        bot_logger.audit(
+            "kick",
+            str(moderator),
+            str(member),
+            details={
+                "reason": reason,
+                "guild": member.guild.name,
+                **(details or {})
+            },
+            user_id=moderator.id,
+            target_id=member.id,
+            guild_id=member.guild.id
+        )
+
+        # Discord audit log
+        embed = discord.Embed(
+            title="Member Kicked",
+            description=f"**Member:** {member.mention} ({member.id})\n"
+                      f"**Moderator:** {moderator.mention}\n"
+                      f"**Reason:** {reason}",
+            color=discord.Color.red(),
+            timestamp=datetime.utcnow()
+        )
+        self.bot.log_dispatcher.submit(embed)
+
+    async def ban_member(self, member: discord.Member, moderator: discord.abc.User, reason: str,
+                         delete_messages: int = 0, details: Optional[dict] = None):
+        """Ban a member on ``moderator``'s behalf."""
+        await member.ban(
+            reason=f"{reason} - By {moderator}",
+            delete_message_days=delete_messages
+        )
+
+        # Log audit
+        bot_logger.audit(
+            "ban",
+            str(moderator),
+            str(member),
+            details={
+                "reason": reason,
+                "delete_messages_days": delete_messages,
+                "guild": member.guild.name,
+                **(details or {})
+            },
+            user_id=moderator.id,
+            target_id=member.id,
+            guild_id=member.guild.id
+        )
+
+        # Discord audit log
+        embed = discord.Embed(
+            title="Member Banned",
+            description=f"**Member:** {member.mention} ({member.id})\n"
+                      f"**Moderator:** {moderator.mention}\n"
+                      f"**Reason:** {reason}\n"
+                      f"**Message Delete Days:** {delete_messages}",
+            color=discord.Color.dark_red(),
+            timestamp=datetime.utcnow()
+        )
+        self.bot.log_dispatcher.submit(embed)
+
+    async def update_unban(self, guild_id: int, user_id: int, hours: Optional[int], reason: str) -> Optional[str]:
+        """Schedule the unban for a temporary ban, or drop one that an earlier
+        temporary ban left behind. Never raises; returns a warning for the
+        moderator if the scheduler could not be updated."""
+        try:
+            if hours:
+                # Stored on disk, so the unban survives restarts
+                await self.bot.scheduler.schedule("unban", guild_id, user_id, time.time() + hours * 3600, reason=reason)
+            else:
+                await self.bot.scheduler.cancel("unban", guild_id, user_id)
+        except Exception as e:
+            bot_logger.system(f"Failed to update the scheduled unban of {user_id}", operation="scheduler", error=e)
+            if hours:
+                return "⚠️ The unban could not be scheduled, so this ban stays until it is lifted by hand."
+            return "⚠️ An unban left by an earlier temporary ban could not be cancelled."
+        return None
+
+    async def expire_ban(self, job: Job):
+        """Lift a temporary ban; run by the scheduler, possibly more than once."""
+        guild = self.bot.get_guild(job.guild_id)
+        if guild is None:
+            return  # The bot has left the server
+        # Raises NotFound if the ban was already lifted, which ends the job
+        await guild.unban(discord.Object(id=job.user_id), reason="Temporary ban expired")
+
+        # Log audit
+        bot_logger.audit(
+            "unban",
+            str(self.bot.user),
+            str(job.user_id),
+            details={
+                "reason": "Temporary ban expired",
+                "ban_reason": job.reason,
+                "guild": guild.name
+            },
+            user_id=self.bot.user.id,
+            target_id=job.user_id,
+            guild_id=guild.id
+        )
+
+        # Discord audit log
+        embed = discord.Embed(
+            title="Temporary Ban Expired",
+            description=f"**User:** <@{job.user_id}> ({job.user_id})\n"
+                      f"**Ban Reason:** {job.reason}",
+            color=discord.Color.green(),
+            timestamp=datetime.utcnow()
+        )
+        self.bot.log_dispatcher.submit(embed)
+
+    async def timeout_member(self, member: discord.Member, moderator: discord.abc.User, duration: int,
+                             reason: str, details: Optional[dict] = None):
+        """Time a member out for ``duration`` minutes."""
+        await member.timeout(timedelta(minutes=duration), reason=f"{reason} - By {moderator}")
+
+        # Log audit
+        bot_logger.audit(
+            "timeout",
+            str(moderator),
+            str(member),
+            details={
+                "duration": duration,
+                "reason": reason,
+                "guild": member.guild.name,
+                **(details or {})
+            },
+            user_id=moderator.id,
+            target_id=member.id,
+            guild_id=member.guild.id
+        )
+
+        # Discord audit log
+        embed = discord.Embed(
+            title="Member Timed Out",
+            description=f"**Member:** {member.mention} ({member.id})\n"
+                      f"**Moderator:** {moderator.mention}\n"
+                      f"**Duration:** {duration} minutes\n"
+                      f"**Reason:** {reason}",
+            color=discord.Color.orange(),
+            timestamp=datetime.utcnow()
+        )
+        self.bot.log_dispatcher.submit(embed)
 
     @app_commands.command(name="kick")
     @app_commands.checks.has_permissions(kick_members=True)
@@ -65,7 +227,7 @@ class Moderation(commands.Cog):
                 return
 
             try:
-                await member.kick(reason=f"{reason} - By {interaction.user}")
+                await self.kick_member(member, interaction.user, reason)
                 await button_interaction.response.edit_message(
                     content=f"✅ Kicked {member.mention} | Reason: {reason}",
                     view=None
@@ -84,29 +246,6 @@ class Moderation(commands.Cog):
                     }
                 )
 
-                # Log audit
-                bot_logger.audit(
-                    "kick",
-                    str(interaction.user),
-                    str(member),
-                    details={
-                        "reason": reason,
-                        "guild": interaction.guild.name
-                    }
-                )
-                
-                # Discord audit log
-                if self.bot.log_channel:
-                    embed = discord.Embed(
-                        title="Member Kicked",
-                        description=f"**Member:** {member.mention} ({member.id})\n"
-                                  f"**Moderator:** {interaction.user.mention}\n"
-                                  f"**Reason:** {reason}",
-                        color=discord.Color.red(),
-                        timestamp=datetime.utcnow()
-                    )
-                    await self.bot.log_channel.send(embed=embed)
-                    
             except discord.Forbidden as e:
                 await button_interaction.response.edit_message(
                     content="I don't have permission to kick that member.",
@@ -156,14 +295,16 @@ class Moderation(commands.Cog):
     @app_commands.describe(
         member="The member to ban",
         reason="The reason for banning the member",
-        delete_messages="Number of days of messages to delete (0-7)"
+        delete_messages="Number of days of messages to delete (0-7)",
+        hours="Lift the ban after this many hours (default: permanent)"
     )
     async def ban(
         self,
         interaction: discord.Interaction,
         member: discord.Member,
         reason: Optional[str] = "No reason provided",
-        delete_messages: app_commands.Range[int, 0, 7] = 0
+        delete_messages: app_commands.Range[int, 0, 7] = 0,
+        hours: Optional[app_commands.Range[int, 1, 8760]] = None  # Max a year
     ):
         """Ban a member from the server."""
         # Log command initiation
@@ -176,7 +317,8 @@ class Moderation(commands.Cog):
                 "target_user": str(member),
                 "target_id": member.id,
                 "reason": reason,
-                "delete_messages_days": delete_messages
+                "delete_messages_days": delete_messages,
+                "duration_hours": hours
             }
         )
 
@@ -207,13 +349,17 @@ class Moderation(commands.Cog):
                 )
                 return
 
+            # The ban and the scheduler's disk write can outlast the 3 second deadline
+            await button_interaction.response.defer()
             try:
-                await member.ban(
-                    reason=f"{reason} - By {interaction.user}",
-                    delete_message_days=delete_messages
+                await self.ban_member(
+                    member, interaction.user, reason, delete_messages,
+                    details={"duration_hours": hours} if hours else None
                 )
-                await button_interaction.response.edit_message(
-                    content=f"✅ Banned {member.mention} | Reason: {reason}",
+                warning = await self.update_unban(interaction.guild.id, member.id, hours, reason)
+                await button_interaction.edit_original_response(
+                    content=f"✅ Banned {member.mention}{f' for {hours} hours' if hours else ''} | Reason: {reason}"
+                            + (f"\n{warning}" if warning else ""),
                     view=None
                 )
 
@@ -231,33 +377,8 @@ class Moderation(commands.Cog):
                     }
                 )
 
-                # Log audit
-                bot_logger.audit(
-                    "ban",
-                    str(interaction.user),
-                    str(member),
-                    details={
-                        "reason": reason,
-                        "delete_messages_days": delete_messages,
-                        "guild": interaction.guild.name
-                    }
-                )
-                
-                # Discord audit log
-                if self.bot.log_channel:
-                    embed = discord.Embed(
-                        title="Member Banned",
-                        description=f"**Member:** {member.mention} ({member.id})\n"
-                                  f"**Moderator:** {interaction.user.mention}\n"
-                                  f"**Reason:** {reason}\n"
-                                  f"**Message Delete Days:** {delete_messages}",
-                        color=discord.Color.dark_red(),
-                        timestamp=datetime.utcnow()
-                    )
-                    await self.bot.log_channel.send(embed=embed)
-                    
             except discord.Forbidden as e:
-                await button_interaction.response.edit_message(
+                await button_interaction.edit_original_response(
                     content="I don't have permission to ban that member.",
                     view=None
                 )
@@ -295,7 +416,7 @@ class Moderation(commands.Cog):
         cancel.callback = cancel_callback
 
         await interaction.response.send_message(
-            f"Are you sure you want to ban {member.mention}?",
+            f"Are you sure you want to ban {member.mention}{f' for {hours} hours' if hours else ''}?",
             view=view,
             ephemeral=True
         )
@@ -344,10 +465,8 @@ class Moderation(commands.Cog):
             return
 
         try:
-            # Convert minutes to timedelta
-            timeout_duration = timedelta(minutes=duration)
-            await member.timeout(timeout_duration, reason=f"{reason} - By {interaction.user}")
-            
+            await self.timeout_member(member, interaction.user, duration, reason)
+
             await interaction.response.send_message(
                 f"✅ {member.mention} has been timed out for {duration} minutes | Reason: {reason}",
                 ephemeral=True
@@ -367,31 +486,6 @@ class Moderation(commands.Cog):
                 }
             )
 
-            # Log audit
-            bot_logger.audit(
-                "timeout",
-                str(interaction.user),
-                str(member),
-                details={
-                    "duration": duration,
-                    "reason": reason,
-                    "guild": interaction.guild.name
-                }
-            )
-            
-            # Discord audit log
-            if self.bot.log_channel:
-                embed = discord.Embed(
-                    title="Member Timed Out",
-                    description=f"**Member:** {member.mention} ({member.id})\n"
-                              f"**Moderator:** {interaction.user.mention}\n"
-                              f"**Duration:** {duration} minutes\n"
-                              f"**Reason:** {reason}",
-                    color=discord.Color.orange(),
-                    timestamp=datetime.utcnow()
-                )
-                await self.bot.log_channel.send(embed=embed)
-                
         except discord.Forbidden as e:
             await interaction.response.send_message(
                 "I don't have permission to timeout that member.",
@@ -405,5 +499,221 @@ class Moderation(commands.Cog):
                 error=e
             )
 
+    @app_commands.command(name="bulkaction")
+    # Hidden from members who cannot moderate; each action's own permission is checked below
+    @app_commands.default_permissions(moderate_members=True)
+    @app_commands.describe(
+        action="What to do to every account",
+        ids="User IDs or mentions, separated by anything",
+        file="A text file of user IDs",
+        joined_within="Also target members who joined in the last N minutes",
+        account_age="Only target accounts younger than N minutes (with joined_within, or on its own)",
+        reason="The reason recorded for every account",
+        duration="Timeout length in minutes",
+        delete_messages="Days of messages to delete, for bans (0-7)",
+        concurrency="Requests in flight at once (1-5)"
+    )
+    @app_commands.choices(action=[
+        app_commands.Choice(name="Ban", value="ban"),
+        app_commands.Choice(name="Kick", value="kick"),
+        app_commands.Choice(name="Timeout", value="timeout"),
+    ])
+    async def bulkaction(
+        self,
+        interaction: discord.Interaction,
+        action: app_commands.Choice[str],
+        ids: Optional[str] = None,
+        file: Optional[discord.Attachment] = None,
+        joined_within: Optional[app_commands.Range[int, 1, 525600]] = None,
+        account_age: Optional[app_commands.Range[int, 1, 525600]] = None,
+        reason: Optional[str] = "No reason provided",
+        duration: app_commands.Range[int, 1, 40320] = 60,  # Max 28 days
+        delete_messages: app_commands.Range[int, 0, 7] = 0,
+        concurrency: app_commands.Range[int, 1, 5] = 3
+    ):
+        """Ban, kick or time out many accounts at once, e.g. after a raid."""
+        permission = BULK_PERMISSIONS[action.value]
+        if not getattr(interaction.user.guild_permissions, permission):
+            await interaction.response.send_message(
+                f"You need the {permission.replace('_', ' ').title()} permission to do that.",
+                ephemeral=True
+            )
+            return
+        await interaction.response.defer(ephemeral=True)
+
+        user_ids = parse_ids(ids) if ids else []
+        if file:
+            if file.size > MAX_FILE_SIZE:
+                await interaction.followup.send("That file is too large (1 MB at most).", ephemeral=True)
+                return
+            user_ids += parse_ids((await file.read()).decode(errors="ignore"))
+        if joined_within or account_age:
+            user_ids += filter_members(interaction.guild.members, joined_within, account_age)
+        user_ids = list(dict.fromkeys(user_ids))
+        if not user_ids:
+            await interaction.followup.send("No accounts matched.", ephemeral=True)
+            return
+        if len(user_ids) > MAX_TARGETS:
+            await interaction.followup.send(
+                f"{len(user_ids)} accounts matched; at most {MAX_TARGETS} can be handled at once.",
+                ephemeral=True
+            )
+            return
+
+        targets, skipped = plan(interaction.guild, interaction.user, action.value, user_ids)
+        reasons = Counter(target.detail for target in skipped)
+        skipped_line = (
+            f"\n{len(skipped)} skipped: " + ", ".join(f"{count} {detail}" for detail, count in reasons.most_common())
+            if skipped else ""
+        )
+        if not targets:
+            await interaction.followup.send(f"Nothing to do.{skipped_line}"[:2000], ephemeral=True)
+            return
+
+        bulk = BulkAction(
+            interaction.guild,
+            interaction.user,
+            action.value,
+            targets,
+            reason,
+            duration=duration,
+            delete_messages=delete_messages,
+            concurrency=concurrency
+        )
+        bot_logger.command(
+            "bulkaction",
+            str(interaction.user),
+            interaction.guild.name,
+            status="started",
+            details={"action": action.value, "targets": len(targets), "skipped": len(skipped), "reason": reason}
+        )
+
+        # One confirmation for the whole list
+        confirm = discord.ui.Button(label="Confirm", style=discord.ButtonStyle.danger)
+        cancel = discord.ui.Button(label="Cancel", style=discord.ButtonStyle.secondary)
+        view = discord.ui.View(timeout=60)
+        view.add_item(confirm)
+        view.add_item(cancel)
+
+        async def confirm_callback(button_interaction):
+            if button_interaction.user != interaction.user:
+                await button_interaction.response.send_message(
+                    "You cannot use this button.", ephemeral=True
+                )
+                return
+
+            view.stop()
+            await button_interaction.response.edit_message(
+                content=f"Starting: {action.name.lower()} {len(targets)} accounts...",
+                view=None
+            )
+            runner = asyncio.create_task(bulk.run())
+            # Refresh the progress message until every account is done
+            while not runner.done():
+                await asyncio.wait([runner], timeout=3)
+                if not runner.done():
+                    try:
+                        await progress.edit(content=f"Working... {bulk.summary()}")
+                    except discord.HTTPException:
+                        pass  # Progress updates are best effort
+
+            warning = ""
+            if action.value == "ban":
+                # These bans are permanent; drop unbans left by earlier temporary bans
+                banned = [target.user_id for target in targets if target.result == "done"]
+                try:
+                    await self.bot.scheduler.cancel_many("unban", interaction.guild.id, banned)
+                except Exception as e:
+                    bot_logger.system("Failed to cancel scheduled unbans", operation="scheduler", error=e)
+                    warning = "\n⚠️ Unbans left by earlier temporary bans could not be cancelled."
+
+            try:
+                await progress.edit(content=f"Finished in {bulk.elapsed:.0f}s: {bulk.summary()}{skipped_line}{warning}"[:2000])
+            except discord.HTTPException:
+                pass  # The interaction token expires after 15 minutes
+
+            report = bulk.report(skipped).encode()
+            filename = f"bulk-{action.value}-{datetime.utcnow():%Y%m%d-%H%M%S}.csv"
+            # A long run outlives the interaction token; then the report goes
+            # to the moderator's DMs, or failing that to the log channel
+            destinations = [
+                lambda file: interaction.followup.send("Results for every account:", file=file, ephemeral=True),
+                lambda file: interaction.user.send(
+                    f"Results of your bulk {action.name.lower()} in {interaction.guild.name}:", file=file
+                ),
+            ]
+            if self.bot.log_channel is not None:
+                destinations.append(lambda file: self.bot.log_channel.send(
+                    f"Results of a bulk {action.name.lower()} by {interaction.user.mention}:",
+                    file=file,
+                    allowed_mentions=discord.AllowedMentions.none()
+                ))
+            for send in destinations:
+                try:
+                    await send(discord.File(io.BytesIO(report), filename=filename))
+                    break
+                except discord.HTTPException:
+                    continue
+            else:
+                bot_logger.system("Could not deliver the bulk action report", operation="bulkaction")
+
+            bot_logger.command(
+                "bulkaction",
+                str(interaction.user),
+                interaction.guild.name,
+                status="completed",
+                details={
+                    "action": action.value,
+                    "succeeded": bulk.succeeded,
+                    "failed": bulk.failed,
+                    "skipped": len(skipped),
+                    "elapsed": round(bulk.elapsed, 1)
+                }
+            )
+
+            # Discord audit log; the per-account entries are in the audit log file
+            embed = discord.Embed(
+                title="Bulk Action",
+                description=f"**Action:** {action.name}\n"
+                          f"**Moderator:** {interaction.user.mention}\n"
+                          f"**Reason:** {reason}\n"
+                          f"**Succeeded:** {bulk.succeeded}\n"
+                          f"**Failed:** {bulk.failed}\n"
+                          f"**Skipped:** {len(skipped)}",
+                color=discord.Color.dark_red(),
+                timestamp=datetime.utcnow()
+            )
+            self.bot.log_dispatcher.submit(embed)
+
+        async def cancel_callback(button_interaction):
+            if button_interaction.user != interaction.user:
+                await button_interaction.response.send_message(
+                    "You cannot use this button.", ephemeral=True
+                )
+                return
+
+            view.stop()
+            await button_interaction.response.edit_message(
+                content="❌ Bulk action cancelled.",
+                view=None
+            )
+            bot_logger.command(
+                "bulkaction",
+                str(interaction.user),
+                interaction.guild.name,
+                status="cancelled",
+                details={"action": action.value, "targets": len(targets)}
+            )
+
+        confirm.callback = confirm_callback
+        cancel.callback = cancel_callback
+
+        progress = await interaction.followup.send(
+            f"Are you sure you want to {action.name.lower()} **{len(targets)}** accounts?{skipped_line}"[:2000],
+            view=view,
+            ephemeral=True,
+            wait=True
+        )
+
 async def setup(bot):
-    await bot.add_cog(Moderation(bot))
\ No newline at end of file
+    await bot.add_cog(Moderation(bot))
@@ -1,24 +1,71 @@
 import discord
+import time
 from discord.ext import commands
 from discord import app_commands
 from typing import Optional
 from datetime import datetime
+from utils.logger import bot_logger
+from utils.scheduler import Job
 
 class Roles(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        bot.scheduler.register("remove_role", self.expire_role)
+
+    async def update_removal(self, member: discord.Member, role: discord.Role, hours: Optional[int]) -> Optional[str]:
+        """Schedule the removal of a temporary role, or drop one left by an
+        earlier temporary grant. Never raises; returns a warning for the
+        moderator if the scheduler could not be updated."""
+        try:
+            if hours:
+                # Stored on disk, so the removal survives restarts
+                await self.bot.scheduler.schedule(
+                    "remove_role", member.guild.id, member.id, time.time() + hours * 3600, role_id=role.id
+                )
+            else:
+                await self.bot.scheduler.cancel("remove_role", member.guild.id, member.id, role.id)
+        except Exception as e:
+            bot_logger.system(f"Failed to update the scheduled removal of role {role.id}", operation="scheduler", error=e)
+            if hours:
+                return "⚠️ The removal could not be scheduled, so the role stays until it is removed by hand."
+            return "⚠️ A removal left by an earlier temporary grant could not be cancelled."
+        return None
+
+    async def expire_role(self, job: Job):
+        """Take back a temporary role; run by the scheduler, possibly more than once."""
+        guild = self.bot.get_guild(job.guild_id)
+        if guild is None:
+            return  # The bot has left the server
+        member = guild.get_member(job.user_id)
+        role = guild.get_role(job.role_id)
+        if member is None or role is None or role not in member.roles:
+            return  # Nothing left to remove
+
+        await member.remove_roles(role, reason="Temporary role expired")
+
+        # Log the action
+        embed = discord.Embed(
+            title="Temporary Role Expired",
+            description=f"**Member:** {member.mention} ({member.id})\n"
+                      f"**Role:** {role.mention}",
+            color=discord.Color.red(),
+            timestamp=datetime.utcnow()
+        )
+        self.bot.log_dispatcher.submit(embed)
 
     @app_commands.command(name="addrole")
     @app_commands.checks.has_permissions(manage_roles=True)
     @app_commands.describe(
         member="The member to add the role to",
-        role="The role to add"
+        role="The role to add",
+        hours="Remove the role again after this many hours (default: keep it)"
     )
     async def addrole(
         self,
         interaction: discord.Interaction,
         member: discord.Member,
-        role: discord.Role
+        role: discord.Role,
+        hours: Optional[app_commands.Range[int, 1, 8760]] = None  # Max a year
     ):
         """Add a role to a member."""
         if role >= interaction.user.top_role and not interaction.user.guild_permissions.administrator:
@@ -28,34 +75,43 @@ class Roles(commands.Cog):
             )
             return
 
+        # The scheduler writes to disk, which can outlast the 3 second deadline
+        await interaction.response.defer(ephemeral=True)
+
         if role in member.roles:
-            await interaction.response.send_message(
-                f"{member.mention} already has the {role.mention} role.",
+            # Adding it again sets a new duration, or without one makes it permanent
+            warning = await self.update_removal(member, role, hours)
+            await interaction.followup.send(
+                f"{member.mention} already has the {role.mention} role"
+                + (f"; it will now be removed in {hours} hours." if hours else "; it is now permanent.")
+                + (f"\n{warning}" if warning else ""),
                 ephemeral=True
             )
             return
 
         try:
             await member.add_roles(role, reason=f"Role added by {interaction.user}")
-            await interaction.response.send_message(
-                f"✅ Added {role.mention} to {member.mention}",
+            warning = await self.update_removal(member, role, hours)
+            await interaction.followup.send(
+                f"✅ Added {role.mention} to {member.mention}" + (f" for {hours} hours" if hours else "")
+                + (f"\n{warning}" if warning else ""),
                 ephemeral=True
             )
 
             # Log the action
-            if self.bot.log_channel:
-                embed = discord.Embed(
-                    title="Role Added",
-                    description=f"**Member:** {member.mention} ({member.id})\n"
-                              f"**Role:** {role.mention}\n"
-                              f"**Moderator:** {interaction.user.mention}",
-                    color=discord.Color.green(),
-                    timestamp=datetime.utcnow()
-                )
-                await self.bot.log_channel.send(embed=embed)
+            embed = discord.Embed(
+                title="Role Added",
+                description=f"**Member:** {member.mention} ({member.id})\n"
+                          f"**Role:** {role.mention}\n"
+                          f"**Moderator:** {interaction.user.mention}"
+                          + (f"\n**Duration:** {hours} hours" if hours else ""),
+                color=discord.Color.green(),
+                timestamp=datetime.utcnow()
+            )
+            self.bot.log_dispatcher.submit(embed)
 
         except discord.Forbidden:
-            await interaction.response.send_message(
+            await interaction.followup.send(
                 "I don't have permission to add that role.",
                 ephemeral=True
             )
@@ -87,27 +143,30 @@ class Roles(commands.Cog):
             )
             return
 
+        # The scheduler writes to disk, which can outlast the 3 second deadline
+        await interaction.response.defer(ephemeral=True)
         try:
             await member.remove_roles(role, reason=f"Role removed by {interaction.user}")
-            await interaction.response.send_message(
+            # A pending timed removal has nothing left to do
+            await self.update_removal(member, role, None)
+            await interaction.followup.send(
                 f"✅ Removed {role.mention} from {member.mention}",
                 ephemeral=True
             )
 
             # Log the action
-            if self.bot.log_channel:
-                embed = discord.Embed(
-                    title="Role Removed",
-                    description=f"**Member:** {member.mention} ({member.id})\n"
-                              f"**Role:** {role.mention}\n"
-                              f"**Moderator:** {interaction.user.mention}",
-                    color=discord.Color.red(),
-                    timestamp=datetime.utcnow()
-                )
-                await self.bot.log_channel.send(embed=embed)
+            embed = discord.Embed(
+                title="Role Removed",
+                description=f"**Member:** {member.mention} ({member.id})\n"
+                          f"**Role:** {role.mention}\n"
+                          f"**Moderator:** {interaction.user.mention}",
+                color=discord.Color.red(),
+                timestamp=datetime.utcnow()
+            )
+            self.bot.log_dispatcher.submit(embed)
 
         except discord.Forbidden:
-            await interaction.response.send_message(
+            await interaction.followup.send(
                 "I don't have permission to remove that role.",
                 ephemeral=True
             )
@@ -159,19 +218,18 @@ class Roles(commands.Cog):
             )
 
             # Log the action
-            if self.bot.log_channel:
-                embed = discord.Embed(
-                    title="Role Created",
-                    description=f"**Role:** {role.mention}\n"
-                              f"**Name:** {name}\n"
-                              f"**Color:** {color if color else 'Default'}\n"
-                              f"**Hoisted:** {hoist}\n"
-                              f"**Mentionable:** {mentionable}\n"
-                              f"**Moderator:** {interaction.user.mention}",
-                    color=role_color,
-                    timestamp=datetime.utcnow()
-                )
-                await self.bot.log_channel.send(embed=embed)
+            embed = discord.Embed(
+                title="Role Created",
+                description=f"**Role:** {role.mention}\n"
+                          f"**Name:** {name}\n"
+                          f"**Color:** {color if color else 'Default'}\n"
+                          f"**Hoisted:** {hoist}\n"
+                          f"**Mentionable:** {mentionable}\n"
+                          f"**Moderator:** {interaction.user.mention}",
+                color=role_color,
+                timestamp=datetime.utcnow()
+            )
+            self.bot.log_dispatcher.submit(embed)
 
         except discord.Forbidden:
             await interaction.response.send_message(
@@ -204,16 +262,15 @@ class Roles(commands.Cog):
             )
 
             # Log the action
-            if self.bot.log_channel:
-                embed = discord.Embed(
-                    title="Role Deleted",
-                    description=f"**Role Name:** {role_name}\n"
-                              f"**Role ID:** {role.id}\n"
-                              f"**Moderator:** {interaction.user.mention}",
-                    color=discord.Color.red(),
-                    timestamp=datetime.utcnow()
-                )
-                await self.bot.log_channel.send(embed=embed)
+            embed = discord.Embed(
+                title="Role Deleted",
+                description=f"**Role Name:** {role_name}\n"
+                          f"**Role ID:** {role.id}\n"
+                          f"**Moderator:** {interaction.user.mention}",
+                color=discord.Color.red(),
+                timestamp=datetime.utcnow()
+            )
+            self.bot.log_dispatcher.submit(embed)
 
         except discord.Forbidden:
             await interaction.response.send_message(
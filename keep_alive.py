@@ -1,6 +1,11 @@
-from flask import Flask, request
+import hmac
+import math
+import os
+from flask import Flask, Response, abort, request
 from threading import Thread
 from datetime import datetime
+from utils.metrics import CONTENT_TYPE, metrics
+from utils.profiler import ProfilerBusy, profile_cpu, profile_memory
 
 app = Flask('')
 
@@ -12,6 +17,35 @@ def home():
 
     return '✅ Times Bot is alive!'
 
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), content_type=CONTENT_TYPE)
+
+@app.route('/debug/profile')
+def profile_endpoint():
+    """Profile the process, e.g. curl -H "Authorization: Bearer $ADMIN_TOKEN" ...?seconds=10&mode=cpu"""
+    # Admin routes are disabled unless ADMIN_TOKEN is set
+    token = os.getenv('ADMIN_TOKEN')
+    if not token:
+        abort(404)
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    if not hmac.compare_digest(supplied.encode(), token.encode()):
+        abort(403)
+
+    seconds = request.args.get('seconds', 10, type=float)
+    # float() accepts "nan" and "inf", which the duration clamp cannot bound
+    if not math.isfinite(seconds):
+        abort(400)
+    try:
+        if request.args.get('mode') == 'memory':
+            body = profile_memory(seconds)
+        else:
+            profile = profile_cpu(seconds)
+            body = profile.collapsed() if request.args.get('format') == 'collapsed' else profile.report()
+    except ProfilerBusy:
+        abort(409)
+    return Response(body, content_type="text/plain; charset=utf-8")
+
 def run():
     app.run(host='0.0.0.0', port=3000)
 
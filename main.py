@@ -5,6 +5,10 @@ from dotenv import load_dotenv
 import traceback
 from pathlib import Path
 from utils.logger import bot_logger
+from utils.log_dispatcher import LogDispatcher
+from utils.loop_watchdog import LoopWatchdog
+from utils.scheduler import JobScheduler
+from utils.instrumentation import InstrumentedCommandTree, instrument_rest, loop_gauges, register_bot_gauges
 import platform
 from datetime import datetime
 from keep_alive import keep_alive
@@ -12,6 +16,7 @@ from keep_alive import keep_alive
 # Load environment variables
 load_dotenv()
 TOKEN = os.getenv('DISCORD_TOKEN')
+bot_logger.set_level(os.getenv('LOG_LEVEL', 'DEBUG'))
 LOG_CHANNEL = int(os.getenv('LOG_CHANNEL_ID'))
 
 # Setup bot intents
@@ -26,8 +31,15 @@ class ModBot(commands.Bot):
             command_prefix=None,  # No prefix needed for slash commands
             intents=intents,
             help_command=None,  # We'll implement our own help command
+            tree_cls=InstrumentedCommandTree,  # Times every slash command
         )
         self.log_channel = None
+        # Mod-log embeds are queued here and sent in batches
+        self.log_dispatcher = LogDispatcher(self)
+        # Samples event-loop lag and records what blocked the loop
+        self.loop_watchdog = LoopWatchdog()
+        # Timed unbans and role removals, kept on disk across restarts
+        self.scheduler = JobScheduler("data/jobs.db")
 
     async def setup_hook(self):
         """Setup hook that runs when the bot starts."""
@@ -37,6 +49,14 @@ class ModBot(commands.Bot):
             operation="startup"
         )
 
+        self.log_dispatcher.start()
+        self.loop_watchdog.start()
+        # Export REST, cache and queue figures on /metrics
+        instrument_rest(self)
+        register_bot_gauges(self)
+        # Opened before the cogs, which register their job handlers
+        await self.scheduler.open()
+
         # Load all cogs
         await self.load_cogs()
         
@@ -98,6 +118,25 @@ class ModBot(commands.Bot):
                 "Log channel not found!",
                 operation="setup_log_channel"
             )
+            # Nowhere to send mod-log embeds; stop queueing them
+            self.log_dispatcher.disable()
+        else:
+            self.log_dispatcher.enabled = True
+
+        # Jobs act on guilds, so they only run once the guild cache is filled
+        self.scheduler.start()
+
+    async def on_app_command_completion(self, interaction: discord.Interaction, command):
+        """Record the timing of a slash command that finished without error."""
+        self.tree.finish(interaction, "success")
+
+    async def close(self):
+        """Flush queued mod-log embeds before disconnecting."""
+        await self.loop_watchdog.stop()
+        await loop_gauges.stop()
+        await self.scheduler.close()
+        await self.log_dispatcher.stop()
+        await super().close()
 
     async def on_command_error(self, ctx, error):
         """Global error handler for commands."""
@@ -190,3 +229,5 @@ if __name__ == "__main__":
         bot_logger.system("Bot shutdown initiated by user", operation="shutdown")
     except Exception as e:
         bot_logger.system("Bot crashed", operation="crash", error=e)
+    finally:
+        bot_logger.shutdown()
@@ -0,0 +1,6 @@
+from utils.logger import bot_logger
+
+
+def pytest_sessionfinish(session, exitstatus):
+    # Stop the listener while pytest's captured stdout is still open
+    bot_logger.shutdown()
@@ -0,0 +1,39 @@
+from utils.escalation import EscalationRule, evaluate, order
+
+DAY = 86400
+
+
+def warnings(*ages, now=100 * DAY):
+    """Active warnings created ``ages`` seconds before ``now``, newest first."""
+    return [{'active': True, 'created_at': now - age} for age in ages]
+
+
+def test_rule_fires_only_on_the_warning_that_crosses_it():
+    rules = order([EscalationRule(3, 7 * DAY, 'timeout', 60)])
+    now = 100 * DAY
+    assert evaluate(rules, warnings(0, 10), now) is None
+    assert evaluate(rules, warnings(0, 10, 20), now) is rules[0]
+    # Further warnings inside the same window do not repeat the timeout
+    assert evaluate(rules, warnings(0, 10, 20, 30), now) is None
+    assert evaluate(rules, warnings(0, 10, 20, 30, 40), now) is None
+
+
+def test_rule_fires_again_once_the_window_has_cleared():
+    rules = order([EscalationRule(2, DAY, 'timeout', 60)])
+    now = 100 * DAY
+    assert evaluate(rules, warnings(0, 10, 2 * DAY), now) is rules[0]
+
+
+def test_stronger_rule_fires_when_its_own_threshold_is_crossed():
+    rules = order([EscalationRule(2, 7 * DAY, 'timeout', 60), EscalationRule(4, 7 * DAY, 'kick')])
+    now = 100 * DAY
+    assert evaluate(rules, warnings(0, 10), now).action == 'timeout'
+    assert evaluate(rules, warnings(0, 10, 20), now) is None
+    assert evaluate(rules, warnings(0, 10, 20, 30), now).action == 'kick'
+
+
+def test_expired_warnings_do_not_count():
+    rules = order([EscalationRule(2, 7 * DAY, 'timeout', 60)])
+    recent = warnings(0, 10)
+    recent[1]['active'] = False
+    assert evaluate(rules, recent, 100 * DAY) is None
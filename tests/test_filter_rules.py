@@ -0,0 +1,28 @@
+import pytest
+
+from utils.filter_rules import compile_rule_set, extract_hosts
+
+
+def test_extract_hosts_drops_userinfo_and_port():
+    assert extract_hosts("https://google.com@evil.com/x") == ["evil.com"]
+    assert extract_hosts("https://user:pw@evil.com") == ["evil.com"]
+    assert extract_hosts("http://evil.com:8080/path and www.example.org") == ["evil.com", "www.example.org"]
+    assert extract_hosts("https://evil.com\\@google.com") == ["evil.com"]
+
+
+def test_userinfo_cannot_hide_a_blocked_domain():
+    guild_filter = compile_rule_set({'domains': {'block': ['evil.com']}}, [])
+    assert guild_filter.check("https://google.com@evil.com/x") == ('blocked links', 'delete')
+    assert guild_filter.check("https://user:pw@evil.com") == ('blocked links', 'delete')
+    assert guild_filter.check("https://evil.com@google.com/x") is None
+
+
+@pytest.mark.parametrize('pattern', [r'(a)\1x', '(?i)free nitro', '(?P<word>nitro)', '(a)?(?(1)b|c)'])
+def test_patterns_the_combined_scanner_cannot_hold_are_refused(pattern):
+    with pytest.raises(ValueError):
+        compile_rule_set({'regex': [{'pattern': pattern, 'category': 'scams'}]}, [])
+
+
+def test_scoped_flags_and_plain_groups_are_accepted():
+    guild_filter = compile_rule_set({'regex': [{'pattern': r'(free|cheap)\s+(?i:nitro)', 'category': 'scams'}]}, [])
+    assert guild_filter.check("Free Nitro here") == ('scams', 'delete')
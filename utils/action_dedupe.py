@@ -0,0 +1,84 @@
+import time
+from typing import Awaitable, Callable, Dict, Hashable, Optional
+
+
+class ActionDeduper:
+    """Collapses repeated automatic actions on the same target.
+
+    Actions are keyed by (guild, user, action). While one is in flight, or
+    for ``cooldown`` seconds after it succeeded, further triggers for the
+    same key are dropped instead of issuing another REST call and another
+    notification. Counters record how many actions ran, how many were
+    collapsed and how long the runs spent waiting on Discord.
+    """
+
+    def __init__(self, cooldown: float = 60.0, max_recent: int = 10_000):
+        self.cooldown = cooldown
+        self.max_recent = max_recent
+        self._pending = set()
+        # key -> monotonic time until which repeats are suppressed
+        self._recent: Dict[Hashable, float] = {}
+
+        self.issued = 0
+        self.collapsed = 0
+        self.failed = 0
+        self.busy_time = 0.0
+
+    def is_suppressed(self, key: Hashable, now: Optional[float] = None) -> bool:
+        """Return True if an action for ``key`` is pending or recently applied."""
+        if key in self._pending:
+            return True
+        until = self._recent.get(key)
+        if until is None:
+            return False
+        if (now if now is not None else time.monotonic()) < until:
+            return True
+        del self._recent[key]
+        return False
+
+    async def run(self,
+                  key: Hashable,
+                  action: Callable[[], Awaitable[object]],
+                  cooldown: Optional[float] = None,
+                  after: Optional[Callable[[], Awaitable[object]]] = None) -> bool:
+        """Run ``action`` unless the same action is already covered.
+
+        Returns True if this call performed the action. Exceptions from the
+        action propagate, and a failed action does not start the cooldown.
+        ``after`` (e.g. a notice) runs once the cooldown has started, so a
+        failure there cannot let the action be repeated.
+        """
+        now = time.monotonic()
+        if self.is_suppressed(key, now):
+            self.collapsed += 1
+            return False
+
+        # Claim the key before the first await so concurrent triggers see it
+        self._pending.add(key)
+        try:
+            await action()
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self._pending.discard(key)
+            self.busy_time += time.monotonic() - now
+
+        self.issued += 1
+        if len(self._recent) >= self.max_recent:
+            self._recent = {k: until for k, until in self._recent.items() if until > now}
+        self._recent[key] = time.monotonic() + (self.cooldown if cooldown is None else cooldown)
+        if after is not None:
+            await after()
+        return True
+
+    def stats(self) -> Dict[str, float]:
+        """Return action counts and the time spent waiting on them."""
+        return {
+            'issued': self.issued,
+            'collapsed': self.collapsed,
+            'failed': self.failed,
+            'pending': len(self._pending),
+            'busy_time': self.busy_time,
+            'avg_time': self.busy_time / (self.issued + self.failed) if self.issued + self.failed else 0.0,
+        }
@@ -0,0 +1,340 @@
+"""Sidecar indexes for audit records in rotated JSON-lines log segments.
+
+When a log segment is rotated, the compression thread writes it as
+independently compressed blocks of whole lines. It also writes
+``<segment>.idx.json`` next to it, which lists every audit record's offset
+and posting lists by moderator id, target id, guild id, action and day. A
+query reads only the sidecars, then decompresses only the blocks that hold
+matching records. The active file is small and is scanned directly, as
+are rotated segments still waiting for the compression thread.
+
+Query from the repository root:
+    python -m utils.audit_index --moderator 123 --target 456 --action ban --since 2026-09-01
+"""
+import argparse
+import bisect
+import json
+import sys
+import time
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+INDEX_VERSION = 1
+INDEX_SUFFIX = ".idx.json"
+BUCKET_SECONDS = 24 * 60 * 60
+# Marks audit lines, so the rest can be skipped without parsing them
+AUDIT_MARKER = b'"category": "AUDIT"'
+
+# Parsed sidecars by path, kept while the file is unchanged; least recently used first
+_index_cache: 'OrderedDict[Path, Tuple[float, dict]]' = OrderedDict()
+INDEX_CACHE_SIZE = 64
+
+
+def index_path(segment: Path) -> Path:
+    """The sidecar for a segment, whatever its compression suffix."""
+    name = segment.name
+    return segment.with_name(name[:name.index(".jsonl")] + INDEX_SUFFIX)
+
+
+class AuditIndexBuilder:
+    """Collects the audit records of one segment as its blocks are written."""
+
+    def __init__(self):
+        self.records: List[List[float]] = []
+        self.postings: Dict[str, Dict[str, List[int]]] = {
+            'moderators': {}, 'targets': {}, 'guilds': {}, 'actions': {}, 'buckets': {},
+        }
+        self.blocks: List[List[int]] = []
+        self.start: Optional[float] = None
+        self.end: Optional[float] = None
+
+    def _post(self, kind: str, key, position: int):
+        if key is not None:
+            self.postings[kind].setdefault(str(key), []).append(position)
+
+    def add_block(self, offset: int, data: bytes, compressed_offset: Optional[int] = None):
+        """Index the lines of one block that starts at ``offset`` in the segment."""
+        if compressed_offset is not None:
+            self.blocks.append([offset, compressed_offset])
+        position = 0
+        for line in data.splitlines(keepends=True):
+            if AUDIT_MARKER in line:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    entry = None
+                if entry and entry.get('category') == 'AUDIT':
+                    self._add(offset + position, len(line), entry)
+            position += len(line)
+
+    def _add(self, offset: int, length: int, entry: dict):
+        ts = entry.get('ts', 0)
+        context = entry.get('context') or {}
+        n = len(self.records)
+        self.records.append([offset, length, ts])
+        self._post('moderators', context.get('user_id'), n)
+        self._post('targets', context.get('target_id'), n)
+        self._post('guilds', context.get('guild_id'), n)
+        self._post('actions', context.get('action'), n)
+        self._post('buckets', int(ts // BUCKET_SECONDS), n)
+        self.start = ts if self.start is None else min(self.start, ts)
+        self.end = ts if self.end is None else max(self.end, ts)
+
+    def write(self, path: Path, segment: str, compression: Optional[str]):
+        """Write the sidecar atomically."""
+        data = {
+            'version': INDEX_VERSION,
+            'segment': segment,
+            'compression': compression,
+            'start': self.start,
+            'end': self.end,
+            'blocks': self.blocks,
+            'records': self.records,
+            **self.postings,
+        }
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        tmp.replace(path)
+
+
+def load_index(path: Path) -> dict:
+    """Read a sidecar, reusing the parsed copy while the file is unchanged."""
+    mtime = path.stat().st_mtime
+    cached = _index_cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        _index_cache.move_to_end(path)
+        return cached[1]
+    with open(path, encoding="utf-8") as f:
+        index = json.load(f)
+    _index_cache[path] = (mtime, index)
+    _index_cache.move_to_end(path)
+    # Segments deleted by retention age out of the cache
+    while len(_index_cache) > INDEX_CACHE_SIZE:
+        _index_cache.popitem(last=False)
+    return index
+
+
+def _decompress(data: bytes, compression: Optional[str]) -> bytes:
+    if compression == "gzip":
+        return zlib.decompress(data, wbits=31)
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read .zst log segments")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return data
+
+
+class _SegmentReader:
+    """Reads records out of one segment, decompressing each needed block once."""
+
+    def __init__(self, path: Path, index: dict):
+        self.path = path
+        self.compression = index['compression']
+        self.blocks = index['blocks']
+        self.starts = [block[0] for block in self.blocks]
+        self.cache: Dict[int, bytes] = {}
+        self.bytes_read = 0
+        self.file = open(path, "rb")
+
+    def read(self, offset: int, length: int) -> bytes:
+        if not self.blocks:
+            self.file.seek(offset)
+            self.bytes_read += length
+            return self.file.read(length)
+        # Blocks hold whole lines, so a record never spans two of them
+        i = bisect.bisect_right(self.starts, offset) - 1
+        block = self.cache.get(i)
+        if block is None:
+            start = self.blocks[i][1]
+            end = self.blocks[i + 1][1] if i + 1 < len(self.blocks) else None
+            self.file.seek(start)
+            data = self.file.read(end - start if end is not None else -1)
+            self.bytes_read += len(data)
+            block = self.cache[i] = _decompress(data, self.compression)
+        local = offset - self.starts[i]
+        return block[local:local + length]
+
+    def close(self):
+        self.file.close()
+
+
+def _matches(entry: dict, moderator_id, target_id, guild_id, action, since, until) -> bool:
+    if entry.get('category') != 'AUDIT':
+        return False
+    context = entry.get('context') or {}
+    ts = entry.get('ts', 0)
+    return not (
+        (moderator_id is not None and context.get('user_id') != moderator_id)
+        or (target_id is not None and context.get('target_id') != target_id)
+        or (guild_id is not None and context.get('guild_id') != guild_id)
+        or (action is not None and context.get('action') != action)
+        or (since is not None and ts < since)
+        or (until is not None and ts >= until)
+    )
+
+
+def _candidates(index: dict, moderator_id, target_id, guild_id, action, since, until) -> Iterable[int]:
+    """Record positions in a segment that can match, from its posting lists."""
+    sets = []
+    for kind, key in (('moderators', moderator_id), ('targets', target_id), ('guilds', guild_id), ('actions', action)):
+        if key is not None:
+            postings = index[kind].get(str(key))
+            if not postings:
+                return []
+            sets.append(postings)
+    if since is not None or until is not None:
+        first = int(max(since or 0, index['start']) // BUCKET_SECONDS)
+        last = int(min(until if until is not None else index['end'], index['end']) // BUCKET_SECONDS)
+        in_range = []
+        for bucket in range(first, last + 1):
+            in_range.extend(index['buckets'].get(str(bucket), ()))
+        sets.append(in_range)
+    if not sets:
+        return range(len(index['records']))
+    # Intersect starting from the shortest list
+    sets.sort(key=len)
+    result = set(sets[0])
+    for postings in sets[1:]:
+        result.intersection_update(postings)
+    return result
+
+
+def _scan(path: Path, filters: tuple, stats: Dict[str, float]) -> List[dict]:
+    """Matching audit records of an uncompressed, unindexed file, newest first."""
+    found = []
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return found  # Compressed or pruned since it was listed
+    stats['segments_read'] += 1
+    with f:
+        for line in f:
+            stats['bytes_read'] += len(line)
+            if AUDIT_MARKER in line:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if _matches(entry, *filters):
+                    found.append(entry)
+    found.reverse()
+    return found
+
+
+def search(directory: str,
+           prefix: str = "ModBot",
+           moderator_id: Optional[int] = None,
+           target_id: Optional[int] = None,
+           guild_id: Optional[int] = None,
+           action: Optional[str] = None,
+           since: Optional[float] = None,
+           until: Optional[float] = None,
+           limit: int = 50) -> Tuple[List[dict], Dict[str, float]]:
+    """Find audit records, newest first, and report how much was read."""
+    directory = Path(directory)
+    started = time.perf_counter()
+    stats = {'segments': 0, 'segments_read': 0, 'bytes_read': 0, 'elapsed': 0.0}
+    filters = (moderator_id, target_id, guild_id, action, since, until)
+    results: List[dict] = []
+
+    # The active file has no sidecar yet
+    results.extend(_scan(directory / f"{prefix}.jsonl", filters, stats))
+
+    # Rotated segments by name, which starts with their start time; a segment
+    # waiting to be compressed has its plain .jsonl file but no sidecar yet
+    sidecars = {path.name[:-len(INDEX_SUFFIX)]: path for path in directory.glob(f"{prefix}.*{INDEX_SUFFIX}")}
+    plain = {path.name[:-len(".jsonl")]: path for path in directory.glob(f"{prefix}.*.jsonl")}
+    for stem in sorted(sidecars.keys() | plain.keys(), reverse=True):
+        if len(results) >= limit:
+            break
+        stats['segments'] += 1
+        index = segment = None
+        if stem in sidecars:
+            try:
+                index = load_index(sidecars[stem])
+                segment = sidecars[stem].with_name(index['segment'])
+            except (OSError, ValueError, KeyError):
+                segment = None
+        if segment is None or not segment.exists():
+            # Not indexed yet, or the sidecar was written just before its compressed file
+            if stem in plain:
+                results.extend(_scan(plain[stem], filters, stats))
+            continue
+        if index['start'] is None:
+            continue
+        if (since is not None and index['end'] < since) or (until is not None and index['start'] >= until):
+            continue
+        positions = sorted(_candidates(index, *filters), reverse=True)
+        if not positions:
+            continue
+
+        stats['segments_read'] += 1
+        reader = _SegmentReader(segment, index)
+        try:
+            for position in positions:
+                offset, length, _ = index['records'][position]
+                entry = json.loads(reader.read(offset, length))
+                if _matches(entry, *filters):
+                    results.append(entry)
+                    if len(results) >= limit:
+                        break
+        finally:
+            stats['bytes_read'] += reader.bytes_read
+            reader.close()
+
+    stats['elapsed'] = time.perf_counter() - started
+    return results[:limit], stats
+
+
+def parse_time(value: str) -> float:
+    """Parse an ISO date or datetime (UTC unless it says otherwise) to a timestamp."""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search audit records in the bot's log segments.")
+    parser.add_argument('--dir', default="logs", help="log directory")
+    parser.add_argument('--prefix', default="ModBot", help="log file prefix")
+    parser.add_argument('--moderator', type=int, help="moderator user id")
+    parser.add_argument('--target', type=int, help="target user id")
+    parser.add_argument('--guild', type=int, help="guild id")
+    parser.add_argument('--action', help="action, e.g. ban, kick or timeout")
+    parser.add_argument('--since', type=parse_time, help="ISO date/time, inclusive")
+    parser.add_argument('--until', type=parse_time, help="ISO date/time, exclusive")
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--json', action='store_true', help="print raw records as JSON lines")
+    args = parser.parse_args()
+
+    results, stats = search(
+        args.dir, args.prefix, args.moderator, args.target, args.guild,
+        args.action, args.since, args.until, args.limit
+    )
+    for entry in results:
+        if args.json:
+            print(json.dumps(entry, ensure_ascii=False))
+        else:
+            context = entry.get('context') or {}
+            details = context.get('details') or {}
+            print(f"{entry.get('time')}  {context.get('action'):<10} "
+                  f"by {context.get('user')} ({context.get('user_id')}) "
+                  f"on {context.get('target')} ({context.get('target_id')})"
+                  + (f"  reason: {details['reason']}" if details.get('reason') else ""))
+    print(f"{len(results)} records in {stats['elapsed'] * 1e3:.1f} ms; opened {stats['segments_read']} files "
+          f"after checking {stats['segments']} segment indexes ({stats['bytes_read'] / 1024:.0f} KiB read)",
+          file=sys.stderr if args.json else sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+import asyncio
+import csv
+import io
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import discord
+
+from utils.logger import bot_logger
+
+MAX_TARGETS = 5000
+# Uploaded ID lists larger than this are refused
+MAX_FILE_SIZE = 1024 * 1024
+
+
+def parse_ids(text: str) -> List[int]:
+    """Every user ID in ``text``, in order, without duplicates."""
+    return list(dict.fromkeys(int(i) for i in re.findall(r'\d{15,20}', text)))
+
+
+def filter_members(members: Iterable[discord.Member],
+                   joined_within: Optional[int] = None,
+                   account_age: Optional[int] = None) -> List[int]:
+    """IDs of members who joined in the last ``joined_within`` minutes and whose
+    accounts are younger than ``account_age`` minutes."""
+    now = datetime.now(timezone.utc)
+    joined_after = now - timedelta(minutes=joined_within) if joined_within else None
+    created_after = now - timedelta(minutes=account_age) if account_age else None
+    return [
+        member.id for member in members
+        if (joined_after is None or (member.joined_at is not None and member.joined_at >= joined_after))
+        and (created_after is None or member.created_at >= created_after)
+    ]
+
+
+class Target:
+    """One account to act on and what happened to it."""
+
+    __slots__ = ('user_id', 'member', 'result', 'detail')
+
+    def __init__(self, user_id: int, member: Optional[discord.Member]):
+        self.user_id = user_id
+        # None if the account is not in the server
+        self.member = member
+        self.result = "pending"
+        self.detail = ""
+
+
+def plan(guild: discord.Guild,
+         moderator: discord.Member,
+         action: str,
+         user_ids: List[int]) -> Tuple[List[Target], List[Target]]:
+    """Split ``user_ids`` into targets to act on and targets skipped up front.
+
+    Every hierarchy check happens here, in one pass, against role positions
+    read once, so no request is spent on a member the action cannot touch.
+    Accounts not in the server can still be banned by ID.
+    """
+    me = guild.me
+    # The owner outranks everyone, whatever their roles
+    moderator_top = float('inf') if moderator.id == guild.owner_id else moderator.top_role.position
+    bot_top = me.top_role.position
+    targets, skipped = [], []
+    for user_id in user_ids:
+        target = Target(user_id, guild.get_member(user_id))
+        member = target.member
+        if user_id in (moderator.id, me.id):
+            target.detail = "cannot act on yourself or the bot"
+        elif user_id == guild.owner_id:
+            target.detail = "server owner"
+        elif member is None and action != "ban":
+            target.detail = "not in the server"
+        elif member is not None and member.top_role.position >= moderator_top:
+            target.detail = "role higher or equal to yours"
+        elif member is not None and member.top_role.position >= bot_top:
+            target.detail = "role higher or equal to the bot's"
+        elif member is not None and action == "timeout" and member.guild_permissions.administrator:
+            target.detail = "administrators cannot be timed out"
+        else:
+            targets.append(target)
+            continue
+        target.result = "skipped"
+        skipped.append(target)
+    return targets, skipped
+
+
+class BulkAction:
+    """Bans, kicks or times out a list of accounts with bounded concurrency.
+
+    At most ``concurrency`` requests are in flight; discord.py queues them
+    on the guild's rate-limit bucket for the action and waits out any 429,
+    so a long list runs at the rate Discord allows instead of piling up
+    requests. Each account gets its own audit entry.
+    """
+
+    def __init__(self,
+                 guild: discord.Guild,
+                 moderator: discord.Member,
+                 action: str,
+                 targets: List[Target],
+                 reason: str,
+                 duration: int = 60,
+                 delete_messages: int = 0,
+                 concurrency: int = 3):
+        self.guild = guild
+        self.moderator = moderator
+        self.action = action
+        self.targets = targets
+        self.reason = reason
+        # Minutes, for timeouts
+        self.duration = duration
+        self.delete_messages = delete_messages
+        self.concurrency = concurrency
+
+        self.succeeded = 0
+        self.failed = 0
+        self.started = 0.0
+        self.elapsed = 0.0
+        self.done = False
+
+    async def _apply(self, target: Target):
+        reason = f"{self.reason} - By {self.moderator} (bulk)"
+        if self.action == "ban":
+            await self.guild.ban(
+                target.member or discord.Object(id=target.user_id),
+                reason=reason,
+                delete_message_days=self.delete_messages
+            )
+        elif self.action == "kick":
+            await target.member.kick(reason=reason)
+        else:
+            await target.member.timeout(timedelta(minutes=self.duration), reason=reason)
+
+    async def _run_one(self, semaphore: asyncio.Semaphore, target: Target):
+        async with semaphore:
+            try:
+                await self._apply(target)
+            except discord.NotFound:
+                target.result, target.detail = "failed", "unknown user"
+            except discord.Forbidden:
+                target.result, target.detail = "failed", "missing permissions"
+            except discord.HTTPException as e:
+                target.result, target.detail = "failed", str(e)
+        if target.result == "failed":
+            self.failed += 1
+            return
+
+        target.result = "done"
+        self.succeeded += 1
+        details: Dict[str, object] = {"reason": self.reason, "guild": self.guild.name, "bulk": True}
+        if self.action == "timeout":
+            details["duration"] = self.duration
+        elif self.action == "ban":
+            details["delete_messages_days"] = self.delete_messages
+        bot_logger.audit(
+            self.action,
+            str(self.moderator),
+            str(target.member or target.user_id),
+            details=details,
+            user_id=self.moderator.id,
+            target_id=target.user_id,
+            guild_id=self.guild.id
+        )
+
+    async def run(self):
+        """Act on every target; failures are recorded per target, not raised."""
+        self.started = time.monotonic()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        try:
+            await asyncio.gather(*(self._run_one(semaphore, target) for target in self.targets))
+        finally:
+            self.elapsed = time.monotonic() - self.started
+            self.done = True
+
+    def summary(self) -> str:
+        """One progress line."""
+        finished = self.succeeded + self.failed
+        elapsed = self.elapsed if self.done else time.monotonic() - self.started
+        line = f"{finished}/{len(self.targets)} processed: {self.succeeded} succeeded, {self.failed} failed"
+        if finished and not self.done:
+            remaining = elapsed / finished * (len(self.targets) - finished)
+            line += f" (about {remaining:.0f}s left)"
+        return line
+
+    def report(self, skipped: List[Target]) -> str:
+        """Every account and its outcome, as CSV."""
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(["user_id", "user", "action", "result", "detail"])
+        for target in self.targets + skipped:
+            writer.writerow([
+                target.user_id,
+                str(target.member) if target.member else "",
+                self.action,
+                target.result,
+                target.detail
+            ])
+        return out.getvalue()
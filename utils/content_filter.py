@@ -0,0 +1,114 @@
+import re
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+# The stdlib regex parser, used to check what a pattern contains
+try:
+    from re import _constants as sre_constants, _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_constants, sre_parse
+
+_GROUP_REFERENCES = (sre_constants.GROUPREF, sre_constants.GROUPREF_EXISTS)
+
+
+class FilterRule(NamedTuple):
+    """A single content rule.
+
+    Patterns are matched against the lowercased message, so they should be
+    written in lowercase. ``anchors`` are literal substrings at least one of which must appear in
+    any text the pattern can match. They feed the cheap prefilter; a rule
+    without anchors disables the prefilter for the whole engine.
+    """
+    pattern: str
+    category: str
+    anchors: Tuple[str, ...] = ()
+
+
+def _has_group_reference(items) -> bool:
+    for item in items:
+        if isinstance(item, tuple) and item and item[0] in _GROUP_REFERENCES:
+            return True
+        if isinstance(item, (tuple, list, sre_parse.SubPattern)) and _has_group_reference(item):
+            return True
+    return False
+
+
+def check_combinable(pattern: str):
+    """Raise ValueError if ``pattern`` cannot be one rule of the combined scanner.
+
+    Every rule becomes a named group in a single alternation, so group
+    numbers shift, a leading global flag is no longer at the start and
+    group names would clash between rules. Raises re.error for invalid
+    patterns.
+    """
+    parsed = sre_parse.parse(pattern)
+    if parsed.state.flags & ~re.UNICODE:
+        raise ValueError(
+            f"{pattern!r}: global flags such as (?i) are not supported; "
+            "messages are matched lowercased, or scope the flag as (?i:...)"
+        )
+    if parsed.state.groupdict:
+        raise ValueError(f"{pattern!r}: named groups are not supported, use (?:...)")
+    if _has_group_reference(parsed):
+        raise ValueError(f"{pattern!r}: backreferences and conditional groups are not supported")
+    # The wrapper the scanner uses
+    re.compile(f'(?P<r0>{pattern})')
+
+
+class ContentFilter:
+    """All filter rules compiled into a single scanner.
+
+    Rules are given in priority order and ``match`` returns the category of
+    the highest-priority rule that matches anywhere in the content, exactly
+    like testing each pattern in turn. Messages that contain none of the rule
+    anchors are rejected by plain substring tests before any regex runs.
+    """
+
+    def __init__(self, rules: Iterable[FilterRule]):
+        self.rules: List[FilterRule] = list(rules)
+        self.categories = [rule.category for rule in self.rules]
+
+        # _scanners[k] alternates rules 0..k-1; _scanners[-1] holds all of them.
+        # Once rule k has matched only higher-priority rules are still of interest.
+        self._scanners = [None] + [
+            re.compile('|'.join(f'(?P<r{i}>{rule.pattern})' for i, rule in enumerate(self.rules[:k])))
+            for k in range(1, len(self.rules) + 1)
+        ]
+
+        # One lowered copy plus substring tests beats any IGNORECASE regex by
+        # several times: re loses its literal fast paths when ignoring case.
+        if self.rules and all(rule.anchors for rule in self.rules):
+            self._anchors = tuple(sorted({a.lower() for rule in self.rules for a in rule.anchors}))
+        else:
+            self._anchors = None
+
+    def match(self, content: str) -> Optional[str]:
+        """Return the category of the first matching rule, or None."""
+        return self.match_lowered(content.lower())
+
+    def match_lowered(self, content: str) -> Optional[str]:
+        """Like ``match`` for content the caller has already lowercased."""
+        if not self.rules or not content:
+            return None
+        # Most chat contains none of the anchors and never reaches the scanner
+        if self._anchors is not None:
+            for anchor in self._anchors:
+                if anchor in content:
+                    break
+            else:
+                return None
+
+        best = None
+        scanner = self._scanners[-1]
+        pos = 0
+        while True:
+            found = scanner.search(content, pos)
+            if found is None:
+                break
+            index = int(found.lastgroup[1:])
+            if index == 0:
+                return self.categories[0]
+            best = index
+            # A higher-priority rule may still match inside or after this one
+            scanner = self._scanners[index]
+            pos = found.start() + 1
+        return self.categories[best] if best is not None else None
@@ -0,0 +1,147 @@
+import asyncio
+import time
+from typing import Dict, List, Optional, Set
+
+import discord
+
+
+class _ChannelBatch:
+    """Messages waiting to be deleted from one channel."""
+
+    __slots__ = ('channel', 'message_ids', 'offenders', 'categories', 'started', 'task')
+
+    def __init__(self, channel: discord.abc.Messageable):
+        self.channel = channel
+        self.message_ids: List[int] = []
+        # user id -> mention, for the single notice sent per flush
+        self.offenders: Dict[int, str] = {}
+        self.categories: Dict[str, None] = {}
+        self.started = time.monotonic()
+        self.task: Optional[asyncio.Task] = None
+
+
+class DeletionQueue:
+    """Coalesces message deletions per channel into bulk deletes.
+
+    Messages are gathered for ``window`` seconds (or until ``max_batch`` of
+    them are queued) and then removed with one bulk-delete call. The users
+    whose messages were removed get one combined notice per flush instead
+    of one message each.
+    """
+
+    def __init__(self, window: float = 1.5, max_batch: int = 100, notice_after: float = 5):
+        self.window = window
+        self.max_batch = max_batch
+        self.notice_after = notice_after
+        self._batches: Dict[int, _ChannelBatch] = {}
+        # Flushes of full batches; referenced until done so they are not collected
+        self._flushing: Set[asyncio.Task] = set()
+
+        # Metrics
+        self.flushes = 0
+        self.deleted = 0
+        self.failed = 0
+        self.api_calls = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self._total_latency = 0.0
+
+    @property
+    def depth(self) -> int:
+        """Number of messages currently waiting to be deleted."""
+        return sum(len(batch.message_ids) for batch in self._batches.values())
+
+    def stats(self) -> Dict[str, float]:
+        """Return queue depth, throughput and flush latency figures."""
+        return {
+            'depth': self.depth,
+            'channels': len(self._batches),
+            'flushes': self.flushes,
+            'deleted': self.deleted,
+            'failed': self.failed,
+            'api_calls': self.api_calls,
+            'last_latency': self.last_latency,
+            'avg_latency': self._total_latency / self.flushes if self.flushes else 0.0,
+            'max_latency': self.max_latency,
+        }
+
+    def enqueue(self,
+                channel: discord.abc.Messageable,
+                message_id: int,
+                user: Optional[discord.abc.User] = None,
+                category: Optional[str] = None):
+        """Queue a message for deletion; pass ``user`` to include them in the notice."""
+        batch = self._batches.get(channel.id)
+        if batch is None:
+            batch = self._batches[channel.id] = _ChannelBatch(channel)
+            batch.task = asyncio.create_task(self._flush_later(channel.id, batch))
+
+        batch.message_ids.append(message_id)
+        if user is not None:
+            batch.offenders[user.id] = user.mention
+        if category is not None:
+            batch.categories[category] = None
+
+        if len(batch.message_ids) >= self.max_batch:
+            # Full batch: flush right away and let the next message start a new one
+            del self._batches[channel.id]
+            batch.task.cancel()
+            task = asyncio.create_task(self._flush(batch))
+            self._flushing.add(task)
+            task.add_done_callback(self._flushing.discard)
+
+    async def _flush_later(self, channel_id: int, batch: _ChannelBatch):
+        await asyncio.sleep(self.window)
+        if self._batches.get(channel_id) is batch:
+            del self._batches[channel_id]
+        await self._flush(batch)
+
+    async def _flush(self, batch: _ChannelBatch):
+        """Delete a batch with as few calls as possible and send one notice."""
+        channel = batch.channel
+        targets = [discord.Object(id=message_id) for message_id in batch.message_ids]
+        try:
+            self.api_calls += 1
+            await channel.delete_messages(targets, reason="Filtered content")
+            self.deleted += len(targets)
+        except discord.Forbidden:
+            self.failed += len(targets)
+        except discord.HTTPException:
+            # Bulk delete refuses the whole batch if one message is unusable,
+            # e.g. already deleted; retry the messages one by one
+            for target in targets:
+                try:
+                    self.api_calls += 1
+                    await channel.get_partial_message(target.id).delete()
+                    self.deleted += 1
+                except discord.HTTPException:
+                    self.failed += 1
+
+        if batch.offenders:
+            categories = " and ".join(batch.categories) or "filtered content"
+            try:
+                self.api_calls += 1
+                await channel.send(
+                    f"{' '.join(batch.offenders.values())} Your message was removed for containing {categories}.",
+                    delete_after=self.notice_after
+                )
+            except discord.HTTPException:
+                pass  # Cannot send in this channel
+
+        latency = time.monotonic() - batch.started
+        self.flushes += 1
+        self.last_latency = latency
+        self.max_latency = max(self.max_latency, latency)
+        self._total_latency += latency
+
+    async def flush_all(self):
+        """Flush every pending batch immediately (e.g. on cog unload)."""
+        batches = list(self._batches.values())
+        self._batches.clear()
+        for batch in batches:
+            batch.task.cancel()
+        await asyncio.gather(
+            *(self._flush(batch) for batch in batches),
+            *self._flushing,
+            return_exceptions=True
+        )
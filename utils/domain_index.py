@@ -0,0 +1,182 @@
+"""Compact on-disk domain index for large block and allow lists.
+
+Build an index from a plain or hosts-style list:
+    python -m utils.domain_index build blocklist.txt data/domains/blocklist.idx
+Check a host against it:
+    python -m utils.domain_index lookup data/domains/blocklist.idx sub.evil.example
+"""
+import argparse
+import encodings.idna
+import mmap
+from array import array
+import struct
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+MAGIC = b'MBDI'
+VERSION = 1
+# magic, version, entry count, blob length (native byte order, like the offsets)
+HEADER = struct.Struct('=4sIII')
+
+# Tokens that show up in hosts files but are not domains
+_HOSTS_TOKENS = {'0.0.0.0', '127.0.0.1', '::', '::1', 'localhost'}
+
+
+def normalize_domain(domain: str) -> Optional[str]:
+    """Lowercase a domain and strip wildcards, dots and whitespace."""
+    domain = domain.strip().lower().lstrip('*').strip('.')
+    if not domain or ' ' in domain or '/' in domain:
+        return None
+    try:
+        return domain.encode('idna').decode('ascii')
+    except UnicodeError:
+        return None
+
+
+def host_to_ascii(host: str) -> str:
+    """Punycode a host the way the indexes store it, e.g. bücher.de -> xn--bcher-kva.de.
+
+    A host with a label the codec rejects (empty, too long) is converted
+    label by label, so its valid parent domains can still be looked up.
+    """
+    if host.isascii():
+        return host
+    try:
+        return host.encode('idna').decode('ascii')
+    except UnicodeError:
+        pass
+    labels = []
+    for label in host.replace('\u3002', '.').replace('\uff0e', '.').replace('\uff61', '.').split('.'):
+        try:
+            labels.append(encodings.idna.ToASCII(label).decode('ascii'))
+        except UnicodeError:
+            labels.append(label)
+    return '.'.join(labels)
+
+
+def domain_suffixes(host: str) -> Iterable[str]:
+    """Yield a host and each parent domain, e.g. a.b.com, b.com, com."""
+    while host:
+        yield host
+        _, _, host = host.partition('.')
+
+
+def parse_domain_list(lines: Iterable[str]) -> List[str]:
+    """Parse plain one-per-line and hosts-file style lists."""
+    domains = []
+    for line in lines:
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+        for token in line.split():
+            if token not in _HOSTS_TOKENS:
+                domain = normalize_domain(token)
+                if domain:
+                    domains.append(domain)
+    return domains
+
+
+def build_index(domains: Iterable[str], path: str) -> int:
+    """Write a sorted, deduplicated index file and return its entry count."""
+    entries = sorted({d.encode('ascii') for d in domains})
+    offsets = [0]
+    for entry in entries:
+        offsets.append(offsets[-1] + len(entry))
+    blob = b''.join(entries)
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(entries), len(blob)))
+        f.write(array('I', offsets).tobytes())
+        f.write(blob)
+    # Readers never see a half-written index
+    tmp.replace(path)
+    return len(entries)
+
+
+class DomainIndex:
+    """Sorted array of domains memory-mapped from an index file.
+
+    The file is a small header, ``count + 1`` uint32 offsets and the
+    concatenated domains in sorted order. Loading maps the file without
+    parsing it, and the resident cost is only the pages lookups touch,
+    so a 500k entry list starts instantly and stays far below a Python set.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, blob_len = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mmap.close()
+            raise ValueError(f"{self.path} is not a domain index (version {VERSION})")
+
+        offsets_start = HEADER.size
+        self._blob_start = offsets_start + (count + 1) * 4
+        if self._blob_start + blob_len > len(self._mmap):
+            self._mmap.close()
+            raise ValueError(f"{self.path} is truncated")
+        self._count = count
+        self._offsets = memoryview(self._mmap)[offsets_start:self._blob_start].cast('I')
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _entry(self, i: int) -> bytes:
+        base = self._blob_start
+        return self._mmap[base + self._offsets[i]:base + self._offsets[i + 1]]
+
+    def __contains__(self, domain: str) -> bool:
+        try:
+            key = domain.encode('ascii')
+        except UnicodeEncodeError:
+            return False
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._entry(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo < self._count and self._entry(lo) == key
+
+    def match(self, host: str) -> Optional[str]:
+        """Return the listed domain covering ``host`` (itself or a parent), if any."""
+        for suffix in domain_suffixes(host_to_ascii(host)):
+            if suffix in self:
+                return suffix
+        return None
+
+    def close(self):
+        self._offsets.release()
+        self._mmap.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query a domain index.")
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    build = sub.add_parser('build', help="build an index from a domain list")
+    build.add_argument('source', help="plain or hosts-style domain list")
+    build.add_argument('output', help="index file to write")
+    lookup = sub.add_parser('lookup', help="check hosts against an index")
+    lookup.add_argument('index')
+    lookup.add_argument('hosts', nargs='+')
+    args = parser.parse_args()
+
+    if args.cmd == 'build':
+        with open(args.source, encoding='utf-8', errors='ignore') as f:
+            count = build_index(parse_domain_list(f), args.output)
+        print(f"Wrote {count:,} domains to {args.output}")
+    else:
+        index = DomainIndex(args.index)
+        for host in args.hosts:
+            host = normalize_domain(host) or host
+            hit = index.match(host)
+            print(f"{host}: {'listed via ' + hit if hit else 'not listed'}")
+
+
+if __name__ == "__main__":
+    main()
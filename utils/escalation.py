@@ -0,0 +1,55 @@
+from typing import Any, Dict, List, Optional
+
+# Strongest first; when several rules match, the strongest action wins
+ACTIONS = ("ban", "kick", "timeout")
+
+
+class EscalationRule:
+    """``threshold`` active warnings within ``window`` seconds triggers ``action``."""
+
+    __slots__ = ('threshold', 'window', 'action', 'duration')
+
+    def __init__(self, threshold: int, window: float, action: str, duration: Optional[int] = None):
+        self.threshold = threshold
+        self.window = window
+        self.action = action
+        # Minutes, for timeouts
+        self.duration = duration
+
+    def describe(self) -> str:
+        days = self.window / 86400
+        action = f"{self.duration} minute timeout" if self.action == "timeout" else self.action
+        return f"{self.threshold} warnings in {days:g} days → {action}"
+
+
+def _strength(rule: EscalationRule):
+    return ACTIONS.index(rule.action), -(rule.duration or 0)
+
+
+def order(rules: List[EscalationRule]) -> List[EscalationRule]:
+    """Sort rules so the first match is the strongest action."""
+    return sorted(rules, key=_strength)
+
+
+def _met(rule: EscalationRule, recent: List[Dict[str, Any]], now: float, skip: int = 0) -> bool:
+    """Whether the warnings after the newest ``skip`` meet ``rule``."""
+    if len(recent) < rule.threshold + skip:
+        return False
+    warning = recent[rule.threshold - 1 + skip]
+    return warning['active'] and warning['created_at'] >= now - rule.window
+
+
+def evaluate(rules: List[EscalationRule], recent: List[Dict[str, Any]], now: float) -> Optional[EscalationRule]:
+    """The strongest rule the member's newest warning crosses, if any.
+
+    ``rules`` come from ``order()`` and ``recent`` is the member's newest
+    warnings, newest first, as kept by the warnings store on every warn. A
+    rule is met when the warning ``threshold`` places back is still active
+    and inside the window, so each rule costs one lookup. It fires only if
+    the warnings before the newest did not already meet it; otherwise every
+    later warn inside the window would repeat the action.
+    """
+    for rule in rules:
+        if _met(rule, recent, now) and not _met(rule, recent, now, skip=1):
+            return rule
+    return None
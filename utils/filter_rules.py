@@ -0,0 +1,326 @@
+import asyncio
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from utils.content_filter import ContentFilter, FilterRule, check_combinable
+from utils.domain_index import DomainIndex, domain_suffixes, host_to_ascii, normalize_domain
+from utils.logger import bot_logger
+
+# Actions a rule set may assign to a category
+FILTER_ACTIONS = ('delete', 'log', 'ignore')
+
+# Authorities (userinfo@host:port) of links and bare www. addresses.
+# Browsers treat a backslash like a slash, so it ends the authority too.
+URL_AUTHORITY_PATTERN = re.compile(r'(?:https?://|(?=www\.))([^\s/\\<>"\'?#]+)')
+
+
+def _authority_host(authority: str) -> str:
+    """The host of ``userinfo@host:port``; only the part after the last @ is visited."""
+    host = authority.rpartition('@')[2]
+    if host.startswith('['):
+        # IPv6 literal, e.g. [::1]:8080
+        return host[1:host.find(']')] if ']' in host else host[1:]
+    return host.partition(':')[0].rstrip('.')
+
+
+def extract_hosts(content: str) -> List[str]:
+    """Return the hosts of every link in already lowercased content.
+
+    Userinfo and ports are dropped, so ``https://google.com@evil.com:80``
+    yields ``evil.com``. Internationalized hosts are punycoded, as the
+    domain lists store them.
+    """
+    hosts = []
+    for authority in URL_AUTHORITY_PATTERN.findall(content):
+        host = _authority_host(authority)
+        if host:
+            hosts.append(host_to_ascii(host))
+    return hosts
+
+
+class DomainLists:
+    """Bot-wide block and allow indexes shared by every guild's matcher.
+
+    The indexes are ``blocklist.idx`` and ``allowlist.idx`` in the given
+    directory, built with ``python -m utils.domain_index build``.
+    """
+
+    NAMES = ('blocklist', 'allowlist')
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.blocked: Optional[DomainIndex] = None
+        self.allowed: Optional[DomainIndex] = None
+        self._mtimes: Dict[str, Optional[float]] = {}
+
+    def _open(self, name: str) -> Tuple[Optional[DomainIndex], Optional[float]]:
+        """Map one index file (runs in a worker thread)."""
+        path = self.directory / f"{name}.idx"
+        try:
+            mtime = path.stat().st_mtime
+        except FileNotFoundError:
+            return None, None
+        return DomainIndex(path), mtime
+
+    def _stat(self) -> Dict[str, Optional[float]]:
+        mtimes = {}
+        for name in self.NAMES:
+            try:
+                mtimes[name] = (self.directory / f"{name}.idx").stat().st_mtime
+            except FileNotFoundError:
+                mtimes[name] = None
+        return mtimes
+
+    async def reload_changed(self):
+        """Remap the indexes whose files changed since the last check."""
+        on_disk = await asyncio.to_thread(self._stat)
+        for name in self.NAMES:
+            if name in self._mtimes and self._mtimes[name] == on_disk[name]:
+                continue
+            self._mtimes[name] = on_disk[name]
+            try:
+                index, _ = await asyncio.to_thread(self._open, name)
+            except Exception as e:
+                bot_logger.system(f"Failed to load domain {name}", operation="reload_domains", error=e)
+                continue
+
+            attr = 'blocked' if name == 'blocklist' else 'allowed'
+            old = getattr(self, attr)
+            setattr(self, attr, index)
+            # Lookups run on the event loop, so nothing still reads the old map
+            if old is not None:
+                old.close()
+            if index is not None:
+                bot_logger.system(
+                    f"Loaded domain {name} with {len(index):,} entries",
+                    operation="reload_domains"
+                )
+
+
+class GuildFilter:
+    """The compiled matcher for one guild's rule set."""
+
+    def __init__(self,
+                 content_filter: ContentFilter,
+                 blocked_domains: FrozenSet[str] = frozenset(),
+                 allowed_domains: FrozenSet[str] = frozenset(),
+                 actions: Optional[Dict[str, str]] = None,
+                 domain_lists: Optional[DomainLists] = None,
+                 exempt_roles: FrozenSet[int] = frozenset(),
+                 exempt_channels: FrozenSet[int] = frozenset()):
+        self.content_filter = content_filter
+        self.blocked_domains = blocked_domains
+        self.allowed_domains = allowed_domains
+        self.actions = actions or {}
+        self.domain_lists = domain_lists
+        self.exempt_roles = exempt_roles
+        self.exempt_channels = exempt_channels
+
+    def is_blocked_host(self, host: str) -> bool:
+        """Check a host against the domain lists.
+
+        The guild's own lists take precedence over the bot-wide indexes, and
+        within each level the allowlist wins over the blocklist.
+        """
+        suffixes = list(domain_suffixes(host))
+        for suffix in suffixes:
+            if suffix in self.allowed_domains:
+                return False
+        for suffix in suffixes:
+            if suffix in self.blocked_domains:
+                return True
+
+        lists = self.domain_lists
+        if lists is None or lists.blocked is None:
+            return False
+        if lists.allowed is not None and lists.allowed.match(host):
+            return False
+        return lists.blocked.match(host) is not None
+
+    def checks_domains(self) -> bool:
+        lists = self.domain_lists
+        return bool(self.blocked_domains) or (lists is not None and lists.blocked is not None)
+
+    def check(self, content: str) -> Optional[Tuple[str, str]]:
+        """Return (category, action) for the first rule the content breaks."""
+        content = content.lower()
+        category = None
+        if ('http' in content or 'www.' in content) and self.checks_domains():
+            if any(self.is_blocked_host(host) for host in extract_hosts(content)):
+                category = 'blocked links'
+        if category is None:
+            category = self.content_filter.match_lowered(content)
+        if category is None:
+            return None
+        return category, self.actions.get(category, 'delete')
+
+
+def _list_of(value: Any, kinds: Tuple[type, ...], name: str) -> list:
+    """Return ``value`` if it is a list of ``kinds``; raise ValueError otherwise."""
+    if not isinstance(value, list) or not all(isinstance(item, kinds) for item in value):
+        raise ValueError(f"'{name}' must be a list of {' or '.join(kind.__name__ for kind in kinds)}")
+    return value
+
+
+def _dict(value: Any, name: str) -> dict:
+    if not isinstance(value, dict):
+        raise ValueError(f"'{name}' must be an object")
+    return value
+
+
+def compile_rule_set(data: Dict[str, Any],
+                     default_rules: List[FilterRule],
+                     domain_lists: Optional[DomainLists] = None) -> GuildFilter:
+    """Validate a rule set loaded from disk and compile it into a GuildFilter.
+
+    Raises ValueError for malformed rule sets, including valid JSON of the
+    wrong shape, and re.error for bad patterns.
+    """
+    _dict(data, "rule set")
+    rules = list(default_rules) if data.get('include_defaults', True) else []
+
+    for entry in _list_of(data.get('regex', []), (dict,), 'regex'):
+        if not isinstance(entry.get('pattern'), str) or not isinstance(entry.get('category'), str):
+            raise ValueError("regex rules need a 'pattern' and a 'category' string")
+        anchors = _list_of(entry.get('anchors', []), (str,), 'anchors')
+        # Surface bad patterns, and ones the combined scanner cannot hold, with a precise error
+        check_combinable(entry['pattern'])
+        rules.append(FilterRule(entry['pattern'], entry['category'], tuple(anchors)))
+
+    keywords = [word.lower() for word in _list_of(data.get('keywords', []), (str,), 'keywords') if word.strip()]
+    if keywords:
+        pattern = r'\b(?:' + '|'.join(re.escape(word) for word in keywords) + r')\b'
+        rules.append(FilterRule(pattern, 'blocked words', tuple(keywords)))
+
+    domains = _dict(data.get('domains', {}), 'domains')
+    blocked = frozenset(filter(None, map(
+        normalize_domain, _list_of(domains.get('block', []), (str,), 'domains.block')
+    )))
+    allowed = frozenset(filter(None, map(
+        normalize_domain, _list_of(domains.get('allow', []), (str,), 'domains.allow')
+    )))
+
+    actions = _dict(data.get('actions', {}), 'actions')
+    for category, action in actions.items():
+        if action not in FILTER_ACTIONS:
+            raise ValueError(f"Unknown action '{action}' for category '{category}'")
+
+    # int() raises ValueError for IDs that are not numbers
+    exempt_roles = frozenset(
+        int(role_id) for role_id in _list_of(data.get('exempt_roles', []), (int, str), 'exempt_roles')
+    )
+    exempt_channels = frozenset(
+        int(channel_id) for channel_id in _list_of(data.get('exempt_channels', []), (int, str), 'exempt_channels')
+    )
+
+    return GuildFilter(
+        ContentFilter(rules),
+        blocked,
+        allowed,
+        dict(actions),
+        domain_lists,
+        exempt_roles,
+        exempt_channels
+    )
+
+
+class FilterRuleCache:
+    """Per-guild compiled matchers, loaded from ``<directory>/<guild_id>.json``.
+
+    ``get`` is a plain dict lookup, so the message hot path never touches the
+    disk or the regex compiler. Reloads read and compile off the event loop
+    and then swap a single guild's entry in one assignment.
+    """
+
+    def __init__(self, directory: str, default_rules: List[FilterRule], domain_directory: str):
+        self.directory = Path(directory)
+        self.default_rules = list(default_rules)
+        self.domain_lists = DomainLists(domain_directory)
+        self.default = compile_rule_set({}, self.default_rules, self.domain_lists)
+        self._matchers: Dict[int, GuildFilter] = {}
+        self._mtimes: Dict[int, float] = {}
+
+    def get(self, guild_id: int) -> GuildFilter:
+        """Return the compiled matcher for a guild."""
+        return self._matchers.get(guild_id, self.default)
+
+    def path_for(self, guild_id: int) -> Path:
+        return self.directory / f"{guild_id}.json"
+
+    def _load(self, guild_id: int) -> Tuple[Optional[GuildFilter], Optional[float]]:
+        """Read and compile one guild's rule set (runs in a worker thread)."""
+        path = self.path_for(guild_id)
+        try:
+            mtime = path.stat().st_mtime
+        except FileNotFoundError:
+            return None, None
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return compile_rule_set(data, self.default_rules, self.domain_lists), mtime
+
+    async def reload(self, guild_id: int) -> GuildFilter:
+        """Recompile one guild's rule set and swap it in.
+
+        On error the previous matcher stays active and the error is re-raised.
+        """
+        try:
+            matcher, mtime = await asyncio.to_thread(self._load, guild_id)
+        except Exception as e:
+            bot_logger.system(
+                f"Failed to load filter rules for guild {guild_id}",
+                operation="reload_filters",
+                error=e
+            )
+            raise
+
+        if matcher is None:
+            self._matchers.pop(guild_id, None)
+            self._mtimes.pop(guild_id, None)
+            return self.default
+
+        self._matchers[guild_id] = matcher
+        self._mtimes[guild_id] = mtime
+        bot_logger.system(
+            f"Loaded filter rules for guild {guild_id}",
+            operation="reload_filters"
+        )
+        return matcher
+
+    def _scan(self) -> Dict[int, float]:
+        """Return the mtime of every rule file on disk (runs in a worker thread)."""
+        mtimes = {}
+        if not self.directory.is_dir():
+            return mtimes
+        for path in self.directory.glob('*.json'):
+            if path.stem.isdigit():
+                try:
+                    mtimes[int(path.stem)] = path.stat().st_mtime
+                except FileNotFoundError:
+                    pass  # Removed between glob and stat
+        return mtimes
+
+    async def reload_changed(self):
+        """Reload only the guilds whose rule files changed, appeared or vanished."""
+        await self.domain_lists.reload_changed()
+        on_disk = await asyncio.to_thread(self._scan)
+        changed = [gid for gid, mtime in on_disk.items() if self._mtimes.get(gid) != mtime]
+        changed += [gid for gid in self._mtimes if gid not in on_disk]
+        for guild_id in changed:
+            try:
+                await self.reload(guild_id)
+            except Exception:
+                # Already logged by reload(). Remember the broken file so it is not retried until it changes again
+                if guild_id in on_disk:
+                    self._mtimes[guild_id] = on_disk[guild_id]
+
+    async def watch(self, interval: float):
+        """Load every rule set, then poll the directory for changes."""
+        while True:
+            try:
+                await self.reload_changed()
+            except Exception as e:
+                # One bad poll must not end hot reloading for good
+                bot_logger.system("Failed to check filter rules for changes", operation="reload_filters", error=e)
+            await asyncio.sleep(interval)
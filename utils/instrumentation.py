@@ -0,0 +1,308 @@
+import asyncio
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+import discord
+from discord import app_commands
+from discord.webhook.async_ import async_context
+
+from utils.logger import bot_logger
+from utils.metrics import Gauge, metrics, percentile
+
+# Discord fails an interaction that gets no response within 3 seconds;
+# commands that take this long to respond are flagged
+SLOW_RESPONSE = 2.5
+# Interaction callbacks are the first response; followups go to the webhook routes
+CALLBACK_ROUTE = "/interactions/{webhook_id}/{webhook_token}/callback"
+
+COMMAND_SECONDS = metrics.histogram(
+    "modbot_command_seconds",
+    "Time from a slash command interaction being created to its handler finishing.",
+    ("command", "outcome")
+)
+COMMAND_FIRST_RESPONSE_SECONDS = metrics.histogram(
+    "modbot_command_first_response_seconds",
+    "Time from a slash command interaction being created to its first response being sent.",
+    ("command",)
+)
+COMMAND_REST_SECONDS = metrics.histogram(
+    "modbot_command_rest_seconds",
+    "Time a slash command spent waiting on Discord REST calls.",
+    ("command",)
+)
+SLOW_RESPONSES = metrics.counter(
+    "modbot_command_slow_responses_total",
+    "Slash commands that responded close to, or after, the 3 second deadline.",
+    ("command",)
+)
+REST_CALLS = metrics.counter(
+    "modbot_rest_calls_total",
+    "Discord REST requests issued, by route template and result.",
+    ("method", "route", "status")
+)
+REST_SECONDS = metrics.histogram(
+    "modbot_rest_seconds",
+    "Discord REST request time, including rate-limit waits.",
+    ("method", "route")
+)
+GATEWAY_LATENCY = metrics.gauge(
+    "modbot_gateway_latency_seconds",
+    "Gateway heartbeat latency (bot.latency)."
+)
+CACHE_SIZE = metrics.gauge(
+    "modbot_cache_size",
+    "Objects held in the bot's caches.",
+    ("cache",)
+)
+QUEUE_DEPTH = metrics.gauge(
+    "modbot_queue_depth",
+    "Items waiting in the bot's background queues.",
+    ("queue",)
+)
+
+
+def command_outcome(error: Exception) -> str:
+    """A short label for why an app command failed."""
+    if isinstance(error, app_commands.CommandOnCooldown):
+        return "cooldown"
+    if isinstance(error, app_commands.CheckFailure):
+        return "denied"
+    return "error"
+
+
+class InteractionTiming:
+    """Timing of one slash command, shared by every task it spawns."""
+
+    __slots__ = ('created', 'first_response', 'rest_time', 'rest_calls')
+
+    def __init__(self, created: float):
+        self.created = created
+        self.first_response: Optional[float] = None
+        self.rest_time = 0.0
+        self.rest_calls = 0
+
+
+# The command whose REST calls are being timed; tasks a command starts inherit it
+_current_timing: ContextVar[Optional[InteractionTiming]] = ContextVar('interaction_timing', default=None)
+
+
+class CommandTimings:
+    """Rolling per-command samples for percentiles in /perf.
+
+    Each command keeps its last ``window`` samples of (total, first response,
+    REST time); percentiles are computed when asked for, not per command.
+    """
+
+    def __init__(self, window: int = 500):
+        self.window = window
+        self.samples: Dict[str, Deque[Tuple[float, Optional[float], float]]] = {}
+        self.counts: Dict[str, int] = {}
+        self.slow: Dict[str, int] = {}
+
+    def add(self, command: str, total: float, first_response: Optional[float], rest: float, slow: bool):
+        samples = self.samples.get(command)
+        if samples is None:
+            samples = self.samples[command] = deque(maxlen=self.window)
+        samples.append((total, first_response, rest))
+        self.counts[command] = self.counts.get(command, 0) + 1
+        if slow:
+            self.slow[command] = self.slow.get(command, 0) + 1
+
+    def summary(self, command: str) -> Dict[str, float]:
+        """Percentiles over the command's recent samples, in seconds."""
+        samples = self.samples.get(command) or ()
+        totals = sorted(sample[0] for sample in samples)
+        firsts = sorted(sample[1] for sample in samples if sample[1] is not None)
+        rest = sum(sample[2] for sample in samples)
+        return {
+            'count': self.counts.get(command, 0),
+            'slow': self.slow.get(command, 0),
+            'samples': len(totals),
+            'p50': percentile(totals, 50),
+            'p95': percentile(totals, 95),
+            'p99': percentile(totals, 99),
+            'first_p50': percentile(firsts, 50),
+            'first_p95': percentile(firsts, 95),
+            'first_p99': percentile(firsts, 99),
+            'rest_share': rest / sum(totals) if totals and sum(totals) else 0.0,
+        }
+
+    def commands(self) -> List[str]:
+        return sorted(self.samples)
+
+
+class InstrumentedCommandTree(app_commands.CommandTree):
+    """Command tree that times every slash command without touching the cogs.
+
+    ``interaction_check`` runs at the start of every invocation and starts
+    the clock (from ``interaction.created_at``, so gateway delay counts
+    towards the deadline like it does for Discord). REST calls made while
+    the command runs are added to its timing through a context variable,
+    and the interaction callback marks the first response. Failed commands
+    finish in ``on_error``; successful ones arrive as
+    ``app_command_completion`` events, which ModBot passes to ``finish``.
+    """
+
+    def __init__(self, client, **kwargs):
+        super().__init__(client, **kwargs)
+        self.timings = CommandTimings()
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.type is discord.InteractionType.application_command:
+            timing = InteractionTiming(interaction.created_at.timestamp())
+            interaction.extras['timing'] = timing
+            _current_timing.set(timing)
+        return True
+
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        self.finish(interaction, command_outcome(error))
+        await super().on_error(interaction, error)
+
+    def finish(self, interaction: discord.Interaction, outcome: str):
+        """Record a finished slash command in the metrics and rolling stats."""
+        timing: Optional[InteractionTiming] = interaction.extras.pop('timing', None)
+        if timing is None:
+            return
+        command = interaction.command
+        name = command.qualified_name if command is not None else "unknown"
+        total = max(time.time() - timing.created, 0.0)
+        first = timing.first_response - timing.created if timing.first_response is not None else None
+
+        COMMAND_SECONDS.observe(total, command=name, outcome=outcome)
+        COMMAND_REST_SECONDS.observe(timing.rest_time, command=name)
+        if first is not None:
+            COMMAND_FIRST_RESPONSE_SECONDS.observe(max(first, 0.0), command=name)
+        # Slow to respond, or still had not responded when the deadline was near
+        slow = (first if first is not None else total) >= SLOW_RESPONSE
+        if slow:
+            SLOW_RESPONSES.inc(command=name)
+            bot_logger.command(
+                name,
+                str(interaction.user),
+                interaction.guild.name if interaction.guild else "DM",
+                status="slow_response",
+                first_response=round(first, 3) if first is not None else None,
+                total=round(total, 3),
+                rest=round(timing.rest_time, 3),
+                rest_calls=timing.rest_calls
+            )
+        self.timings.add(name, total, first, timing.rest_time, slow)
+
+
+def instrument_http(client):
+    """Count and time every REST request made through ``client``.
+
+    Wraps ``request`` on the instance: the bot's HTTP client for regular
+    calls, and the webhook adapter that interaction responses and followups
+    go through. Routes are labelled by their template
+    (``/channels/{channel_id}/messages``), which keeps the label set small.
+    The time is also added to the slash command being run, if any.
+    """
+    request = client.request
+    if getattr(request, '_instrumented', False):
+        return
+
+    async def instrumented_request(route, *args, **kwargs):
+        start = time.perf_counter()
+        timing = _current_timing.get()
+        if timing is not None and timing.first_response is None and route.path == CALLBACK_ROUTE:
+            timing.first_response = time.time()
+        status = "ok"
+        try:
+            return await request(route, *args, **kwargs)
+        except discord.HTTPException as e:
+            status = str(e.status)
+            raise
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            REST_SECONDS.observe(elapsed, method=route.method, route=route.path)
+            REST_CALLS.inc(method=route.method, route=route.path, status=status)
+            if timing is not None:
+                timing.rest_time += elapsed
+                timing.rest_calls += 1
+
+    instrumented_request._instrumented = True
+    client.request = instrumented_request
+
+
+def instrument_rest(bot):
+    """Instrument the bot's HTTP client and the interaction webhook adapter."""
+    instrument_http(bot.http)
+    # Interaction responses use the default adapter from this context variable
+    instrument_http(async_context.get())
+
+
+class LoopGauges:
+    """Copies state owned by the event loop into gauges at a fixed interval.
+
+    /metrics is rendered on the web server's thread, where iterating the
+    bot's caches or queues could race with the loop changing them. The
+    callbacks added here run on the loop instead and the gauges hold plain
+    numbers, which the scrape reads under each gauge's lock.
+    """
+
+    def __init__(self, interval: float = 10.0):
+        self.interval = interval
+        # (gauge, labels) -> (gauge, callback, labels)
+        self._sources: Dict[tuple, Tuple[Gauge, Callable[[], float], Dict[str, str]]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, gauge: Gauge, function: Callable[[], float], **labels):
+        """Sample ``function`` into ``gauge``; adding the same labels again replaces it."""
+        self._sources[id(gauge), tuple(sorted(labels.items()))] = (gauge, function, labels)
+        if self._task is not None:
+            self._sample_one(gauge, function, labels)
+
+    def _sample_one(self, gauge: Gauge, function: Callable[[], float], labels: Dict[str, str]):
+        try:
+            gauge.set(float(function()), **labels)
+        except Exception:
+            # State that is not ready yet (e.g. before login) keeps the last value
+            pass
+
+    def sample(self):
+        for gauge, function, labels in list(self._sources.values()):
+            self._sample_one(gauge, function, labels)
+
+    def start(self):
+        """Start sampling on the running loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            self.sample()
+            await asyncio.sleep(self.interval)
+
+
+loop_gauges = LoopGauges()
+
+
+def register_bot_gauges(bot):
+    """Gauges for the bot's latency, caches and queues.
+
+    Figures owned by the event loop are sampled there by ``loop_gauges``;
+    only the log record queue, which is thread-safe, is read at scrape time.
+    """
+    loop_gauges.add(GATEWAY_LATENCY, lambda: bot.latency)
+    loop_gauges.add(CACHE_SIZE, lambda: len(bot.guilds), cache="guilds")
+    loop_gauges.add(CACHE_SIZE, lambda: len(bot.users), cache="users")
+    loop_gauges.add(CACHE_SIZE, lambda: sum(len(guild.members) for guild in bot.guilds), cache="members")
+    loop_gauges.add(CACHE_SIZE, lambda: len(bot.cached_messages), cache="messages")
+    loop_gauges.add(QUEUE_DEPTH, lambda: bot.log_dispatcher.depth, queue="mod_log")
+    QUEUE_DEPTH.set_function(lambda: bot_logger.queue_depth, queue="log_records")
+    loop_gauges.start()
@@ -0,0 +1,215 @@
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+import discord
+
+from utils.logger import bot_logger
+
+# Discord accepts up to 10 embeds and 6000 embed characters per message
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+MAX_DESCRIPTION_CHARS = 4096
+
+
+def _fit(embed: discord.Embed) -> discord.Embed:
+    """Trim an embed Discord would reject, so it cannot fail a whole batch."""
+    description = embed.description
+    if description:
+        limit = min(MAX_DESCRIPTION_CHARS, len(description) - (len(embed) - MAX_EMBED_CHARS_PER_MESSAGE))
+        if len(description) > limit:
+            embed.description = description[:max(limit - 1, 0)] + "…"
+    while len(embed) > MAX_EMBED_CHARS_PER_MESSAGE and embed.fields:
+        embed.remove_field(len(embed.fields) - 1)
+    return embed
+
+
+class LogDispatcher:
+    """Sends mod-log embeds to the bot's log channel in the background.
+
+    Commands and events call ``submit`` and move on; a single sender task
+    packs queued embeds into messages of up to 10 and sends them once a
+    message is full or ``max_delay`` seconds after the first embed arrived.
+    The queue is bounded: when it is full, ``submit`` applies the drop
+    policy ("oldest" discards the oldest queued embed, "newest" rejects the
+    new one), while ``put`` waits for room instead. Until the log channel
+    is known, embeds are kept (bounded); ``disable`` drops them once it is
+    clear there is no channel.
+    """
+
+    def __init__(self,
+                 bot,
+                 max_queue: int = 1000,
+                 max_delay: float = 2.0,
+                 drop_policy: str = "oldest"):
+        if drop_policy not in ("oldest", "newest"):
+            raise ValueError("drop_policy must be 'oldest' or 'newest'")
+        self.bot = bot
+        self.max_queue = max_queue
+        self.max_delay = max_delay
+        self.drop_policy = drop_policy
+
+        # (embed, monotonic time it was queued)
+        self._queue: Deque[Tuple[discord.Embed, float]] = deque()
+        self._wakeup = asyncio.Event()
+        self._space = asyncio.Event()
+        self._space.set()
+        self._task: Optional[asyncio.Task] = None
+        # False once the bot found no log channel to send to
+        self.enabled = True
+
+        # Metrics
+        self.submitted = 0
+        self.dropped = 0
+        self.sent_embeds = 0
+        self.sent_messages = 0
+        self.send_attempts = 0
+        self.failed = 0
+        self.last_send_latency = 0.0
+        self.max_send_latency = 0.0
+        self._total_send_latency = 0.0
+        self._total_wait = 0.0
+
+    @property
+    def depth(self) -> int:
+        """Number of embeds waiting to be sent."""
+        return len(self._queue)
+
+    def start(self):
+        """Start the background sender."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 10.0):
+        """Stop the sender after flushing whatever is queued."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await asyncio.wait_for(self._drain(), timeout)
+        except asyncio.TimeoutError:
+            self.dropped += len(self._queue)
+            self._queue.clear()
+
+    def disable(self):
+        """Drop the backlog and refuse new embeds; there is no channel to send to."""
+        self.enabled = False
+        self.dropped += len(self._queue)
+        self._queue.clear()
+        self._space.set()
+
+    def submit(self, embed: discord.Embed) -> bool:
+        """Queue an embed without waiting; returns False if it was dropped."""
+        self.submitted += 1
+        if not self.enabled:
+            self.dropped += 1
+            return False
+        if len(self._queue) >= self.max_queue:
+            self.dropped += 1
+            if self.drop_policy == "newest":
+                return False
+            self._queue.popleft()
+        self._enqueue(embed)
+        return True
+
+    async def put(self, embed: discord.Embed):
+        """Queue an embed, waiting for room if the queue is full."""
+        while self.enabled and len(self._queue) >= self.max_queue:
+            self._space.clear()
+            await self._space.wait()
+        self.submitted += 1
+        if not self.enabled:
+            self.dropped += 1
+            return
+        self._enqueue(embed)
+
+    def _enqueue(self, embed: discord.Embed):
+        self._queue.append((_fit(embed), time.monotonic()))
+        if len(self._queue) >= self.max_queue:
+            self._space.clear()
+        self._wakeup.set()
+
+    def _take_batch(self) -> List[discord.Embed]:
+        """Pop as many queued embeds as fit in one message."""
+        batch = []
+        chars = 0
+        now = time.monotonic()
+        while self._queue and len(batch) < MAX_EMBEDS_PER_MESSAGE:
+            embed, queued = self._queue[0]
+            size = len(embed)
+            if batch and chars + size > MAX_EMBED_CHARS_PER_MESSAGE:
+                break
+            self._queue.popleft()
+            batch.append(embed)
+            chars += size
+            self._total_wait += now - queued
+        if len(self._queue) < self.max_queue:
+            self._space.set()
+        return batch
+
+    async def _send(self, batch: List[discord.Embed]):
+        channel = self.bot.log_channel
+        start = time.monotonic()
+        self.send_attempts += 1
+        try:
+            await channel.send(embeds=batch)
+            self.sent_embeds += len(batch)
+            self.sent_messages += 1
+        except discord.HTTPException as e:
+            self.failed += len(batch)
+            bot_logger.system("Failed to send mod-log embeds", operation="log_dispatch", error=e)
+        latency = time.monotonic() - start
+        self.last_send_latency = latency
+        self.max_send_latency = max(self.max_send_latency, latency)
+        self._total_send_latency += latency
+
+    async def _drain(self):
+        while self._queue and self.bot.log_channel is not None:
+            await self._send(self._take_batch())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+
+            # Give a partial batch until max_delay after its oldest embed to fill up
+            wait = self._queue[0][1] + self.max_delay - time.monotonic()
+            if len(self._queue) < MAX_EMBEDS_PER_MESSAGE and wait > 0:
+                self._wakeup.clear()
+                # A timer rather than wait_for, which can swallow cancellation
+                timer = loop.call_later(wait, self._wakeup.set)
+                try:
+                    await self._wakeup.wait()
+                finally:
+                    timer.cancel()
+                continue
+
+            if self.bot.log_channel is None:
+                # Not ready yet; keep the backlog (bounded) until the channel is known
+                await asyncio.sleep(self.max_delay)
+                continue
+            await self._send(self._take_batch())
+
+    def stats(self) -> Dict[str, float]:
+        """Return queue depth, drop counts and send latency figures."""
+        delivered = self.sent_embeds or 1
+        return {
+            'depth': self.depth,
+            'submitted': self.submitted,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'sent_embeds': self.sent_embeds,
+            'sent_messages': self.sent_messages,
+            'send_attempts': self.send_attempts,
+            'last_send_latency': self.last_send_latency,
+            'avg_send_latency': self._total_send_latency / self.send_attempts if self.send_attempts else 0.0,
+            'max_send_latency': self.max_send_latency,
+            'avg_queue_wait': self._total_wait / delivered,
+        }
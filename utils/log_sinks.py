@@ -0,0 +1,232 @@
+import gzip
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional
+
+from utils.audit_index import AuditIndexBuilder, index_path
+
+try:
+    import zstandard
+except ImportError:  # Optional; rotated segments fall back to gzip
+    zstandard = None
+
+DEFAULT_COMPRESSION = "zstd" if zstandard is not None else "gzip"
+COMPRESSED_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+# Segments are compressed in independent blocks of whole lines, so one record can be read without the rest
+BLOCK_SIZE = 256 * 1024
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Formats a record as one JSON object per line.
+
+    The ``context`` dict a bot_logger call builds is written as is, next to
+    the record's time, level, category and message.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': round(record.created, 3),
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'category': getattr(record, 'metadata', None),
+            'message': record.getMessage(),
+            'context': getattr(record, 'context', None) or {},
+        }
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = self.formatException(record.exc_info)
+            entry['error'] = record.exc_text
+        # Anything that is not JSON-native (members, channels, ...) is written as its str()
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RotatingJsonLinesHandler(logging.Handler):
+    """Writes JSON lines to ``<directory>/<prefix>.jsonl`` and rotates it.
+
+    The active file is rotated once it would grow past ``max_bytes`` or has
+    been open for ``interval`` seconds. Rotated segments are renamed to
+    ``<prefix>.<start time>-<seq>.jsonl`` and compressed on a background thread,
+    which also writes their audit index (see utils.audit_index). The oldest
+    segments are then deleted until at most ``max_segments`` remain and they
+    fit in ``max_total_bytes``.
+    """
+
+    def __init__(self,
+                 directory: str,
+                 prefix: str,
+                 max_bytes: int = 10 * 1024 * 1024,
+                 interval: float = 24 * 60 * 60,
+                 max_segments: int = 30,
+                 max_total_bytes: int = 500 * 1024 * 1024,
+                 compression: Optional[str] = DEFAULT_COMPRESSION):
+        super().__init__()
+        if compression == "zstd" and zstandard is None:
+            compression = "gzip"
+        if compression not in (None, "gzip", "zstd"):
+            raise ValueError("compression must be 'gzip', 'zstd' or None")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.prefix = prefix
+        self.path = self.directory / f"{prefix}.jsonl"
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.max_segments = max_segments
+        self.max_total_bytes = max_total_bytes
+        self.compression = compression
+
+        self._open()
+
+        # Rotated segments are compressed one at a time; None stops the worker
+        self._jobs: "queue.SimpleQueue[Optional[Path]]" = queue.SimpleQueue()
+        self._worker = threading.Thread(target=self._compress_worker, name=f"{prefix}-log-compress", daemon=True)
+        self._worker.start()
+        # Segments left uncompressed by an interrupted run
+        for segment in self.segments():
+            if segment.suffix == ".jsonl":
+                self._jobs.put(segment)
+
+    def _open(self):
+        self.stream = open(self.path, "a", encoding="utf-8")
+        self.size = self.stream.tell()
+        self.opened_at = time.time()
+        if self.size:
+            # Continuing a file from an earlier run; its age starts at its first record
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self.opened_at = json.loads(f.readline())['ts']
+            except (ValueError, KeyError, TypeError):
+                pass
+
+    def segments(self) -> List[Path]:
+        """Rotated segments, oldest first."""
+        return sorted(
+            path for path in self.directory.glob(f"{self.prefix}.*.jsonl*")
+            if not path.name.endswith(".tmp")
+        )
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            line = self.format(record) + "\n"
+            size = len(line.encode("utf-8"))
+            if self.size and (self.size + size > self.max_bytes or time.time() - self.opened_at >= self.interval):
+                self.rotate()
+            self.stream.write(line)
+            self.size += size
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        with self.lock:
+            if self.stream and not self.stream.closed:
+                self.stream.flush()
+
+    def rotate(self):
+        """Close the active file, queue it for compression and start a new one."""
+        self.stream.close()
+        started = datetime.fromtimestamp(self.opened_at, timezone.utc).strftime("%Y%m%dT%H%M%S")
+        # The sequence number keeps segments started within the same second in order
+        n = 0
+        while True:
+            segment = self.directory / f"{self.prefix}.{started}-{n:03d}.jsonl"
+            if not any(self.directory.glob(f"{segment.name}*")):
+                break
+            n += 1
+        os.replace(self.path, segment)
+        self._open()
+        self._jobs.put(segment)
+
+    def close(self):
+        with self.lock:
+            if self.stream and not self.stream.closed:
+                self.stream.close()
+        # Let queued compression finish before the process exits
+        if self._worker.is_alive():
+            self._jobs.put(None)
+            self._worker.join()
+        super().close()
+
+    def _compress_worker(self):
+        # Retention runs only on this thread, so it never races a compression
+        try:
+            self._apply_retention()
+        except OSError as e:
+            print(f"Warning: Failed to prune log segments: {e}", file=sys.stderr)
+        while True:
+            segment = self._jobs.get()
+            if segment is None:
+                return
+            try:
+                self._compress(segment)
+                self._apply_retention()
+            except OSError as e:
+                # This is the logger's own sink failing, so report it directly
+                print(f"Warning: Failed to compress or prune log segment {segment}: {e}", file=sys.stderr)
+
+    def _compress(self, segment: Path):
+        """Compress a rotated segment block by block and write its audit index."""
+        if not segment.exists():
+            return
+        index = AuditIndexBuilder()
+        if self.compression is None:
+            with open(segment, "rb") as src:
+                offset = 0
+                for block in iter(lambda: src.read(BLOCK_SIZE), b""):
+                    # Extend to the end of the line so no record spans two blocks
+                    if not block.endswith(b"\n"):
+                        block += src.readline()
+                    index.add_block(offset, block)
+                    offset += len(block)
+            index.write(index_path(segment), segment.name, None)
+            return
+
+        target = segment.with_name(segment.name + COMPRESSED_SUFFIXES[self.compression])
+        tmp = target.with_name(target.name + ".tmp")
+        if self.compression == "zstd":
+            compress = zstandard.ZstdCompressor(level=10).compress
+        else:
+            compress = lambda data: gzip.compress(data, compresslevel=6)
+        with open(segment, "rb") as src, open(tmp, "wb") as dst:
+            offset = 0
+            while True:
+                block = src.read(BLOCK_SIZE)
+                if not block:
+                    break
+                # Extend to the end of the line so no record spans two blocks
+                if not block.endswith(b"\n"):
+                    block += src.readline()
+                index.add_block(offset, block, dst.tell())
+                # Concatenated gzip members and zstd frames still read as one stream
+                dst.write(compress(block))
+                offset += len(block)
+        index.write(index_path(segment), target.name, self.compression)
+        os.replace(tmp, target)
+        segment.unlink()
+
+    def _apply_retention(self):
+        """Delete the oldest segments until the limits are met."""
+        segments, sizes = [], []
+        for path in self.segments():
+            try:
+                sizes.append(path.stat().st_size)
+            except FileNotFoundError:
+                continue  # Removed since it was listed, e.g. replaced by its compressed copy
+            segments.append(path)
+        count = len(segments)
+        total = sum(sizes)
+        for path, size in zip(segments, sizes):
+            if count <= self.max_segments and total <= self.max_total_bytes:
+                break
+            # Never delete a segment that is still waiting to be compressed
+            if path.suffix == ".jsonl" and self.compression is not None:
+                continue
+            path.unlink(missing_ok=True)
+            index_path(path).unlink(missing_ok=True)
+            count -= 1
+            total -= size
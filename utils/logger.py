@@ -1,17 +1,25 @@
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
+import threading
 from datetime import datetime
 import pytz
 from typing import Optional, Any, Dict
 import json
-import traceback
 from pathlib import Path
 from colorama import Fore, Style, init
 import platform
+from utils.log_sinks import JsonLinesFormatter, RotatingJsonLinesHandler
 
 # Initialize colorama for Windows support
 init()
 
+# Process metadata attached to system logs; it never changes while running
+SYSTEM_NAME = platform.system()
+PYTHON_VERSION = platform.python_version()
+
 class ColoredFormatter(logging.Formatter):
     """Custom formatter with colors and structured, readable output."""
     
@@ -33,6 +41,9 @@ class ColoredFormatter(logging.Formatter):
     def __init__(self, timezone: pytz.timezone):
         super().__init__()
         self.timezone = timezone
+        # Records arrive in bursts, so reuse the last second's timestamp
+        self._last_second = None
+        self._last_timestamp = ""
 
     def format_context(self, context: Dict[str, Any]) -> str:
         """Format context data in a clean, readable format."""
@@ -92,12 +103,13 @@ class ColoredFormatter(logging.Formatter):
         return "\n  " + "\n  ".join(lines) if lines else ""
 
     def format(self, record: logging.LogRecord) -> str:
-        # Add timezone info to the timestamp
-        created = datetime.fromtimestamp(record.created)
-        created = pytz.utc.localize(created).astimezone(self.timezone)
-        
-        # Format timestamp in 12-hour format
-        record.timestamp = created.strftime("%I:%M:%S %p")
+        # Format timestamp in 12-hour format, in the configured timezone
+        second = int(record.created)
+        if second != self._last_second:
+            created = datetime.fromtimestamp(second, self.timezone)
+            self._last_timestamp = created.strftime("%I:%M:%S %p")
+            self._last_second = second
+        record.timestamp = self._last_timestamp
         
         # Add color to the level name
         level_color = self.COLORS.get(record.levelname, '')
@@ -124,17 +136,55 @@ class ColoredFormatter(logging.Formatter):
 
         # Add error information if available
         if record.exc_info:
-            error_lines = traceback.format_exception(*record.exc_info)
+            # Cached on the record, so the file handler reuses it
+            if not record.exc_text:
+                record.exc_text = self.formatException(record.exc_info)
             message_lines.append(f"{Fore.RED}Error Details:{Style.RESET_ALL}")
-            message_lines.extend(f"  {line.rstrip()}" for line in error_lines)
+            message_lines.extend(f"  {line}" for line in record.exc_text.splitlines())
 
         return "\n".join(message_lines)
 
-class DiscordLogger:
-    """Enhanced logger for Discord bot with rich formatting and metadata."""
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that leaves formatting to the listener thread.
+
+    The stock QueueHandler formats each record before queueing it, which
+    would keep the formatting cost on the caller's thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+class FlushableQueueListener(logging.handlers.QueueListener):
+    """Queue listener that signals when it reaches a flush marker.
 
-    def __init__(self, bot_name: str, timezone_str: str = "UTC"):
+    Records are handled in order, so once the marker is reached every
+    record queued before it has been passed to the handlers.
+    """
+
+    def handle(self, record: logging.LogRecord):
+        marker = getattr(record, 'flush_marker', None)
+        if marker is not None:
+            marker.set()
+            return
+        super().handle(record)
+
+class DiscordLogger:
+    """Enhanced logger for Discord bot with rich formatting and metadata.
+
+    With ``queued`` set, log calls only put the record on a queue; a
+    listener thread formats it and writes it to the console and log file.
+    Calls below ``level`` return before building any context.
+    """
+
+    def __init__(self,
+                 bot_name: str,
+                 timezone_str: str = "UTC",
+                 queued: bool = True,
+                 level: int = logging.DEBUG):
         self.bot_name = bot_name
+        self.queued = queued
+        self.level = level
+        self.listener: Optional[logging.handlers.QueueListener] = None
         try:
             self.timezone = pytz.timezone(timezone_str)
         except pytz.exceptions.UnknownTimeZoneError:
@@ -145,35 +195,67 @@ class DiscordLogger:
     def setup_logging(self):
         """Set up logging configuration."""
         # Create logs directory if it doesn't exist
-        log_dir = Path("logs")
+        log_dir = self.log_dir = Path("logs")
         log_dir.mkdir(exist_ok=True)
 
         # Create the logger
         self.logger = logging.getLogger(self.bot_name)
-        self.logger.setLevel(logging.DEBUG)
+        self.logger.setLevel(self.level)
 
         # Create console handler with color formatting
         console_handler = logging.StreamHandler(sys.stdout)
         console_handler.setFormatter(ColoredFormatter(self.timezone))
         console_handler.setLevel(logging.INFO)
         
-        # Create file handler for all logs
-        current_time = datetime.now(self.timezone).strftime("%Y%m%d_%H%M%S")
-        file_handler = logging.FileHandler(
-            f"logs/{self.bot_name}_{current_time}.log",
-            encoding='utf-8'
-        )
-        # Use more detailed format for file logs
-        file_formatter = logging.Formatter(
-            '[%(asctime)s] [%(levelname)s] %(message)s\n%(context)s\n',
-            datefmt='%Y-%m-%d %I:%M:%S %p %Z'
-        )
-        file_handler.setFormatter(file_formatter)
+        # Create file handler for all logs, one JSON object per line
+        file_handler = self.file_handler = RotatingJsonLinesHandler(log_dir, self.bot_name)
+        file_handler.setFormatter(JsonLinesFormatter())
         file_handler.setLevel(logging.DEBUG)
 
         # Add handlers
-        self.logger.addHandler(console_handler)
-        self.logger.addHandler(file_handler)
+        if self.queued:
+            # Formatting and I/O happen on the listener thread
+            log_queue = self.log_queue = queue.SimpleQueue()
+            self.listener = FlushableQueueListener(
+                log_queue, console_handler, file_handler, respect_handler_level=True
+            )
+            self.listener.start()
+            self.logger.addHandler(DeferredQueueHandler(log_queue))
+            atexit.register(self.shutdown)
+        else:
+            self.logger.addHandler(console_handler)
+            self.logger.addHandler(file_handler)
+
+    @property
+    def queue_depth(self) -> int:
+        """Records waiting for the listener thread."""
+        return self.log_queue.qsize() if self.queued else 0
+
+    def flush(self, timeout: float = 5.0):
+        """Write every record logged so far to the log file.
+
+        Blocks until the listener thread has drained the queue up to this
+        call, so run it off the event loop.
+        """
+        if self.listener is not None:
+            done = threading.Event()
+            self.log_queue.put(logging.makeLogRecord({'flush_marker': done}))
+            done.wait(timeout)
+        self.file_handler.flush()
+
+    def set_level(self, level):
+        """Change the minimum level that is logged, e.g. "INFO" or logging.INFO."""
+        self.logger.setLevel(level.upper() if isinstance(level, str) else level)
+        self.level = self.logger.level
+
+    def shutdown(self):
+        """Write out any queued records and stop the listener thread."""
+        if self.listener is not None:
+            listener, self.listener = self.listener, None
+            listener.stop()
+            for handler in listener.handlers:
+                handler.flush()
+                handler.close()
 
     def _log(self, 
              level: int, 
@@ -182,10 +264,8 @@ class DiscordLogger:
              context: Optional[Dict[str, Any]] = None,
              exc_info: Optional[tuple] = None):
         """Internal method to handle logging with metadata and context."""
-        if context is None:
-            context = {}
-        context['timestamp'] = datetime.now(self.timezone).isoformat()
-        extra = {'metadata': metadata, 'context': context}
+        # The record's own creation time is the timestamp; formatters render it
+        extra = {'metadata': metadata, 'context': context or {}}
         self.logger.log(level, message, exc_info=exc_info, extra=extra)
 
     def command(self, 
@@ -197,6 +277,13 @@ class DiscordLogger:
                 channel: Optional[str] = None,
                 **kwargs):
         """Log command execution with rich context."""
+        if error:
+            level = logging.ERROR
+        else:
+            level = logging.INFO if status == "completed" else logging.DEBUG
+        if not self.logger.isEnabledFor(level):
+            return
+
         context = {
             'command': command_name,
             'user': user,
@@ -215,7 +302,6 @@ class DiscordLogger:
                 exc_info=(type(error), error, error.__traceback__)
             )
         else:
-            level = logging.INFO if status == "completed" else logging.DEBUG
             self._log(
                 level,
                 f"Command '{command_name}' {status}",
@@ -228,6 +314,9 @@ class DiscordLogger:
               details: Optional[Dict[str, Any]] = None,
               error: Optional[Exception] = None):
         """Log Discord events with context."""
+        if not self.logger.isEnabledFor(logging.ERROR if error else logging.INFO):
+            return
+
         context = {
             'event': event_name,
             'details': details or {}
@@ -254,10 +343,13 @@ class DiscordLogger:
                operation: Optional[str] = None,
                error: Optional[Exception] = None):
         """Log system-level operations."""
+        if not self.logger.isEnabledFor(logging.ERROR if error else logging.INFO):
+            return
+
         context = {
             'operation': operation,
-            'system': platform.system(),
-            'python_version': platform.python_version()
+            'system': SYSTEM_NAME,
+            'python_version': PYTHON_VERSION
         }
 
         if error:
@@ -280,12 +372,24 @@ class DiscordLogger:
               action: str, 
               user: str, 
               target: str, 
-              details: Optional[Dict[str, Any]] = None):
-        """Log moderation actions for audit purposes."""
+              details: Optional[Dict[str, Any]] = None,
+              user_id: Optional[int] = None,
+              target_id: Optional[int] = None,
+              guild_id: Optional[int] = None):
+        """Log moderation actions for audit purposes.
+
+        The ids are what utils.audit_index indexes the record by.
+        """
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+
         context = {
             'action': action,
             'user': user,
             'target': target,
+            'user_id': user_id,
+            'target_id': target_id,
+            'guild_id': guild_id,
             'details': details or {}
         }
 
@@ -0,0 +1,143 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from pathlib import Path
+from typing import Deque, Dict, List, Optional
+
+from utils.logger import bot_logger
+from utils.metrics import metrics, percentile
+
+LOOP_LAG_SECONDS = metrics.histogram(
+    "modbot_event_loop_lag_seconds",
+    "How late the event loop ran a timer that was due, sampled continuously.",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+LOOP_STALLS = metrics.counter(
+    "modbot_event_loop_stalls_total",
+    "Times the event loop was blocked for longer than the watchdog threshold."
+)
+# Stalls are attributed to the innermost frame in the bot's own code
+BOT_ROOT = str(Path(__file__).resolve().parent.parent)
+
+
+class LoopStall:
+    """One period in which the event loop was blocked, and what it was running."""
+
+    __slots__ = ('when', 'duration', 'location', 'stack')
+
+    def __init__(self, when: float, location: str, stack: List[str]):
+        self.when = when
+        # Filled in once the loop runs again
+        self.duration: Optional[float] = None
+        self.location = location
+        self.stack = stack
+
+
+class LoopWatchdog:
+    """Measures event-loop lag and captures what blocked the loop.
+
+    A task on the loop sleeps for ``interval`` and records how late it woke
+    up. A separate thread checks when that task last ran; once the loop has
+    been stuck for ``threshold`` seconds it grabs the loop thread's current
+    stack, which is the callback doing the blocking. The last ``ring_size``
+    stalls are kept for ``/debug loop``.
+    """
+
+    def __init__(self,
+                 interval: float = 0.1,
+                 threshold: float = 0.25,
+                 ring_size: int = 20,
+                 stack_depth: int = 25):
+        self.interval = interval
+        self.threshold = threshold
+        self.stack_depth = stack_depth
+        self.stalls: Deque[LoopStall] = deque(maxlen=ring_size)
+        # Recent lag samples, for percentiles in /debug loop
+        self.recent: Deque[float] = deque(maxlen=3000)
+        self.max_lag = 0.0
+
+        self._beat = time.monotonic()
+        self._stall: Optional[LoopStall] = None
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Start sampling on the running loop and start the watcher thread."""
+        if self._task is not None and not self._task.done():
+            return
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._run())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._beat = now
+            lag = max(now - start - self.interval, 0.0)
+            LOOP_LAG_SECONDS.observe(lag)
+            self.recent.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+
+            stall, self._stall = self._stall, None
+            if stall is not None:
+                stall.duration = lag
+                bot_logger.system(
+                    f"Event loop blocked for {lag:.2f}s in {stall.location}",
+                    operation="loop_watchdog"
+                )
+
+    def _watch(self):
+        # Check a few times per threshold so a stall is caught while it is happening
+        while not self._stopped.wait(self.threshold / 4):
+            if self._stall is not None:
+                continue  # Already captured; the loop has not run since
+            blocked = time.monotonic() - self._beat - self.interval
+            if blocked < self.threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            summary = traceback.extract_stack(frame)[-self.stack_depth:]
+            del frame
+            own = [entry for entry in summary if entry.filename.startswith(BOT_ROOT)]
+            last = own[-1] if own else summary[-1] if summary else None
+            location = f"{Path(last.filename).name}:{last.lineno} in {last.name}" if last else "unknown"
+            stall = LoopStall(time.time() - blocked, location, traceback.format_list(summary))
+            self.stalls.append(stall)
+            self._stall = stall
+            LOOP_STALLS.inc()
+
+    def worst(self, count: int = 5) -> List[LoopStall]:
+        """The longest stalls still in the ring, longest first."""
+        return sorted(self.stalls, key=lambda stall: stall.duration or 0.0, reverse=True)[:count]
+
+    def stats(self) -> Dict[str, float]:
+        """Lag percentiles over the recent samples, in seconds."""
+        ordered = sorted(self.recent)
+        return {
+            'samples': len(ordered),
+            'p50': percentile(ordered, 50),
+            'p99': percentile(ordered, 99),
+            'max': self.max_lag,
+            'stalls': len(self.stalls),
+        }
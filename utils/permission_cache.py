@@ -0,0 +1,53 @@
+from typing import Dict, FrozenSet, Tuple
+
+import discord
+
+
+class ExemptionCache:
+    """Caches whether members are exempt from message filtering.
+
+    A member is exempt with Manage Messages or one of the guild's exempt
+    roles. Resolving that walks the member's roles, so the answer is kept
+    per (guild, member) until a member or role event invalidates it. Each
+    guild's entries are tied to the exempt-role set they were computed
+    with, so reloading a guild's rules resets only that guild.
+    """
+
+    def __init__(self, max_members_per_guild: int = 50_000):
+        self.max_members_per_guild = max_members_per_guild
+        # guild id -> (exempt roles the entries were computed with, member id -> exempt)
+        self._guilds: Dict[int, Tuple[FrozenSet[int], Dict[int, bool]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def is_exempt(self, member: discord.Member, exempt_roles: FrozenSet[int]) -> bool:
+        """Return True if the member's messages skip filtering."""
+        guild_id = member.guild.id
+        cached = self._guilds.get(guild_id)
+        if cached is None or cached[0] is not exempt_roles:
+            cached = self._guilds[guild_id] = (exempt_roles, {})
+        members = cached[1]
+
+        exempt = members.get(member.id)
+        if exempt is not None:
+            self.hits += 1
+            return exempt
+
+        self.misses += 1
+        exempt = member.guild_permissions.manage_messages or (
+            bool(exempt_roles) and any(role.id in exempt_roles for role in member.roles)
+        )
+        if len(members) >= self.max_members_per_guild:
+            members.clear()
+        members[member.id] = exempt
+        return exempt
+
+    def invalidate_member(self, guild_id: int, member_id: int):
+        """Forget one member, e.g. after their roles changed."""
+        cached = self._guilds.get(guild_id)
+        if cached is not None:
+            cached[1].pop(member_id, None)
+
+    def invalidate_guild(self, guild_id: int):
+        """Forget a whole guild, e.g. after a role's permissions changed."""
+        self._guilds.pop(guild_id, None)
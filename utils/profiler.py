@@ -0,0 +1,159 @@
+"""Sampling profiler and memory-growth snapshots for the running bot.
+
+``profile_cpu`` samples the stack of every thread from a background thread
+at a fixed interval; the cost is one stack walk per thread per sample, so
+overhead is bounded by the interval and not by how busy the bot is.
+``profile_memory`` diffs two tracemalloc snapshots taken ``duration``
+seconds apart. Both block, so run them in a thread (``asyncio.to_thread``
+from the bot, or a request thread in the keep-alive server), and only one
+profile runs at a time.
+"""
+import math
+import sys
+import sysconfig
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from typing import List, Tuple
+
+MAX_DURATION = 60.0
+DEFAULT_INTERVAL = 0.01
+MAX_DEPTH = 64
+
+STDLIB = sysconfig.get_paths()["stdlib"]
+# Stdlib frames a thread sits in while it has nothing to do
+IDLE_LEAVES = {"select", "poll", "wait", "get", "accept", "sleep", "_worker", "serve_forever", "readline"}
+
+_running = threading.Lock()
+
+
+class ProfilerBusy(RuntimeError):
+    """Another profile is already running."""
+
+
+def _frame_name(code) -> str:
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+class CpuProfile:
+    """Aggregated stack samples."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.duration = 0.0
+        self.samples = 0
+        self.idle = 0
+        # Collapsed stack "thread;outer;...;inner" -> samples
+        self.stacks: Counter = Counter()
+        self.own: Counter = Counter()
+        self.total: Counter = Counter()
+
+    def add(self, thread_name: str, frame):
+        codes = []
+        while frame is not None and len(codes) < MAX_DEPTH:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+        if not codes:
+            return
+        codes.reverse()
+        names = [_frame_name(code) for code in codes]
+        self.samples += 1
+        self.stacks[";".join([thread_name] + names)] += 1
+
+        leaf = codes[-1]
+        if leaf.co_name in IDLE_LEAVES and leaf.co_filename.startswith(STDLIB):
+            self.idle += 1
+            return
+        self.own[names[-1]] += 1
+        for name in set(names):
+            self.total[name] += 1
+
+    def collapsed(self) -> str:
+        """Stacks in the collapsed format read by flamegraph.pl and speedscope."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top(self, count: int = 30) -> List[Tuple[str, int, int]]:
+        """(function, own samples, total samples) for the hottest busy functions."""
+        return [(name, own, self.total[name]) for name, own in self.own.most_common(count)]
+
+    def report(self, count: int = 30) -> str:
+        busy = self.samples - self.idle
+        lines = [
+            f"{self.samples} samples over {self.duration:.1f}s every {self.interval * 1000:.0f} ms "
+            f"({self.idle} idle, {busy} busy)",
+            "",
+            f"{'own %':>7} {'total %':>8}  function (file:line)",
+        ]
+        for name, own, total in self.top(count):
+            lines.append(f"{own / (busy or 1):>7.1%} {total / (busy or 1):>8.1%}  {name}")
+        return "\n".join(lines) + "\n"
+
+
+def _sample(profile: CpuProfile, me: int):
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    for ident, frame in sys._current_frames().items():
+        if ident != me:
+            profile.add(names.get(ident, str(ident)), frame)
+
+
+def profile_cpu(duration: float, interval: float = DEFAULT_INTERVAL) -> CpuProfile:
+    """Sample every thread's stack for ``duration`` seconds."""
+    if not math.isfinite(duration):
+        raise ValueError("duration must be a finite number of seconds")
+    if not _running.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running")
+    try:
+        duration = min(max(duration, interval), MAX_DURATION)
+        profile = CpuProfile(interval)
+        me = threading.get_ident()
+        start = time.perf_counter()
+        deadline = start + duration
+        while True:
+            _sample(profile, me)
+            if time.perf_counter() >= deadline:
+                break
+            time.sleep(interval)
+        profile.duration = time.perf_counter() - start
+        return profile
+    finally:
+        _running.release()
+
+
+def profile_memory(duration: float, count: int = 30) -> str:
+    """Report where memory grew between two snapshots ``duration`` seconds apart."""
+    if not math.isfinite(duration):
+        raise ValueError("duration must be a finite number of seconds")
+    if not _running.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running")
+    started = not tracemalloc.is_tracing()
+    try:
+        duration = min(max(duration, 1.0), MAX_DURATION)
+        if started:
+            tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        time.sleep(duration)
+        after = tracemalloc.take_snapshot()
+        # Allocations made by tracemalloc itself are not the bot's
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        stats = after.filter_traces(filters).compare_to(before.filter_traces(filters), 'lineno')
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        if started:
+            tracemalloc.stop()
+        _running.release()
+
+    growth = sum(stat.size_diff for stat in stats)
+    lines = [
+        f"Memory over {duration:.0f}s: {growth / 1024:+,.1f} KiB traced "
+        f"(now {current / 1024 ** 2:,.1f} MiB, peak {peak / 1024 ** 2:,.1f} MiB)"
+        + (" - tracing started for this profile, so only new allocations are seen" if started else ""),
+        "",
+        f"{'change':>12} {'blocks':>8}  location",
+    ]
+    for stat in stats[:count]:
+        frame = stat.traceback[0]
+        lines.append(f"{stat.size_diff / 1024:>+10.1f} K {stat.count_diff:>+8}  {frame.filename}:{frame.lineno}")
+    return "\n".join(lines) + "\n"
+
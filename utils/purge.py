@@ -0,0 +1,141 @@
+import asyncio
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Optional, Union
+
+import discord
+
+# Discord refuses to bulk delete messages older than 14 days; stay a little inside
+BULK_DELETE_MAX_AGE = timedelta(days=14) - timedelta(minutes=5)
+
+
+def build_message_check(user: Optional[discord.abc.User] = None,
+                        contains: Optional[str] = None,
+                        pattern: Optional[str] = None) -> Callable[[discord.Message], bool]:
+    """Combine the purge filters into one predicate.
+
+    Raises re.error if ``pattern`` is not a valid regex.
+    """
+    user_id = user.id if user else None
+    needle = contains.lower() if contains else None
+    compiled = re.compile(pattern, re.IGNORECASE) if pattern else None
+
+    def check(message: discord.Message) -> bool:
+        if user_id is not None and message.author.id != user_id:
+            return False
+        if needle is not None and needle not in message.content.lower():
+            return False
+        if compiled is not None and not compiled.search(message.content):
+            return False
+        return True
+
+    return check
+
+
+class ChannelPurge:
+    """Streams one channel's history and deletes matching messages as it goes.
+
+    History is read lazily, newest first, so memory stays at one chunk no
+    matter how far back the purge reaches. Matches inside the bulk-delete
+    window go out in chunks of 100; older ones are deleted one at a time,
+    paced by ``single_delay``. ``cursor`` always holds the oldest message
+    scanned, so an interrupted purge can resume with ``before=cursor``.
+    """
+
+    def __init__(self,
+                 channel: discord.TextChannel,
+                 check: Callable[[discord.Message], bool],
+                 limit: int,
+                 before: Optional[Union[datetime, discord.abc.Snowflake]] = None,
+                 after: Optional[datetime] = None,
+                 single_delay: float = 1.0):
+        self.channel = channel
+        self.check = check
+        self.limit = limit
+        self.before = before
+        self.after = after
+        self.single_delay = single_delay
+
+        self.scanned = 0
+        self.deleted = 0
+        self.failed = 0
+        self.cursor: Optional[int] = None
+        self.done = False
+        self.error: Optional[str] = None
+
+    async def _bulk_delete(self, chunk: List[discord.Message]):
+        # A long run can age queued messages past the bulk-delete limit
+        cutoff = datetime.now(timezone.utc) - BULK_DELETE_MAX_AGE
+        fresh = [message for message in chunk if message.created_at > cutoff]
+        stale = [message for message in chunk if message.created_at <= cutoff]
+        chunk.clear()
+        if fresh:
+            try:
+                await self.channel.delete_messages(fresh, reason="Bulk purge")
+                self.deleted += len(fresh)
+            except discord.NotFound:
+                # Someone removed a message first; fall back for this chunk
+                await self._single_delete(fresh)
+            except discord.HTTPException as e:
+                if e.status != 400:
+                    raise
+                # Discord refused the chunk, e.g. a message crossed the age limit in flight
+                await self._single_delete(fresh)
+        if stale:
+            await self._single_delete(stale)
+
+    async def _single_delete(self, messages: List[discord.Message]):
+        for message in messages:
+            try:
+                await message.delete()
+                self.deleted += 1
+            except discord.NotFound:
+                pass  # Already gone
+            except discord.HTTPException:
+                self.failed += 1
+            await asyncio.sleep(self.single_delay)
+
+    async def run(self):
+        """Scan and delete until the limit, the time range or an error ends it."""
+        chunk: List[discord.Message] = []
+        cutoff = datetime.now(timezone.utc) - BULK_DELETE_MAX_AGE
+        try:
+            async for message in self.channel.history(
+                limit=self.limit,
+                before=self.before,
+                after=self.after,
+                oldest_first=False
+            ):
+                self.scanned += 1
+                self.cursor = message.id
+                if not self.check(message):
+                    continue
+                if message.created_at > cutoff:
+                    chunk.append(message)
+                    if len(chunk) == 100:
+                        await self._bulk_delete(chunk)
+                        # Deleting takes time; keep the age limit current
+                        cutoff = datetime.now(timezone.utc) - BULK_DELETE_MAX_AGE
+                else:
+                    # Everything from here on is too old for bulk delete
+                    if chunk:
+                        await self._bulk_delete(chunk)
+                    await self._single_delete([message])
+            if chunk:
+                await self._bulk_delete(chunk)
+        except discord.Forbidden:
+            self.error = "missing permissions"
+        except discord.HTTPException as e:
+            self.error = str(e)
+        finally:
+            self.done = True
+
+    def summary(self) -> str:
+        """One progress line for this channel."""
+        state = "✅" if self.done and not self.error else ("⚠️" if self.error else "⏳")
+        line = f"{state} {self.channel.mention}: scanned {self.scanned}, deleted {self.deleted}"
+        if self.failed:
+            line += f", failed {self.failed}"
+        if self.error:
+            line += f" ({self.error}; resume with before_message={self.cursor})"
+        return line
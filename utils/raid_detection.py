@@ -0,0 +1,162 @@
+import re
+import time
+from array import array
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, NamedTuple, Optional, Tuple
+
+# Everything but letters and digits is dropped before fingerprinting, so
+# "JOIN  my server!!" and "join my server" count as the same content
+_NOISE_PATTERN = re.compile(r'[\W_]+')
+
+_MASK64 = (1 << 64) - 1
+
+
+class RaidHit(NamedTuple):
+    """Result of a message that belongs to a flagged raid.
+
+    ``messages`` holds (channel_id, message_id, author_id) tuples to clean up.
+    ``new`` is True for the message that pushed the content over the threshold;
+    it then carries every tracked earlier copy as well.
+    """
+    fingerprint: int
+    messages: List[Tuple[int, int, int]]
+    new: bool
+
+
+class RaidDetector:
+    """Guild-wide detector for the same content posted by many accounts.
+
+    Content is normalized and hashed into a fingerprint. Detection has two
+    stages. Each time bucket has a Bloom filter of the fingerprints seen in
+    it, so checking the buckets of the window tells in constant time whether
+    content is new. Only content seen before is tracked exactly: a bounded LRU
+    of its recent copies, whose distinct authors decide whether it is a raid.
+
+    Every message costs a fixed number of bit probes and the filters never
+    grow, whatever the traffic. A Bloom false positive only puts unique
+    content into the LRU, where it never reaches the author threshold.
+    """
+
+    def __init__(self,
+                 threshold: int = 5,
+                 window: float = 30.0,
+                 buckets: int = 6,
+                 bloom_bits: int = 20,
+                 min_length: int = 8,
+                 max_tracked: int = 4096):
+        self.threshold = threshold
+        self.window = window
+        self.min_length = min_length
+        self.bucket_seconds = window / buckets
+        self.buckets = buckets
+        self.max_tracked = max_tracked
+
+        self._bloom_bits = bloom_bits
+        self._bloom_mask = (1 << bloom_bits) - 1
+        self._bloom_bytes = 1 << (bloom_bits - 3)
+        self._blooms = [bytearray(self._bloom_bytes) for _ in range(buckets)]
+        self._slot_ids = [-1] * buckets
+
+        # Direct-mapped slots holding the latest first copy of new content, so
+        # the message that started a raid can still be cleaned up later.
+        # Parallel typed arrays keep them at 40 bytes per slot.
+        slots = 1 << 16
+        self._first_mask = slots - 1
+        self._first_fp = array('Q', bytes(8 * slots))
+        self._first_ids = array('Q', bytes(24 * slots))  # channel, message, author
+        self._first_time = array('d', bytes(8 * slots))
+        # fingerprint -> recent (channel_id, message_id, author_id, time) copies
+        self._tracked: 'OrderedDict[int, Deque[Tuple[int, int, int, float]]]' = OrderedDict()
+        # fingerprint -> monotonic time until which it is treated as a raid
+        self._active: Dict[int, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._tracked)
+
+    def fingerprint(self, guild_id: int, content: str) -> Optional[int]:
+        """Hash normalized content, or None if it is too short to judge."""
+        normalized = _NOISE_PATTERN.sub('', content.lower())
+        if len(normalized) < self.min_length:
+            return None
+        return hash((guild_id, normalized)) & _MASK64
+
+    def _rotate(self, bucket_id: int) -> int:
+        """Return the slot for ``bucket_id``, clearing it if it held an old bucket."""
+        slot = bucket_id % self.buckets
+        if self._slot_ids[slot] != bucket_id:
+            self._blooms[slot][:] = bytes(self._bloom_bytes)
+            self._slot_ids[slot] = bucket_id
+        return slot
+
+    def observe(self,
+                guild_id: int,
+                channel_id: int,
+                message_id: int,
+                author_id: int,
+                content: str,
+                now: Optional[float] = None) -> Optional[RaidHit]:
+        """Record a message and return a RaidHit if its content is a raid."""
+        fp = self.fingerprint(guild_id, content)
+        if fp is None:
+            return None
+        if now is None:
+            now = time.monotonic()
+
+        # Content already flagged: every further copy is part of the raid
+        until = self._active.get(fp)
+        if until is not None:
+            if now < until:
+                return RaidHit(fp, [(channel_id, message_id, author_id)], False)
+            del self._active[fp]
+
+        bucket_id = int(now // self.bucket_seconds)
+        slot = self._rotate(bucket_id)
+        oldest = bucket_id - self.buckets + 1
+        mask, bits = self._bloom_mask, self._bloom_bits
+        p1, p2, p3 = fp & mask, (fp >> bits) & mask, (fp >> (2 * bits)) & mask
+
+        seen = False
+        for s in range(self.buckets):
+            if self._slot_ids[s] >= oldest:
+                bloom = self._blooms[s]
+                if (bloom[p1 >> 3] >> (p1 & 7)) & (bloom[p2 >> 3] >> (p2 & 7)) & (bloom[p3 >> 3] >> (p3 & 7)) & 1:
+                    seen = True
+                    break
+        bloom = self._blooms[slot]
+        bloom[p1 >> 3] |= 1 << (p1 & 7)
+        bloom[p2 >> 3] |= 1 << (p2 & 7)
+        bloom[p3 >> 3] |= 1 << (p3 & 7)
+
+        entry = (channel_id, message_id, author_id, now)
+        if not seen:
+            k = fp & self._first_mask
+            self._first_fp[k] = fp
+            self._first_ids[3 * k:3 * k + 3] = array('Q', entry[:3])
+            self._first_time[k] = now
+            return None
+
+        # Duplicated content: keep its copies so a raid can be cleaned up
+        copies = self._tracked.get(fp)
+        if copies is None:
+            copies = self._tracked[fp] = deque(maxlen=self.threshold * 20)
+            k = fp & self._first_mask
+            if self._first_fp[k] == fp:
+                copies.append((*self._first_ids[3 * k:3 * k + 3], self._first_time[k]))
+            if len(self._tracked) > self.max_tracked:
+                self._tracked.popitem(last=False)
+        else:
+            self._tracked.move_to_end(fp)
+        copies.append(entry)
+        while copies[0][3] < now - self.window:
+            copies.popleft()
+
+        if len(copies) < self.threshold:
+            return None
+        if len({author for _, _, author, _ in copies}) < self.threshold:
+            return None
+
+        self._active[fp] = now + self.window
+        if len(self._active) > self.max_tracked:
+            self._active = {k: v for k, v in self._active.items() if v > now}
+        del self._tracked[fp]
+        return RaidHit(fp, [copy[:3] for copy in copies], True)
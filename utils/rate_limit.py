@@ -0,0 +1,129 @@
+import json
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Hashable, Optional, Tuple
+
+
+class _Ring:
+    """Fixed-size ring of the most recent message timestamps for one key."""
+
+    __slots__ = ('stamps', 'pos', 'last_seen')
+
+    def __init__(self, size: int):
+        self.stamps = [float('-inf')] * size
+        self.pos = 0
+        self.last_seen = float('-inf')
+
+
+class SlidingWindowLimiter:
+    """Sliding-window rate limiter with per-guild thresholds.
+
+    Every key keeps a ring holding the timestamps of its last ``threshold``
+    messages. A key is over the limit when the oldest of those timestamps is
+    still inside the interval, so each hit is O(1) and a burst can no longer
+    slip through by straddling a periodic counter wipe.
+
+    Rings are kept in least-recently-seen order, so idle keys are always at
+    the front: sweeping stops at the first active key, and once ``max_keys``
+    is reached the oldest key makes room for a new one.
+    """
+
+    def __init__(self, threshold: int = 5, interval: float = 5.0, max_keys: int = 100_000):
+        self.default_limits = (threshold, interval)
+        self.guild_limits: Dict[int, Tuple[int, float]] = {}
+        self.max_keys = max_keys
+        self._rings: 'OrderedDict[Hashable, _Ring]' = OrderedDict()
+        # Longest interval of any guild; a key idle this long is safe to drop
+        self._longest = interval
+
+    def __len__(self) -> int:
+        return len(self._rings)
+
+    def get_limits(self, guild_id: Optional[int]) -> Tuple[int, float]:
+        """Return the (threshold, interval) pair used for a guild."""
+        return self.guild_limits.get(guild_id, self.default_limits)
+
+    def set_limits(self, guild_id: int, threshold: int, interval: float):
+        """Override the threshold and interval for a single guild."""
+        self.guild_limits[guild_id] = (threshold, interval)
+        self._longest = max(
+            [self.default_limits[1]] + [interval for _, interval in self.guild_limits.values()]
+        )
+        # Rings sized for the old threshold are rebuilt lazily on the next hit
+
+    def load_limits(self, path: Path):
+        """Restore per-guild limits saved by ``save_limits``; a missing file is not an error."""
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        for guild_id, (threshold, interval) in data.items():
+            self.set_limits(int(guild_id), int(threshold), float(interval))
+
+    def save_limits(self, path: Path):
+        """Write the per-guild limits to ``path``, replacing it atomically."""
+        # Copied in one step; /antispam may change the limits while this runs on a thread
+        limits = dict(self.guild_limits)
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({str(guild_id): list(value) for guild_id, value in limits.items()}, f)
+        tmp.replace(path)
+
+    def hit(self, guild_id: Optional[int], key: Hashable, now: Optional[float] = None) -> bool:
+        """Record a message for ``key`` and return True if it crossed the limit."""
+        if now is None:
+            now = time.monotonic()
+        threshold, interval = self.guild_limits.get(guild_id, self.default_limits)
+
+        rings = self._rings
+        ring = rings.get(key)
+        if ring is None:
+            if len(rings) >= self.max_keys:
+                # Drop what is idle, then the least recently seen keys if still full
+                self.evict_idle(now)
+                while len(rings) >= self.max_keys:
+                    rings.popitem(last=False)
+            ring = rings[key] = _Ring(threshold)
+        else:
+            rings.move_to_end(key)
+            if len(ring.stamps) != threshold:
+                ring = rings[key] = _Ring(threshold)
+
+        stamps = ring.stamps
+        pos = ring.pos
+        stamps[pos] = now
+        pos += 1
+        if pos == threshold:
+            pos = 0
+        ring.pos = pos
+        ring.last_seen = now
+
+        # stamps[pos] is now the oldest of the last `threshold` messages
+        return now - stamps[pos] < interval
+
+    def reset(self, key: Hashable):
+        """Forget the history for a key (e.g. after it was punished)."""
+        self._rings.pop(key, None)
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """Drop keys with no activity inside the longest guild interval.
+
+        Only the idle prefix of the ring order is visited, so the cost is
+        proportional to the number of keys dropped.
+        """
+        if now is None:
+            now = time.monotonic()
+        cutoff = now - self._longest
+        rings = self._rings
+        evicted = 0
+        while rings:
+            key, ring = next(iter(rings.items()))
+            if ring.last_seen > cutoff:
+                break
+            del rings[key]
+            evicted += 1
+        return evicted
@@ -0,0 +1,353 @@
+import asyncio
+import heapq
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import discord
+
+from utils.logger import bot_logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    guild_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    -- 0 for jobs that are not about a role
+    role_id INTEGER NOT NULL DEFAULT 0,
+    due_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    reason TEXT,
+    UNIQUE (kind, guild_id, user_id, role_id)
+);
+CREATE INDEX IF NOT EXISTS jobs_due ON jobs (due_at, id);
+"""
+
+COLUMNS = "id, kind, guild_id, user_id, role_id, due_at, attempts, reason"
+
+
+class Job:
+    """Something to do to a member at ``due_at``, e.g. lift a temporary ban."""
+
+    __slots__ = ('id', 'kind', 'guild_id', 'user_id', 'role_id', 'due_at', 'attempts', 'reason')
+
+    def __init__(self, id: int, kind: str, guild_id: int, user_id: int, role_id: int,
+                 due_at: float, attempts: int, reason: Optional[str]):
+        self.id = id
+        self.kind = kind
+        self.guild_id = guild_id
+        self.user_id = user_id
+        self.role_id = role_id
+        self.due_at = due_at
+        self.attempts = attempts
+        self.reason = reason
+
+
+Handler = Callable[[Job], Awaitable[object]]
+
+
+class JobScheduler:
+    """Runs jobs at their due time, across restarts.
+
+    Jobs are stored in SQLite and indexed by due time. Only the next
+    ``window`` of them is held in a min-heap, and a single task sleeps until
+    the head is due, so 100k pending jobs cost nothing while idle and one
+    index seek at startup. Jobs that fell due during downtime run ``batch``
+    at a time. A job is deleted only after its handler returned (or raised
+    NotFound: nothing left to undo), so a crash mid-run repeats it rather
+    than losing it; handlers must therefore be idempotent. Other failures
+    are retried with exponential backoff, up to ``max_attempts``. A job whose
+    kind has no handler (e.g. its cog failed to load) is left in the
+    database untouched and runs once a handler is registered.
+    """
+
+    def __init__(self,
+                 path: str = "data/jobs.db",
+                 window: int = 1000,
+                 batch: int = 25,
+                 retry_delay: float = 60.0,
+                 max_attempts: int = 5):
+        self.path = Path(path)
+        self.window = window
+        self.batch = batch
+        self.retry_delay = retry_delay
+        self.max_attempts = max_attempts
+        # kind -> coroutine function that carries the job out
+        self.handlers: Dict[str, Handler] = {}
+        # kind -> (due_at, id) of due jobs waiting for a handler to be registered
+        self._parked: Dict[str, Set[Tuple[float, int]]] = {}
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="jobs-db")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._heap: List[Tuple[float, int]] = []
+        # Key of the last job read from the index; None before the first read
+        self._loaded_until: Optional[Tuple[float, int]] = None
+        # The index had nothing past the loaded window, so every new job goes on the heap
+        self._exhausted = False
+        # A refill is reading the index and may miss jobs added since it began
+        self._refilling = False
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.completed = 0
+        self.retried = 0
+        self.abandoned = 0
+
+    def register(self, kind: str, handler: Handler):
+        self.handlers[kind] = handler
+        # Due jobs that were waiting for this handler run now
+        for due_at, job_id in sorted(self._parked.pop(kind, ())):
+            self._track(due_at, job_id)
+
+    async def _run_in_db(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    async def open(self):
+        """Open (and if needed create) the job database."""
+        await self._run_in_db(self._open)
+
+    def _open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        self._conn = conn
+
+    def start(self):
+        """Start running jobs; call once the guild cache is ready."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._conn is not None:
+            await self._run_in_db(self._conn.close)
+            self._conn = None
+        self._executor.shutdown(wait=False)
+
+    async def schedule(self,
+                       kind: str,
+                       guild_id: int,
+                       user_id: int,
+                       due_at: float,
+                       role_id: int = 0,
+                       reason: Optional[str] = None) -> int:
+        """Store a job, replacing the same kind of job for the same member (and role).
+
+        Returns the job's id once it is on disk.
+        """
+        job_id = await self._run_in_db(self._schedule, kind, guild_id, user_id, role_id, due_at, reason)
+        self._track(due_at, job_id)
+        return job_id
+
+    def _schedule(self, kind, guild_id, user_id, role_id, due_at, reason) -> int:
+        with self._conn:
+            existing = self._conn.execute(
+                "SELECT id FROM jobs WHERE kind = ? AND guild_id = ? AND user_id = ? AND role_id = ?",
+                (kind, guild_id, user_id, role_id)
+            ).fetchone()
+            if existing:
+                # The heap entry for the old time goes stale; _due skips it
+                self._conn.execute(
+                    "UPDATE jobs SET due_at = ?, attempts = 0, reason = ? WHERE id = ?",
+                    (due_at, reason, existing[0])
+                )
+                return existing[0]
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (kind, guild_id, user_id, role_id, due_at, reason) VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, guild_id, user_id, role_id, due_at, reason)
+            )
+            return cursor.lastrowid
+
+    async def cancel(self, kind: str, guild_id: int, user_id: int, role_id: int = 0) -> bool:
+        """Drop a pending job; False if there was none."""
+        return bool(await self._run_in_db(self._cancel, kind, guild_id, user_id, role_id))
+
+    def _cancel(self, kind, guild_id, user_id, role_id) -> int:
+        with self._conn:
+            return self._conn.execute(
+                "DELETE FROM jobs WHERE kind = ? AND guild_id = ? AND user_id = ? AND role_id = ?",
+                (kind, guild_id, user_id, role_id)
+            ).rowcount
+
+    async def cancel_many(self, kind: str, guild_id: int, user_ids: List[int]) -> int:
+        """Drop the pending ``kind`` jobs of many members in one write; returns how many there were."""
+        return await self._run_in_db(self._cancel_many, kind, guild_id, user_ids)
+
+    def _cancel_many(self, kind, guild_id, user_ids) -> int:
+        with self._conn:
+            return self._conn.executemany(
+                "DELETE FROM jobs WHERE kind = ? AND guild_id = ? AND user_id = ?",
+                [(kind, guild_id, user_id) for user_id in user_ids]
+            ).rowcount
+
+    async def count(self) -> int:
+        """Jobs still pending; reads the whole index, so keep it off hot paths."""
+        return await self._run_in_db(lambda: self._conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0])
+
+    def _track(self, due_at: float, job_id: int):
+        """Put a job on the heap if it falls inside the loaded window."""
+        if not self._refilling and not self._exhausted and (
+                self._loaded_until is None or (due_at, job_id) > self._loaded_until):
+            return  # Read from the index when the window gets there
+        heapq.heappush(self._heap, (due_at, job_id))
+        if self._exhausted and len(self._heap) > 2 * self.window:
+            # Keep the soonest window in memory and leave the rest to the index
+            self._heap = heapq.nsmallest(self.window, self._heap)
+            self._loaded_until = self._heap[-1]
+            self._exhausted = False
+        if self._heap[0][1] == job_id:
+            self._wakeup.set()  # It is due before whatever the sleeper waits for
+
+    async def _refill(self):
+        self._refilling = True
+        try:
+            rows = await self._run_in_db(self._upcoming, self._loaded_until, self.window)
+        finally:
+            self._refilling = False
+        for row in rows:
+            heapq.heappush(self._heap, tuple(row))
+        if rows:
+            self._loaded_until = tuple(rows[-1])
+        self._exhausted = len(rows) < self.window
+
+    def _upcoming(self, after: Optional[Tuple[float, int]], limit: int):
+        if after is None:
+            after = (float('-inf'), 0)
+        return self._conn.execute(
+            "SELECT due_at, id FROM jobs WHERE (due_at, id) > (?, ?) ORDER BY due_at, id LIMIT ?",
+            (*after, limit)
+        ).fetchall()
+
+    def _due(self, job_ids: List[int], now: float) -> List[Job]:
+        # Jobs that were cancelled or moved later since they were loaded drop out here
+        marks = ",".join("?" * len(job_ids))
+        rows = self._conn.execute(
+            f"SELECT {COLUMNS} FROM jobs WHERE id IN ({marks}) AND due_at <= ?",
+            (*job_ids, now)
+        ).fetchall()
+        return [Job(*row) for row in rows]
+
+    def _settle(self, finished: List[Job], retries: List[Tuple[Job, float]]):
+        with self._conn:
+            # Matching due_at too keeps a job that was rescheduled while it ran
+            self._conn.executemany(
+                "DELETE FROM jobs WHERE id = ? AND due_at = ?",
+                [(job.id, job.due_at) for job in finished]
+            )
+            self._conn.executemany(
+                "UPDATE jobs SET due_at = ?, attempts = attempts + 1 WHERE id = ? AND due_at = ?",
+                [(due_at, job.id, job.due_at) for job, due_at in retries]
+            )
+
+    async def _execute(self, job: Job) -> bool:
+        """Run one job; True if it is finished, False if it should be retried."""
+        try:
+            await self.handlers[job.kind](job)
+        except discord.NotFound:
+            pass  # The ban, member or role is already gone
+        except Exception as e:
+            bot_logger.system(
+                f"Job {job.id} ({job.kind}) failed, attempt {job.attempts + 1}",
+                operation="scheduler",
+                error=e
+            )
+            return False
+        return True
+
+    async def _run_due(self, job_ids: List[int]):
+        jobs = []
+        for job in await self._run_in_db(self._due, job_ids, time.time()):
+            if job.kind in self.handlers:
+                jobs.append(job)
+                continue
+            # Not an attempt: the job stays as it is until register() is called for its kind
+            parked = self._parked.setdefault(job.kind, set())
+            if not parked:
+                bot_logger.system(f"No handler for job kind {job.kind}; holding its jobs", operation="scheduler")
+            parked.add((job.due_at, job.id))
+        results = await asyncio.gather(*(self._execute(job) for job in jobs))
+
+        finished, retries = [], []
+        now = time.time()
+        for job, ok in zip(jobs, results):
+            if ok:
+                finished.append(job)
+                self.completed += 1
+            elif job.attempts + 1 >= self.max_attempts:
+                finished.append(job)
+                self.abandoned += 1
+                bot_logger.system(
+                    f"Gave up on job {job.id} ({job.kind}) for user {job.user_id} in guild {job.guild_id}",
+                    operation="scheduler"
+                )
+            else:
+                retries.append((job, now + self.retry_delay * 2 ** job.attempts))
+                self.retried += 1
+        await self._run_in_db(self._settle, finished, retries)
+        for job, due_at in retries:
+            self._track(due_at, job.id)
+
+    async def _sleep(self, delay: Optional[float]):
+        if delay is None:
+            await self._wakeup.wait()
+            return
+        # A timer rather than wait_for, which can swallow cancellation
+        timer = asyncio.get_running_loop().call_later(delay, self._wakeup.set)
+        try:
+            await self._wakeup.wait()
+        finally:
+            timer.cancel()
+
+    async def _run(self):
+        while True:
+            # Cleared before looking at the heap, so a wakeup during a refill is kept
+            self._wakeup.clear()
+            try:
+                if not self._heap and not self._exhausted:
+                    await self._refill()
+                if not self._heap:
+                    await self._sleep(None)
+                    continue
+                delay = self._heap[0][0] - time.time()
+                if delay > 0:
+                    await self._sleep(delay)
+                    continue
+
+                # After downtime many jobs are overdue; run them a batch at a time
+                now = time.time()
+                due = set()
+                while self._heap and self._heap[0][0] <= now and len(due) < self.batch:
+                    due.add(heapq.heappop(self._heap)[1])
+                await self._run_due(sorted(due))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                bot_logger.system("Failed to run scheduled jobs", operation="scheduler", error=e)
+                # Jobs taken off the heap may not have been settled; read them again
+                self._heap.clear()
+                self._loaded_until = None
+                self._exhausted = False
+                await asyncio.sleep(30)
+
+    def stats(self) -> Dict[str, float]:
+        """Return job outcomes and the state of the in-memory window."""
+        return {
+            'loaded': len(self._heap),
+            'next_due': self._heap[0][0] if self._heap else None,
+            'completed': self.completed,
+            'retried': self.retried,
+            'abandoned': self.abandoned,
+            'waiting_for_handler': sum(len(parked) for parked in self._parked.values()),
+        }
@@ -0,0 +1,138 @@
+import asyncio
+import heapq
+import time
+from typing import List, Optional, Tuple
+
+from utils.logger import bot_logger
+from utils.warnings_store import WarningsStore
+
+Entry = Tuple[float, int, int, int]
+
+
+class ExpiryScheduler:
+    """Expires warnings when they fall due, waking only for the next one.
+
+    The store's expiry index is the durable queue. A min-heap holds only the
+    next ``window`` entries read from it, so memory stays bounded with
+    millions of stored warnings, and a restart costs one index seek rather
+    than a table scan. New warnings are pushed onto the heap when they fall
+    inside the loaded window; later ones are picked up from the index when
+    the window is refilled. Warnings due within ``slack`` seconds of each
+    other are expired in one write.
+    """
+
+    def __init__(self, store: WarningsStore, window: int = 5000, slack: float = 1.0):
+        self.store = store
+        self.window = window
+        self.slack = slack
+        self._heap: List[Entry] = []
+        # Key of the last entry read from the index; None before the first read
+        self._loaded_until: Optional[Tuple[float, int]] = None
+        # The index had nothing past the loaded window, so every new entry goes on the heap
+        self._exhausted = False
+        # A refill is reading the index and may have missed warnings added since it began
+        self._refilling = False
+        # Bumped by reset(), so a refill that was in flight is thrown away
+        self._generation = 0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.expired = 0
+        self.wakeups = 0
+
+    def start(self):
+        self.store.on_expiring = self.schedule
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self.store.on_expiring = None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def schedule(self, expires_at: float, warning_id: int, guild_id: int, user_id: int):
+        """Track a new warning if it falls inside the loaded window."""
+        if not self._refilling and not self._exhausted and (
+                self._loaded_until is None or (expires_at, warning_id) > self._loaded_until):
+            return  # Read from the index when the window gets there
+        heapq.heappush(self._heap, (expires_at, warning_id, guild_id, user_id))
+        if self._exhausted and len(self._heap) > 2 * self.window:
+            # Keep the soonest window in memory and leave the rest to the index
+            self._heap = heapq.nsmallest(self.window, self._heap)
+            self._loaded_until = self._heap[-1][:2]
+            self._exhausted = False
+        if self._heap[0][1] == warning_id:
+            self._wakeup.set()  # It is due before whatever the sleeper waits for
+
+    def reset(self):
+        """Forget the loaded window, e.g. after a guild's expiry policy changed."""
+        self._heap.clear()
+        self._loaded_until = None
+        self._exhausted = False
+        self._generation += 1
+        self._wakeup.set()
+
+    async def _refill(self):
+        generation = self._generation
+        self._refilling = True
+        try:
+            rows = await self.store.expiring(self._loaded_until, self.window)
+        finally:
+            self._refilling = False
+        if generation != self._generation:
+            return
+        for row in rows:
+            heapq.heappush(self._heap, tuple(row))
+        if rows:
+            self._loaded_until = tuple(rows[-1][:2])
+        self._exhausted = len(rows) < self.window
+
+    async def _sleep(self, delay: Optional[float]):
+        if delay is None:
+            await self._wakeup.wait()
+            return
+        # A timer rather than wait_for, which can swallow cancellation
+        timer = asyncio.get_running_loop().call_later(delay, self._wakeup.set)
+        try:
+            await self._wakeup.wait()
+        finally:
+            timer.cancel()
+
+    async def _run(self):
+        while True:
+            # Cleared before looking at the heap, so a wakeup during a refill is kept
+            self._wakeup.clear()
+            try:
+                if not self._heap and not self._exhausted:
+                    await self._refill()
+                if not self._heap:
+                    await self._sleep(None)
+                    continue
+                delay = self._heap[0][0] - time.time()
+                if delay > 0:
+                    await self._sleep(delay)
+                    continue
+
+                self.wakeups += 1
+                due = set()
+                last = 0.0
+                limit = time.time() + self.slack
+                while self._heap and self._heap[0][0] <= limit:
+                    expires_at, warning_id, _, _ = heapq.heappop(self._heap)
+                    # An entry can be on the heap twice if it was added during a refill
+                    due.add(warning_id)
+                    last = expires_at
+                # The store skips warnings that are not due yet, so wait for the last one
+                await asyncio.sleep(max(last - time.time(), 0))
+                self.expired += await self.store.expire(sorted(due))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                bot_logger.system("Failed to expire warnings", operation="warning_expiry", error=e)
+                await asyncio.sleep(30)
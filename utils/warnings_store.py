@@ -0,0 +1,512 @@
+import asyncio
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from utils.escalation import EscalationRule, order
+from utils.logger import bot_logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS warnings (
+    id INTEGER PRIMARY KEY,
+    guild_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    moderator_id INTEGER NOT NULL,
+    reason TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+# Applied in order on open; PRAGMA user_version records how many have run
+MIGRATIONS = [
+    # Per-member counts kept by triggers, and a (guild, user, time) index for paging
+    """
+    CREATE TABLE warning_counts (
+        guild_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (guild_id, user_id)
+    ) WITHOUT ROWID;
+    INSERT INTO warning_counts
+        SELECT guild_id, user_id, COUNT(*) FROM warnings GROUP BY guild_id, user_id;
+    CREATE TRIGGER warnings_count_insert AFTER INSERT ON warnings BEGIN
+        INSERT INTO warning_counts VALUES (NEW.guild_id, NEW.user_id, 1)
+            ON CONFLICT (guild_id, user_id) DO UPDATE SET count = count + 1;
+    END;
+    CREATE TRIGGER warnings_count_delete AFTER DELETE ON warnings BEGIN
+        UPDATE warning_counts SET count = count - 1
+            WHERE guild_id = OLD.guild_id AND user_id = OLD.user_id;
+        DELETE FROM warning_counts
+            WHERE guild_id = OLD.guild_id AND user_id = OLD.user_id AND count <= 0;
+    END;
+    DROP INDEX IF EXISTS warnings_member;
+    CREATE INDEX warnings_member_time ON warnings (guild_id, user_id, created_at, id);
+    """,
+    # Expiry: a per-guild policy, an expiry time per warning and counts of active warnings.
+    # The partial index is the durable queue of pending expiries.
+    """
+    CREATE TABLE warning_policies (
+        guild_id INTEGER PRIMARY KEY,
+        expire_after REAL
+    );
+    ALTER TABLE warnings ADD COLUMN expires_at REAL;
+    ALTER TABLE warnings ADD COLUMN active INTEGER NOT NULL DEFAULT 1;
+    ALTER TABLE warning_counts ADD COLUMN active INTEGER NOT NULL DEFAULT 0;
+    UPDATE warning_counts SET active = count;
+    DROP TRIGGER warnings_count_insert;
+    CREATE TRIGGER warnings_count_insert AFTER INSERT ON warnings BEGIN
+        INSERT INTO warning_counts VALUES (NEW.guild_id, NEW.user_id, 1, NEW.active)
+            ON CONFLICT (guild_id, user_id) DO UPDATE SET count = count + 1, active = active + NEW.active;
+    END;
+    DROP TRIGGER warnings_count_delete;
+    CREATE TRIGGER warnings_count_delete AFTER DELETE ON warnings BEGIN
+        UPDATE warning_counts SET count = count - 1, active = active - OLD.active
+            WHERE guild_id = OLD.guild_id AND user_id = OLD.user_id;
+        DELETE FROM warning_counts
+            WHERE guild_id = OLD.guild_id AND user_id = OLD.user_id AND count <= 0;
+    END;
+    CREATE TRIGGER warnings_count_expire AFTER UPDATE OF active ON warnings
+        WHEN OLD.active != NEW.active BEGIN
+        UPDATE warning_counts SET active = active + NEW.active - OLD.active
+            WHERE guild_id = OLD.guild_id AND user_id = OLD.user_id;
+    END;
+    CREATE INDEX warnings_expiry ON warnings (expires_at, id)
+        WHERE active = 1 AND expires_at IS NOT NULL;
+    """,
+    # Escalation rules: enough warnings inside a window triggers a moderation action
+    """
+    CREATE TABLE escalation_rules (
+        guild_id INTEGER NOT NULL,
+        threshold INTEGER NOT NULL,
+        window REAL NOT NULL,
+        action TEXT NOT NULL,
+        duration INTEGER,
+        PRIMARY KEY (guild_id, threshold)
+    ) WITHOUT ROWID;
+    """,
+]
+
+# Warnings per page, and the largest escalation threshold
+RECENT_SIZE = 10
+# Newest warnings kept in memory per cached member; the first page is served from them.
+# One more than a page, so escalation can tell whether the newest warning crossed a threshold.
+CACHED_RECENT = RECENT_SIZE + 1
+
+Key = Tuple[int, int]
+
+
+COLUMNS = "id, moderator_id, reason, created_at, expires_at, active"
+
+
+def _warning(row: Tuple) -> Dict[str, Any]:
+    warning_id, moderator_id, reason, created_at, expires_at, active = row
+    return {
+        'id': warning_id,
+        'moderator_id': moderator_id,
+        'reason': reason,
+        'created_at': created_at,
+        'timestamp': datetime.fromtimestamp(created_at, timezone.utc),
+        # None if the guild's warnings do not expire
+        'expires_at': expires_at,
+        'active': bool(active),
+    }
+
+
+def cursor(warning: Dict[str, Any]) -> Tuple[float, int]:
+    """Position of a warning in its member's history, for ``page(before=...)``."""
+    return warning['created_at'], warning['id']
+
+
+class _Member:
+    """What the cache holds for one member: the counts and the newest warnings."""
+
+    __slots__ = ('count', 'active', 'recent')
+
+    def __init__(self, count: int, active: int, recent: List[Dict[str, Any]]):
+        self.count = count
+        # Warnings that have not expired; these are the ones that count
+        self.active = active
+        # Newest first, at most CACHED_RECENT
+        self.recent = recent
+
+
+class WarningsStore:
+    """Warnings kept in SQLite, keyed by (guild, user).
+
+    The connection lives on a single worker thread, so no disk I/O happens
+    on the event loop. Reads are served from an LRU cache of the last
+    ``cache_size`` members looked up, and a miss loads that member's
+    warnings on the worker. Writes update the cache at once and are queued;
+    a background task writes the queue in one transaction every
+    ``flush_interval`` seconds (or as soon as ``max_batch`` writes are
+    waiting). Members with queued writes are never evicted from the cache,
+    so a reload can never miss a write that has not reached disk yet.
+    """
+
+    def __init__(self,
+                 path: str = "data/warnings.db",
+                 cache_size: int = 2000,
+                 flush_interval: float = 0.5,
+                 max_batch: int = 500):
+        self.path = Path(path)
+        self.cache_size = cache_size
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="warnings-db")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._cache: "OrderedDict[Key, _Member]" = OrderedDict()
+        # Writes not yet on disk, in order, and the members they touch
+        self._pending: List[Tuple] = []
+        self._dirty: Set[Key] = set()
+        self._next_id = 1
+        # guild id -> seconds until its warnings expire
+        self.policies: Dict[int, float] = {}
+        # guild id -> escalation rules, strongest action first
+        self.escalations: Dict[int, List[EscalationRule]] = {}
+        # Called with (expires_at, id, guild id, user id) for each new expiring warning
+        self.on_expiring = None
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.flushes = 0
+        self.written = 0
+        self.last_flush_latency = 0.0
+
+    async def _run_in_db(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    async def open(self):
+        """Open (and if needed create) the database and start the writer."""
+        await self._run_in_db(self._open)
+        self._task = asyncio.create_task(self._run())
+
+    def _open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # WAL with synchronous=NORMAL only risks the last commits on power loss
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for number, migration in enumerate(MIGRATIONS[version:], version + 1):
+            conn.executescript(f"BEGIN; {migration}; PRAGMA user_version = {number}; COMMIT;")
+        self._next_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM warnings").fetchone()[0]
+        self.policies = dict(conn.execute(
+            "SELECT guild_id, expire_after FROM warning_policies WHERE expire_after IS NOT NULL"
+        ))
+        rules: Dict[int, List[EscalationRule]] = {}
+        for guild_id, *rule in conn.execute(
+                "SELECT guild_id, threshold, window, action, duration FROM escalation_rules"):
+            rules.setdefault(guild_id, []).append(EscalationRule(*rule))
+        self.escalations = {guild_id: order(guild_rules) for guild_id, guild_rules in rules.items()}
+        self._conn = conn
+
+    async def close(self):
+        """Write out queued warnings and close the database."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        if self._conn is not None:
+            await self._run_in_db(self._conn.close)
+            self._conn = None
+        self._executor.shutdown(wait=False)
+
+    def _load(self, key: Key) -> _Member:
+        row = self._conn.execute(
+            "SELECT count, active FROM warning_counts WHERE guild_id = ? AND user_id = ?", key
+        ).fetchone()
+        count, active = row or (0, 0)
+        return _Member(count, active, self._page(key, None, CACHED_RECENT))
+
+    def _page(self, key: Key, before: Optional[Tuple[float, int]], limit: int) -> List[Dict[str, Any]]:
+        if before is None:
+            rows = self._conn.execute(
+                f"SELECT {COLUMNS} FROM warnings "
+                "WHERE guild_id = ? AND user_id = ? "
+                "ORDER BY created_at DESC, id DESC LIMIT ?",
+                (*key, limit)
+            ).fetchall()
+        else:
+            # Seek in the index to the cursor instead of counting past an offset
+            rows = self._conn.execute(
+                f"SELECT {COLUMNS} FROM warnings "
+                "WHERE guild_id = ? AND user_id = ? AND (created_at, id) < (?, ?) "
+                "ORDER BY created_at DESC, id DESC LIMIT ?",
+                (*key, *before, limit)
+            ).fetchall()
+        return [_warning(row) for row in rows]
+
+    def _evict(self, room: int = 0):
+        while len(self._cache) + room > self.cache_size:
+            for key in self._cache:
+                if key not in self._dirty:
+                    break
+            else:
+                return  # Everything left has queued writes; the next flush frees them
+            del self._cache[key]
+
+    async def _member(self, key: Key) -> _Member:
+        member = self._cache.get(key)
+        if member is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return member
+
+        self.misses += 1
+        loaded = await self._run_in_db(self._load, key)
+        # Another call may have loaded (and changed) it while we waited
+        member = self._cache.get(key)
+        if member is None:
+            # Make room first, so the member being loaded is not the one evicted
+            self._evict(room=1)
+            member = self._cache[key] = loaded
+        return member
+
+    async def count(self, guild_id: int, user_id: int) -> int:
+        """All of a member's warnings, expired or not."""
+        return (await self._member((guild_id, user_id))).count
+
+    async def active_count(self, guild_id: int, user_id: int) -> int:
+        """A member's warnings that have not expired."""
+        return (await self._member((guild_id, user_id))).active
+
+    async def page(self,
+                   guild_id: int,
+                   user_id: int,
+                   before: Optional[Tuple[float, int]] = None,
+                   limit: int = RECENT_SIZE) -> List[Dict[str, Any]]:
+        """Up to ``limit`` warnings, newest first, older than the ``before`` cursor.
+
+        Treat the list as read-only.
+        """
+        key = (guild_id, user_id)
+        if before is None and limit <= CACHED_RECENT:
+            return (await self._member(key)).recent[:limit]
+        if key in self._dirty:
+            # The page has to include writes that are still queued
+            await self.flush()
+        return await self._run_in_db(self._page, key, before, limit)
+
+    async def add(self, guild_id: int, user_id: int, moderator_id: int, reason: str) -> Dict[str, Any]:
+        """Record a warning; it is on disk within ``flush_interval`` seconds."""
+        member = await self._member((guild_id, user_id))
+        created_at = time.time()
+        expire_after = self.policies.get(guild_id)
+        expires_at = created_at + expire_after if expire_after else None
+        warning_id = self._next_id
+        self._next_id += 1
+        self._queue(
+            (guild_id, user_id),
+            ('add', (warning_id, guild_id, user_id, moderator_id, reason, created_at, expires_at))
+        )
+        warning = _warning((warning_id, moderator_id, reason, created_at, expires_at, 1))
+        member.recent.insert(0, warning)
+        del member.recent[CACHED_RECENT:]
+        member.count += 1
+        member.active += 1
+        if expires_at is not None and self.on_expiring is not None:
+            self.on_expiring(expires_at, warning_id, guild_id, user_id)
+        return warning
+
+    async def clear(self, guild_id: int, user_id: int) -> int:
+        """Remove all of a member's warnings and return how many there were."""
+        member = await self._member((guild_id, user_id))
+        count = member.count
+        if count:
+            self._queue((guild_id, user_id), ('clear', (guild_id, user_id)))
+            member.count = 0
+            member.active = 0
+            member.recent.clear()
+        return count
+
+    def _queue(self, key: Key, operation: Tuple):
+        self._pending.append(operation)
+        self._dirty.add(key)
+        self._wakeup.set()
+
+    def _write(self, operations: List[Tuple]):
+        with self._conn:
+            for kind, params in operations:
+                if kind == 'add':
+                    self._conn.execute(
+                        "INSERT INTO warnings (id, guild_id, user_id, moderator_id, reason, created_at, expires_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        params
+                    )
+                else:
+                    self._conn.execute("DELETE FROM warnings WHERE guild_id = ? AND user_id = ?", params)
+
+    async def flush(self):
+        """Write every queued change in one transaction."""
+        if not self._pending or self._conn is None:
+            return
+        operations, self._pending = self._pending, []
+        dirty, self._dirty = self._dirty, set()
+        start = time.monotonic()
+        try:
+            await self._run_in_db(self._write, operations)
+        except Exception as e:
+            # Keep them, ahead of anything queued meanwhile, for the next attempt
+            self._pending[:0] = operations
+            self._dirty |= dirty
+            bot_logger.system("Failed to write warnings", operation="warnings_flush", error=e)
+            raise
+        self.flushes += 1
+        self.written += len(operations)
+        self.last_flush_latency = time.monotonic() - start
+        self._evict()
+
+    async def set_expiry(self, guild_id: int, expire_after: Optional[float]):
+        """Make a guild's warnings expire ``expire_after`` seconds after they were
+        given (None: never), including the ones it already has."""
+        if expire_after:
+            self.policies[guild_id] = expire_after
+        else:
+            self.policies.pop(guild_id, None)
+        await self.flush()
+        await self._run_in_db(self._set_expiry, guild_id, expire_after or None)
+        # Cached warnings carry the old expiry times
+        for key in [key for key in self._cache if key[0] == guild_id and key not in self._dirty]:
+            del self._cache[key]
+
+    def _set_expiry(self, guild_id: int, expire_after: Optional[float]):
+        with self._conn:
+            self._conn.execute(
+                "INSERT INTO warning_policies VALUES (?, ?) "
+                "ON CONFLICT (guild_id) DO UPDATE SET expire_after = excluded.expire_after",
+                (guild_id, expire_after)
+            )
+            self._conn.execute(
+                "UPDATE warnings SET expires_at = created_at + ? WHERE guild_id = ? AND active = 1",
+                (expire_after, guild_id)
+            )
+
+    async def set_escalation(self, guild_id: int, rule: EscalationRule):
+        """Add a guild's rule for ``rule.threshold`` warnings, replacing any existing one."""
+        await self._run_in_db(self._set_escalation, guild_id, rule)
+        rules = [existing for existing in self.escalations.get(guild_id, []) if existing.threshold != rule.threshold]
+        self.escalations[guild_id] = order(rules + [rule])
+
+    def _set_escalation(self, guild_id: int, rule: EscalationRule):
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO escalation_rules VALUES (?, ?, ?, ?, ?)",
+                (guild_id, rule.threshold, rule.window, rule.action, rule.duration)
+            )
+
+    async def remove_escalation(self, guild_id: int, threshold: int) -> bool:
+        """Remove a guild's rule for ``threshold`` warnings; False if there was none."""
+        rules = self.escalations.get(guild_id, [])
+        remaining = [rule for rule in rules if rule.threshold != threshold]
+        if len(remaining) == len(rules):
+            return False
+        await self._run_in_db(self._remove_escalation, guild_id, threshold)
+        if remaining:
+            self.escalations[guild_id] = remaining
+        else:
+            del self.escalations[guild_id]
+        return True
+
+    def _remove_escalation(self, guild_id: int, threshold: int):
+        with self._conn:
+            self._conn.execute(
+                "DELETE FROM escalation_rules WHERE guild_id = ? AND threshold = ?", (guild_id, threshold)
+            )
+
+    async def expiring(self,
+                       after: Optional[Tuple[float, int]],
+                       limit: int) -> List[Tuple[float, int, int, int]]:
+        """The next ``limit`` (expires_at, id, guild id, user id) due after ``after``.
+
+        Reads the expiry index in order, so this costs the same with a
+        hundred stored warnings or millions.
+        """
+        # Warnings still in the write queue would otherwise be skipped
+        await self.flush()
+        return await self._run_in_db(self._expiring, after, limit)
+
+    def _expiring(self, after: Optional[Tuple[float, int]], limit: int):
+        if after is None:
+            after = (float('-inf'), 0)
+        return self._conn.execute(
+            "SELECT expires_at, id, guild_id, user_id FROM warnings "
+            "WHERE active = 1 AND expires_at IS NOT NULL AND (expires_at, id) > (?, ?) "
+            "ORDER BY expires_at, id LIMIT ?",
+            (*after, limit)
+        ).fetchall()
+
+    async def expire(self, warning_ids: List[int]) -> int:
+        """Mark warnings that have fallen due as expired; returns how many changed."""
+        await self.flush()
+        expired = await self._run_in_db(self._expire, warning_ids, time.time())
+        ids = {warning_id for warning_id, _, _ in expired}
+        counts: Dict[Key, int] = {}
+        for _, guild_id, user_id in expired:
+            counts[(guild_id, user_id)] = counts.get((guild_id, user_id), 0) + 1
+        for key, count in counts.items():
+            member = self._cache.get(key)
+            if member is None:
+                continue
+            if key not in self._dirty:
+                # Reloaded on next use; the executor runs loads after this update
+                del self._cache[key]
+            else:
+                member.active = max(member.active - count, 0)
+                for warning in member.recent:
+                    if warning['id'] in ids:
+                        warning['active'] = False
+        return len(expired)
+
+    def _expire(self, warning_ids: List[int], now: float) -> List[Tuple[int, int, int]]:
+        expired = []
+        with self._conn:
+            # Only warnings still active and really due; the policy may have changed
+            for start in range(0, len(warning_ids), 500):
+                chunk = warning_ids[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT id, guild_id, user_id FROM warnings WHERE id IN ({marks}) "
+                    "AND active = 1 AND expires_at <= ?",
+                    (*chunk, now)
+                ).fetchall()
+                self._conn.executemany("UPDATE warnings SET active = 0 WHERE id = ?", [row[:1] for row in rows])
+                expired += rows
+        return expired
+
+    async def _run(self):
+        while True:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            if len(self._pending) < self.max_batch:
+                # Let a burst of warnings gather into one transaction
+                await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                await asyncio.sleep(self.flush_interval * 10)
+
+    def stats(self) -> Dict[str, float]:
+        """Return cache and write-behind figures."""
+        return {
+            'cached': len(self._cache),
+            'pending': len(self._pending),
+            'hits': self.hits,
+            'misses': self.misses,
+            'flushes': self.flushes,
+            'written': self.written,
+            'last_flush_latency': self.last_flush_latency,
+        }